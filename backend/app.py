@@ -3,17 +3,36 @@
 # Arquivo: app.py
 # =====================================================
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-import asyncio
 import os
 import logging
+import queue
+import threading
+import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import json
 
 # Importar nosso scraper
-from product_scraper import scrape_product_data, ProductScraper
+from product_scraper import scrape_product_data, scrape_products_batch, ProductScraper
+from product_parsers import extraction_stats, set_parse_workers
+from scraper_runtime import get_runtime
+from search_index import SearchIndex
+from product_store import SORT_ORDERS, ProductStore
+from sqlite_store import FTSSearchIndex, SQLiteProductStore
+from cursors import InvalidCursor, decode_cursor, encode_cursor
+from product_record import project
+from product_ingest import INSERT_DEFAULTS, InvalidBulkBody, new_product_id, parse_bulk_body, prepare_records
+from json_backend import ProductJSONProvider, dumps
+from compression import compress_response
+from product_aggregates import TIME_WINDOWS, ProductAggregates, parse_price_buckets
+from columnar_catalog import ColumnarCatalog
+from recommendations import PopularityRanking
+from similar_products import SimilarProducts
+from price_history import RESOLUTIONS, PriceHistory, to_timestamp
+from rescrape_scheduler import BASE_INTERVAL, MAX_INTERVAL, MIN_INTERVAL, RescrapeScheduler
+from job_queue import FINISHED, MAX_ATTEMPTS, ScrapeJobQueue
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -21,16 +40,147 @@ logger = logging.getLogger(__name__)
 
 # Criar app Flask
 app = Flask(__name__)
+app.json = ProductJSONProvider(app)
 CORS(app)  # Permitir CORS para todas as rotas
 
 # Configurações
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key')
 app.config['SUPABASE_URL'] = os.environ.get('SUPABASE_URL', '')
 app.config['SUPABASE_KEY'] = os.environ.get('SUPABASE_KEY', '')
+app.config['SCRAPE_BATCH_MAX_URLS'] = int(os.environ.get('SCRAPE_BATCH_MAX_URLS', 5000))
+app.config['SCRAPE_BATCH_CONCURRENCY'] = int(os.environ.get('SCRAPE_BATCH_CONCURRENCY', 20))
+app.config['SCRAPE_MARKETPLACE_CONCURRENCY'] = int(os.environ.get('SCRAPE_MARKETPLACE_CONCURRENCY', 5))
+app.config['PRODUCTS_BULK_MAX_RECORDS'] = int(os.environ.get('PRODUCTS_BULK_MAX_RECORDS', 50000))
+app.config['ANALYTICS_PRICE_BUCKETS'] = parse_price_buckets(os.environ.get('ANALYTICS_PRICE_BUCKETS'))
+# 'memory' (padrão) ou 'sqlite' (arquivo em PRODUCT_DB_PATH, compartilhado entre workers)
+app.config['PRODUCT_STORE'] = os.environ.get('PRODUCT_STORE', 'memory')
+app.config['PRODUCT_DB_PATH'] = os.environ.get('PRODUCT_DB_PATH', 'products.db')
+# Re-scraping periódico dos produtos com product_url (ativar em um único processo)
+app.config['RESCRAPE_ENABLED'] = os.environ.get('RESCRAPE_ENABLED', '').lower() in ('1', 'true', 'yes')
+app.config['RESCRAPE_BASE_INTERVAL'] = float(os.environ.get('RESCRAPE_BASE_INTERVAL', BASE_INTERVAL))
+app.config['RESCRAPE_MIN_INTERVAL'] = float(os.environ.get('RESCRAPE_MIN_INTERVAL', MIN_INTERVAL))
+app.config['RESCRAPE_MAX_INTERVAL'] = float(os.environ.get('RESCRAPE_MAX_INTERVAL', MAX_INTERVAL))
+# Fila de /api/scrape-product?async=1, consumida por scrape_worker.py
+app.config['SCRAPE_QUEUE_PATH'] = os.environ.get('SCRAPE_QUEUE_PATH', 'scrape_jobs.db')
+app.config['SCRAPE_JOB_MAX_ATTEMPTS'] = int(os.environ.get('SCRAPE_JOB_MAX_ATTEMPTS', MAX_ATTEMPTS))
+app.config['SCRAPE_JOB_EVENTS_TIMEOUT'] = float(os.environ.get('SCRAPE_JOB_EVENTS_TIMEOUT', 300))
 
-# Simulação de banco de dados em memória (substituir por Supabase)
-products_db = []
-scraping_jobs = []
+# Eventos SSE de um job: consulta ao banco e comentário de keep-alive (s)
+JOB_EVENTS_POLL_INTERVAL = 0.5
+JOB_EVENTS_HEARTBEAT = 15.0
+
+if app.config['PRODUCT_STORE'] == 'sqlite':
+    # Catálogo persistido em SQLite (WAL); /api/search usa o FTS5 do próprio banco
+    products_db = SQLiteProductStore(app.config['PRODUCT_DB_PATH'])
+    search_index = FTSSearchIndex(products_db)
+
+    @app.before_request
+    def sync_products():
+        """Aplica aos índices em memória as escritas dos outros workers"""
+        products_db.sync()
+else:
+    # Simulação de banco de dados em memória (substituir por Supabase)
+    products_db = ProductStore()
+
+    # Índice invertido para /api/search (mantido pelo products_db)
+    search_index = SearchIndex()
+    products_db.add_listener(search_index)
+
+# Contadores do dashboard (mantidos pelo products_db)
+aggregates = ProductAggregates(app.config['ANALYTICS_PRICE_BUCKETS'])
+products_db.add_listener(aggregates)
+
+# Espelho colunar (NumPy) para /api/analytics/stats
+catalog_columns = ColumnarCatalog()
+products_db.add_listener(catalog_columns)
+
+# Ranking de popularidade para /api/recommendations
+popularity = PopularityRanking()
+products_db.add_listener(popularity)
+
+# Vetores TF-IDF para /api/products/<id>/similar
+similar_products = SimilarProducts()
+products_db.add_listener(similar_products)
+
+# Histórico de preços (uma amostra a cada gravação do produto)
+price_history = PriceHistory()
+products_db.add_listener(price_history)
+
+# Agenda de re-scraping (/api/scrape-jobs); registrada por último para ver o produto já indexado
+scraping_jobs = RescrapeScheduler(
+    products_db,
+    base_interval=app.config['RESCRAPE_BASE_INTERVAL'],
+    min_interval=app.config['RESCRAPE_MIN_INTERVAL'],
+    max_interval=app.config['RESCRAPE_MAX_INTERVAL']
+)
+products_db.add_listener(scraping_jobs)
+
+def start_rescrape_scheduler(runtime=None):
+    """Inicia o dispatcher no runtime do scraper, se RESCRAPE_ENABLED"""
+    if app.config['RESCRAPE_ENABLED'] and not scraping_jobs.running:
+        scraping_jobs.start(runtime or get_runtime())
+
+if app.config['RESCRAPE_ENABLED']:
+    @app.before_request
+    def ensure_rescrape_scheduler():
+        """Sob WSGI o dispatcher sobe com a primeira requisição (sob ASGI, no lifespan)"""
+        start_rescrape_scheduler()
+
+@app.after_request
+def compress(response):
+    """gzip/brotli conforme o Accept-Encoding do cliente"""
+    return compress_response(response, request.headers.get('Accept-Encoding'))
+
+def requested_fields() -> Optional[Tuple[str, ...]]:
+    """Campos pedidos em ?fields=id,title,price (None = todos)"""
+    fields = request.args.get('fields')
+    if not fields:
+        return None
+    return tuple(field.strip() for field in fields.split(',') if field.strip())
+
+def flag_arg(name: str) -> bool:
+    return request.args.get(name, '').lower() in ('1', 'true', 'yes')
+
+_scrape_queue: Optional[ScrapeJobQueue] = None
+_scrape_queue_lock = threading.Lock()
+
+def get_scrape_queue() -> ScrapeJobQueue:
+    """Fila de jobs, aberta no primeiro uso (o arquivo só é criado se usado)"""
+    global _scrape_queue
+    with _scrape_queue_lock:
+        if _scrape_queue is None:
+            _scrape_queue = ScrapeJobQueue(app.config['SCRAPE_QUEUE_PATH'])
+        return _scrape_queue
+
+def enqueue_scrape_job(url: str) -> Dict:
+    """Enfileira o scraping e retorna o corpo da resposta 202"""
+    job_id = get_scrape_queue().enqueue(url, app.config['SCRAPE_JOB_MAX_ATTEMPTS'])
+    logger.info(f"Job de scraping enfileirado: {job_id}")
+    return {
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': f'/api/scrape-product/jobs/{job_id}',
+        'events_url': f'/api/scrape-product/jobs/{job_id}/events'
+    }
+
+def sse_event(event: str, data) -> bytes:
+    return b'event: ' + event.encode() + b'\ndata: ' + dumps(data) + b'\n\n'
+
+def poll_job_event(job_id: str, last_state: Optional[Tuple]) -> Tuple[Optional[Tuple], Optional[bytes], bool]:
+    """Próximo evento SSE do job: (estado, evento ou None se nada mudou, terminou)"""
+    scrape_queue = get_scrape_queue()
+    state = scrape_queue.status(job_id)
+    if state is None:
+        return None, sse_event('error', {'error': 'Job não encontrado'}), True
+    if state == last_state:
+        return state, None, False
+    if state[0] in FINISHED:
+        return state, sse_event('result', scrape_queue.get(job_id)), True
+    return state, sse_event('status', {'id': job_id, 'status': state[0], 'attempts': state[1]}), False
+
+def cursor_sort(sort_by: Optional[str]) -> str:
+    """Nome da ordenação gravado no cursor (a padrão é a de inserção)"""
+    return sort_by if sort_by in SORT_ORDERS else 'recent'
 
 @app.route('/health', methods=['GET'])
 def health_check():
@@ -57,12 +207,15 @@ def scrape_product():
         if not url.startswith(('http://', 'https://')):
             return jsonify({'error': 'URL inválida'}), 400
         
-        # Executar scraping de forma assíncrona
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # ?async=1: só enfileira; o resultado sai pelos endpoints do job
+        if flag_arg('async'):
+            return jsonify(enqueue_scrape_job(url)), 202
+        
+        # Executar scraping no event loop compartilhado
+        runtime = get_runtime()
         
         try:
-            product_data = loop.run_until_complete(scrape_product_data(url))
+            product_data = runtime.run(scrape_product_data(url, runtime.scraper))
             
             # Adicionar timestamp
             product_data['scraped_at'] = datetime.utcnow().isoformat()
@@ -77,14 +230,177 @@ def scrape_product():
                 'error': 'Erro ao extrair dados do produto',
                 'details': str(scrape_error)
             }), 500
-            
-        finally:
-            loop.close()
     
     except Exception as e:
         logger.error(f"Erro geral no endpoint scrape-product: {str(e)}")
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@app.route('/api/scrape-product/jobs/<job_id>', methods=['GET'])
+def get_scrape_job(job_id):
+    """Estado de um job de scraping assíncrono (com o produto, quando concluído)"""
+    
+    job = get_scrape_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job não encontrado'}), 404
+    return jsonify(job)
+
+@app.route('/api/scrape-product/jobs/<job_id>/events', methods=['GET'])
+def scrape_job_events(job_id):
+    """Server-sent events: `status` a cada mudança e `result` ao terminar"""
+    
+    def events():
+        state = None
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < app.config['SCRAPE_JOB_EVENTS_TIMEOUT']:
+            state, event, finished = poll_job_event(job_id, state)
+            if event is not None:
+                yield event
+                last_sent = time.monotonic()
+            if finished:
+                return
+            if time.monotonic() - last_sent >= JOB_EVENTS_HEARTBEAT:
+                yield b': keep-alive\n\n'
+                last_sent = time.monotonic()
+            time.sleep(JOB_EVENTS_POLL_INTERVAL)
+        yield sse_event('timeout', {'id': job_id})
+    
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+def stream_ndjson(async_iterator_factory):
+    """Consome um iterador assíncrono no runtime do scraper e gera linhas NDJSON"""
+    
+    results = queue.Queue()
+    finished = object()
+    
+    async def consume():
+        try:
+            async for item in async_iterator_factory():
+                results.put(item)
+        except Exception as e:
+            logger.error(f"Erro no scraping em lote: {str(e)}")
+            results.put({'status': 'error', 'error': str(e)})
+        finally:
+            results.put(finished)
+    
+    future = get_runtime().submit(consume())
+    
+    try:
+        while True:
+            item = results.get()
+            if item is finished:
+                break
+            yield dumps(item) + b'\n'
+    finally:
+        # Cliente desconectou: cancelar o que ainda estiver em andamento
+        future.cancel()
+
+def batch_limit(data: Dict, field: str, configured: int) -> Optional[int]:
+    """Limite `field` do corpo, no máximo o configurado (None se inválido)"""
+    value = data.get(field)
+    if not value:
+        return configured
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return min(value, configured) if value > 0 else None
+
+def parse_batch_request(data) -> Tuple[Optional[str], Dict]:
+    """Valida o corpo de um lote de scraping
+
+    Retorna (mensagem de erro, None) ou (None, argumentos de `batch_results`).
+    """
+    
+    if not data or not isinstance(data.get('urls'), list) or not data['urls']:
+        return 'Lista de URLs é obrigatória', None
+    
+    urls = data['urls']
+    max_urls = app.config['SCRAPE_BATCH_MAX_URLS']
+    if len(urls) > max_urls:
+        return f'Máximo de {max_urls} URLs por lote', None
+    
+    # Limites vindos do corpo não podem passar dos configurados
+    concurrency = batch_limit(data, 'concurrency', app.config['SCRAPE_BATCH_CONCURRENCY'])
+    if concurrency is None:
+        return 'concurrency deve ser um inteiro positivo', None
+    marketplace_concurrency = batch_limit(
+        data, 'marketplace_concurrency', app.config['SCRAPE_MARKETPLACE_CONCURRENCY']
+    )
+    if marketplace_concurrency is None:
+        return 'marketplace_concurrency deve ser um inteiro positivo', None
+    
+    valid_urls = []
+    invalid_urls = []
+    for url in urls:
+        if isinstance(url, str) and url.startswith(('http://', 'https://')):
+            valid_urls.append(url)
+        else:
+            invalid_urls.append(url)
+    
+    return None, {
+        'valid_urls': valid_urls,
+        'invalid_urls': invalid_urls,
+        'concurrency': concurrency,
+        'marketplace_concurrency': marketplace_concurrency
+    }
+
+async def batch_results(valid_urls, invalid_urls, concurrency, marketplace_concurrency, scraper):
+    """Resultados do lote, um por URL, na ordem em que terminam"""
+    
+    for url in invalid_urls:
+        yield {'url': url, 'status': 'error', 'error': 'URL inválida'}
+    
+    async for result in scrape_products_batch(valid_urls, concurrency, marketplace_concurrency, scraper):
+        if result['status'] == 'ok':
+            result['product']['scraped_at'] = datetime.utcnow().isoformat()
+        yield result
+
+@app.route('/api/scrape-products/batch', methods=['POST'])
+def batch_scrape_products():
+    """Endpoint para scraping concorrente de várias URLs (resposta em NDJSON)"""
+    
+    error, batch = parse_batch_request(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+    
+    logger.info(f"Scraping em lote iniciado: {len(batch['valid_urls'])} URLs")
+    
+    return Response(
+        stream_ndjson(lambda: batch_results(scraper=get_runtime().scraper, **batch)),
+        mimetype='application/x-ndjson'
+    )
+
+@app.route('/api/scraper/extraction-stats', methods=['GET'])
+def get_extraction_stats():
+    """Taxa de acerto de cada seletor dos planos de extração"""
+    return jsonify({
+        'plans': extraction_stats(),
+        'generated_at': datetime.utcnow().isoformat()
+    })
+
+@app.route('/api/scrape-jobs', methods=['GET'])
+def list_scrape_jobs():
+    """Agenda de re-scraping e últimos jobs (?status=ok|error|running|skipped&limit=)"""
+    
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 1000)
+    return jsonify({
+        'scheduler': scraping_jobs.stats(),
+        'jobs': scraping_jobs.recent_jobs(request.args.get('status'), limit),
+        'generated_at': datetime.utcnow().isoformat()
+    })
+
+@app.route('/api/scrape-jobs/<product_id>', methods=['GET', 'POST'])
+def product_scrape_job(product_id):
+    """Agenda de um produto; POST antecipa o re-scrape para agora"""
+    
+    if request.method == 'POST' and not scraping_jobs.trigger(product_id):
+        return jsonify({'error': 'Produto não monitorado'}), 404
+    
+    entry = scraping_jobs.entry(product_id)
+    if entry is None:
+        return jsonify({'error': 'Produto não monitorado'}), 404
+    return jsonify(entry)
+
 @app.route('/api/products', methods=['GET', 'POST'])
 def handle_products():
     """Endpoint para listar e criar produtos"""
@@ -97,44 +413,66 @@ def handle_products():
             category = request.args.get('category')
             min_price = request.args.get('min_price', type=float)
             max_price = request.args.get('max_price', type=float)
-            search = request.args.get('search', '').lower()
+            search = request.args.get('search', '')
+            sort_by = request.args.get('sort')
             page = request.args.get('page', 1, type=int)
             limit = request.args.get('limit', 20, type=int)
-            
-            # Filtrar produtos
-            filtered_products = products_db.copy()
-            
-            if marketplace:
-                filtered_products = [p for p in filtered_products if p.get('marketplace') == marketplace]
-            
-            if category:
-                filtered_products = [p for p in filtered_products if p.get('category') == category]
-            
-            if min_price is not None:
-                filtered_products = [p for p in filtered_products if p.get('price', 0) >= min_price]
-            
-            if max_price is not None:
-                filtered_products = [p for p in filtered_products if p.get('price', 0) <= max_price]
-            
-            if search:
-                filtered_products = [
-                    p for p in filtered_products 
-                    if search in p.get('title', '').lower() or search in p.get('description', '').lower()
-                ]
-            
-            # Paginação
-            start = (page - 1) * limit
-            end = start + limit
-            paginated_products = filtered_products[start:end]
+            fields = requested_fields()
+            
+            # Filtrar e paginar pelos índices (sem varrer o catálogo)
+            matches = search_index.match(search) if search else None
+            
+            if 'cursor' in request.args or request.args.get('paginate') == 'cursor':
+                # Paginação por cursor (keyset), opcional: ?paginate=cursor na primeira
+                # página, depois ?cursor=<next_cursor da página anterior>
+                sort_name = cursor_sort(sort_by)
+                result = products_db.seek(
+                    within=matches,
+                    min_price=min_price,
+                    max_price=max_price,
+                    sort=sort_by,
+                    after=decode_cursor(request.args.get('cursor'), sort_name),
+                    limit=limit,
+                    exact_total=flag_arg('exact_total'),
+                    marketplace=marketplace,
+                    category=category
+                )
+                products = result.products
+                if fields is not None:
+                    products = [project(product, fields) for product in products]
+                
+                return jsonify({
+                    'products': products,
+                    'next_cursor': encode_cursor(sort_name, result.next_key) if result.next_key else None,
+                    'limit': limit,
+                    'total': result.total,
+                    'total_exact': result.total_exact
+                })
+            
+            paginated_products, total = products_db.query(
+                within=matches,
+                min_price=min_price,
+                max_price=max_price,
+                sort=sort_by,
+                offset=(page - 1) * limit,
+                limit=limit,
+                marketplace=marketplace,
+                category=category
+            )
+            
+            if fields is not None:
+                paginated_products = [project(product, fields) for product in paginated_products]
             
             return jsonify({
                 'products': paginated_products,
-                'total': len(filtered_products),
+                'total': total,
                 'page': page,
                 'limit': limit,
-                'total_pages': (len(filtered_products) + limit - 1) // limit
+                'total_pages': (total + limit - 1) // limit
             })
             
+        except InvalidCursor as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             logger.error(f"Erro ao listar produtos: {str(e)}")
             return jsonify({'error': 'Erro ao listar produtos'}), 500
@@ -154,7 +492,7 @@ def handle_products():
                     return jsonify({'error': f'Campo {field} é obrigatório'}), 400
             
             # Gerar ID único
-            product_id = f"prod_{len(products_db) + 1}_{int(datetime.utcnow().timestamp())}"
+            product_id = new_product_id()
             
             # Adicionar metadados
             product_data.update({
@@ -165,22 +503,66 @@ def handle_products():
             })
             
             # Salvar no "banco de dados"
-            products_db.append(product_data)
+            product = products_db.insert(product_data)
             
             logger.info(f"Produto criado: {product_id}")
             
-            return jsonify(product_data), 201
+            return jsonify(product), 201
             
         except Exception as e:
             logger.error(f"Erro ao criar produto: {str(e)}")
             return jsonify({'error': 'Erro ao criar produto'}), 500
 
+@app.route('/api/products/bulk', methods=['POST'])
+def bulk_upsert_products():
+    """Importação em lote (array JSON ou NDJSON), com upsert por (marketplace, marketplace_id)"""
+    
+    try:
+        ndjson = request.mimetype in ('application/x-ndjson', 'application/jsonl')
+        records = parse_bulk_body(request.get_data(), ndjson)
+    except InvalidBulkBody as e:
+        return jsonify({'error': str(e)}), 400
+    
+    max_records = app.config['PRODUCTS_BULK_MAX_RECORDS']
+    if not records:
+        return jsonify({'error': 'Nenhum produto enviado'}), 400
+    if len(records) > max_records:
+        return jsonify({'error': f'Máximo de {max_records} produtos por lote'}), 400
+    
+    try:
+        valid, results = prepare_records(records)
+        
+        # Um único lote no products_db: uma transação (SQLite) / um lock (memória)
+        stored = products_db.upsert_many((product for _, product in valid), defaults=INSERT_DEFAULTS)
+        for (position, _), (product, created) in zip(valid, stored):
+            results.append({
+                'index': position,
+                'status': 'created' if created else 'updated',
+                'id': product['id']
+            })
+        results.sort(key=lambda result: result['index'])
+        
+        created = sum(1 for _, was_created in stored if was_created)
+        summary = {
+            'received': len(records),
+            'created': created,
+            'updated': len(stored) - created,
+            'failed': len(records) - len(stored)
+        }
+        logger.info(f"Importação em lote: {summary}")
+        
+        return jsonify({'summary': summary, 'results': results})
+        
+    except Exception as e:
+        logger.error(f"Erro na importação em lote: {str(e)}")
+        return jsonify({'error': 'Erro na importação em lote'}), 500
+
 @app.route('/api/products/<product_id>', methods=['GET', 'PUT', 'DELETE'])
 def handle_product(product_id):
     """Endpoint para operações em produto específico"""
     
     # Encontrar produto
-    product = next((p for p in products_db if p['id'] == product_id), None)
+    product = products_db.get(product_id)
     
     if not product:
         return jsonify({'error': 'Produto não encontrado'}), 404
@@ -196,8 +578,8 @@ def handle_product(product_id):
                 return jsonify({'error': 'Dados de atualização são obrigatórios'}), 400
             
             # Atualizar produto
-            product.update(update_data)
-            product['updated_at'] = datetime.utcnow().isoformat()
+            update_data['updated_at'] = datetime.utcnow().isoformat()
+            product = products_db.update(product_id, update_data)
             
             logger.info(f"Produto atualizado: {product_id}")
             
@@ -209,7 +591,7 @@ def handle_product(product_id):
     
     elif request.method == 'DELETE':
         try:
-            products_db.remove(product)
+            products_db.delete(product_id)
             
             logger.info(f"Produto removido: {product_id}")
             
@@ -219,6 +601,68 @@ def handle_product(product_id):
             logger.error(f"Erro ao remover produto: {str(e)}")
             return jsonify({'error': 'Erro ao remover produto'}), 500
 
+@app.route('/api/products/<product_id>/similar', methods=['GET'])
+def get_similar_products(product_id):
+    """Produtos parecidos (cosseno TF-IDF de título, descrição e features)"""
+    
+    if product_id not in products_db:
+        return jsonify({'error': 'Produto não encontrado'}), 404
+    
+    try:
+        limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+        
+        similar = []
+        for similar_id, score in similar_products.similar(product_id, limit):
+            product = products_db.get(similar_id)
+            if product is None:
+                continue
+            product_copy = project(product, requested_fields())
+            product_copy['similarity_score'] = round(score, 4)
+            similar.append(product_copy)
+        
+        return jsonify({
+            'product_id': product_id,
+            'similar': similar,
+            'generated_at': datetime.utcnow().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao buscar produtos similares: {str(e)}")
+        return jsonify({'error': 'Erro ao buscar produtos similares'}), 500
+
+@app.route('/api/products/<product_id>/price-history', methods=['GET'])
+def get_price_history(product_id):
+    """Histórico de preços: ?from=&to= (ISO ou epoch) e ?resolution=raw|hour|day|week"""
+    
+    resolution = request.args.get('resolution', 'raw')
+    if resolution not in RESOLUTIONS:
+        return jsonify({'error': f"Resolução inválida (use {', '.join(RESOLUTIONS)})"}), 400
+    
+    bounds = {}
+    for name in ('from', 'to'):
+        value = request.args.get(name)
+        if value:
+            bounds[name] = to_timestamp(int(value) if value.isdigit() else value)
+            if bounds[name] is None:
+                return jsonify({'error': f'Parâmetro {name} inválido'}), 400
+    
+    try:
+        result = price_history.query(product_id, bounds.get('from'), bounds.get('to'), resolution)
+        if result is None:
+            return jsonify({'error': 'Histórico de preços não encontrado'}), 404
+        
+        points, summary = result
+        return jsonify({
+            'product_id': product_id,
+            'resolution': resolution,
+            'history': points,
+            'summary': summary
+        })
+        
+    except Exception as e:
+        logger.error(f"Erro ao buscar histórico de preços: {str(e)}")
+        return jsonify({'error': 'Erro ao buscar histórico de preços'}), 500
+
 @app.route('/api/products/compare', methods=['POST'])
 def compare_products():
     """Endpoint para comparar produtos"""
@@ -235,11 +679,7 @@ def compare_products():
             return jsonify({'error': 'Pelo menos 2 produtos são necessários para comparação'}), 400
         
         # Buscar produtos
-        comparison_products = []
-        for product_id in product_ids:
-            product = next((p for p in products_db if p['id'] == product_id), None)
-            if product:
-                comparison_products.append(product)
+        comparison_products = products_db.get_many(product_ids)
         
         if len(comparison_products) < 2:
             return jsonify({'error': 'Produtos não encontrados'}), 404
@@ -280,59 +720,80 @@ def search_products():
         sort_by = request.args.get('sort', 'relevance')
         page = request.args.get('page', 1, type=int)
         limit = request.args.get('limit', 20, type=int)
+        fields = requested_fields()
         
         if not query:
             return jsonify({'error': 'Query de busca é obrigatória'}), 400
         
-        # Buscar produtos
-        results = []
-        for product in products_db:
-            score = 0
-            
-            # Calcular relevância
-            title = product.get('title', '').lower()
-            description = product.get('description', '').lower()
-            
-            if query in title:
-                score += 10
-            if query in description:
-                score += 5
-            
-            # Aplicar filtros
-            if marketplace and product.get('marketplace') != marketplace:
-                continue
-            
-            if category and product.get('category') != category:
-                continue
-            
-            if score > 0:
-                product_copy = product.copy()
-                product_copy['relevance_score'] = score
-                results.append(product_copy)
+        # Sem ?page=, paginação por cursor (keyset)
+        use_cursor = 'page' not in request.args
+        sort_name = 'relevance' if sort_by == 'relevance' else cursor_sort(sort_by)
+        after = decode_cursor(request.args.get('cursor'), sort_name) if use_cursor else None
+        offset = 0 if use_cursor else (page - 1) * limit
+        next_key = None
+        total_exact = True
         
-        # Ordenar resultados
         if sort_by == 'relevance':
-            results.sort(key=lambda x: x['relevance_score'], reverse=True)
-        elif sort_by == 'price_asc':
-            results.sort(key=lambda x: x.get('price', 0))
-        elif sort_by == 'price_desc':
-            results.sort(key=lambda x: x.get('price', 0), reverse=True)
-        elif sort_by == 'rating':
-            results.sort(key=lambda x: x.get('rating', 0), reverse=True)
-        
-        # Paginação
-        start = (page - 1) * limit
-        end = start + limit
-        paginated_results = results[start:end]
+            # Top-k por BM25 com heap: só as páginas até a atual são materializadas;
+            # os filtros são aplicados pelo próprio índice (no SQL, com o FTS5)
+            filters = {'marketplace': marketplace, 'category': category}
+            if use_cursor:
+                top, total = search_index.search(query, limit + 1, after=after, **filters)
+                if len(top) > limit:
+                    top = top[:limit]
+                    next_key = (top[-1][1], top[-1][0]['id'])
+                page_results = top
+            else:
+                top, total = search_index.search(query, offset + limit, **filters)
+                page_results = top[offset:]
+        else:
+            # Ordenação por preço/avaliação vem pronta dos índices ordenados
+            scores = search_index.match(query)
+            if use_cursor:
+                result = products_db.seek(
+                    within=scores,
+                    sort=sort_by,
+                    after=after,
+                    limit=limit,
+                    exact_total=flag_arg('exact_total'),
+                    marketplace=marketplace,
+                    category=category
+                )
+                products, total = result.products, result.total
+                next_key, total_exact = result.next_key, result.total_exact
+            else:
+                products, total = products_db.query(
+                    within=scores,
+                    sort=sort_by,
+                    offset=offset,
+                    limit=limit,
+                    marketplace=marketplace,
+                    category=category
+                )
+            page_results = [(product, scores[product['id']]) for product in products]
         
-        return jsonify({
+        paginated_results = []
+        for product, score in page_results:
+            product_copy = project(product, fields)
+            product_copy['relevance_score'] = round(score, 4)
+            paginated_results.append(product_copy)
+        
+        response = {
             'results': paginated_results,
-            'total': len(results),
-            'page': page,
+            'total': total,
             'limit': limit,
             'query': query
-        })
+        }
+        if use_cursor:
+            response['next_cursor'] = encode_cursor(sort_name, next_key) if next_key else None
+            response['total_exact'] = total_exact
+        else:
+            response['page'] = page
+        
+        return jsonify(response)
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Erro na busca: {str(e)}")
         return jsonify({'error': 'Erro na busca'}), 500
@@ -343,26 +804,21 @@ def get_recommendations(user_id):
     
     try:
         limit = request.args.get('limit', 10, type=int)
+        category = request.args.get('category')
+        fields = requested_fields()
         
         # Simulação de recomendações baseadas em popularidade
         # Em produção, usar algoritmos de ML mais sofisticados
         
+        # Top-k mantido incrementalmente: só os `limit` produtos são lidos
         recommendations = []
-        for product in products_db:
-            if product.get('status') == 'active':
-                # Calcular score de recomendação
-                score = 0
-                score += product.get('rating', 0) * 20
-                score += min(product.get('review_count', 0) / 100, 10)
-                score += 10 if product.get('is_featured') else 0
-                
-                product_copy = product.copy()
-                product_copy['recommendation_score'] = score
-                recommendations.append(product_copy)
-        
-        # Ordenar por score e limitar
-        recommendations.sort(key=lambda x: x['recommendation_score'], reverse=True)
-        recommendations = recommendations[:limit]
+        for product_id, score in popularity.top(limit, category):
+            product = products_db.get(product_id)
+            if product is None:
+                continue
+            product_copy = project(product, fields)
+            product_copy['recommendation_score'] = score
+            recommendations.append(product_copy)
         
         return jsonify({
             'recommendations': recommendations,
@@ -379,45 +835,9 @@ def get_dashboard_analytics():
     """Endpoint para analytics do dashboard"""
     
     try:
-        # Calcular estatísticas
-        total_products = len(products_db)
-        active_products = len([p for p in products_db if p.get('status') == 'active'])
-        
-        marketplaces = {}
-        categories = {}
-        price_ranges = {'0-50': 0, '50-100': 0, '100-500': 0, '500+': 0}
-        
-        for product in products_db:
-            # Contagem por marketplace
-            marketplace = product.get('marketplace', 'unknown')
-            marketplaces[marketplace] = marketplaces.get(marketplace, 0) + 1
-            
-            # Contagem por categoria
-            category = product.get('category', 'uncategorized')
-            categories[category] = categories.get(category, 0) + 1
-            
-            # Contagem por faixa de preço
-            price = product.get('price', 0)
-            if price < 50:
-                price_ranges['0-50'] += 1
-            elif price < 100:
-                price_ranges['50-100'] += 1
-            elif price < 500:
-                price_ranges['100-500'] += 1
-            else:
-                price_ranges['500+'] += 1
-        
-        analytics_data = {
-            'summary': {
-                'total_products': total_products,
-                'active_products': active_products,
-                'inactive_products': total_products - active_products
-            },
-            'marketplaces': marketplaces,
-            'categories': categories,
-            'price_ranges': price_ranges,
-            'generated_at': datetime.utcnow().isoformat()
-        }
+        # Contadores mantidos incrementalmente: O(1) no tamanho do catálogo
+        analytics_data = aggregates.dashboard()
+        analytics_data['generated_at'] = datetime.utcnow().isoformat()
         
         return jsonify(analytics_data)
         
@@ -425,6 +845,41 @@ def get_dashboard_analytics():
         logger.error(f"Erro ao gerar analytics: {str(e)}")
         return jsonify({'error': 'Erro ao gerar analytics'}), 500
 
+@app.route('/api/analytics/timeline', methods=['GET'])
+def get_timeline_analytics():
+    """Produtos adicionados por hora ou por dia"""
+    
+    window = request.args.get('window', 'day')
+    if window not in TIME_WINDOWS:
+        return jsonify({'error': f"window deve ser um de: {', '.join(TIME_WINDOWS)}"}), 400
+    
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        return jsonify({'error': 'limit deve ser um inteiro positivo'}), 400
+    
+    return jsonify({
+        'window': window,
+        'timeline': aggregates.timeline(window, limit),
+        'generated_at': datetime.utcnow().isoformat()
+    })
+
+@app.route('/api/analytics/stats', methods=['GET'])
+def get_catalog_stats():
+    """Estatísticas de preço, desconto e avaliação do catálogo (vetorizadas)"""
+    
+    try:
+        stats = catalog_columns.stats(
+            marketplace=request.args.get('marketplace'),
+            category=request.args.get('category')
+        )
+        stats['generated_at'] = datetime.utcnow().isoformat()
+        
+        return jsonify(stats)
+        
+    except Exception as e:
+        logger.error(f"Erro ao calcular estatísticas: {str(e)}")
+        return jsonify({'error': 'Erro ao calcular estatísticas'}), 500
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint não encontrado'}), 404
@@ -462,7 +917,14 @@ if __name__ == '__main__':
         }
     ]
     
-    products_db.extend(sample_products)
+    if not len(products_db):
+        products_db.extend(sample_products)
+    
+    # Servidor de desenvolvimento: com spawn, cada processo do pool de parsing
+    # reimportaria este arquivo (catálogo e listeners). Em produção (asgi.py,
+    # scrape_worker.py) o pool fica ligado; aqui só com SCRAPER_PARSE_WORKERS
+    if 'SCRAPER_PARSE_WORKERS' not in os.environ:
+        set_parse_workers(0)
     
     # Executar app
     port = int(os.environ.get('PORT', 5000))
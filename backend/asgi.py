@@ -0,0 +1,163 @@
+# =====================================================
+# Entrada ASGI da API 7hy-Shop (Starlette)
+# Arquivo: asgi.py
+#
+# Uso:
+#   uvicorn asgi:application --host 0.0.0.0 --port 5000
+#
+# As rotas de scraping rodam como handlers async no event loop do
+# servidor, aguardando o ProductScraper diretamente; as demais rotas são
+# servidas pelo app Flask, montado como WSGI.
+# =====================================================
+
+import asyncio
+import contextlib
+import os
+import time
+from datetime import datetime
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:  # a2wsgi é opcional: sem ele, usa o adaptador do Starlette
+    from starlette.middleware.wsgi import WSGIMiddleware
+
+from app import (
+    JOB_EVENTS_HEARTBEAT, JOB_EVENTS_POLL_INTERVAL, app as flask_app, batch_results, enqueue_scrape_job, logger,
+    parse_batch_request, poll_job_event, scraping_jobs, sse_event, start_rescrape_scheduler
+)
+from json_backend import dumps
+from product_scraper import scrape_product_data
+from scraper_runtime import attach_runtime, get_runtime
+
+
+class ProductJSONResponse(JSONResponse):
+    """JSONResponse com o backend JSON do app (orjson) e suporte a ProductRecord"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+async def read_json(request: Request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+
+async def scrape_product(request: Request):
+    """Scraping de produto aguardado no próprio event loop do servidor"""
+
+    data = await read_json(request)
+
+    if not isinstance(data, dict) or 'url' not in data:
+        return ProductJSONResponse({'error': 'URL é obrigatória'}, status_code=400)
+
+    url = data['url']
+
+    # Validar URL
+    if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+        return ProductJSONResponse({'error': 'URL inválida'}, status_code=400)
+
+    # ?async=1: só enfileira; o resultado sai pelos endpoints do job
+    if request.query_params.get('async', '').lower() in ('1', 'true', 'yes'):
+        return ProductJSONResponse(await asyncio.to_thread(enqueue_scrape_job, url), status_code=202)
+
+    try:
+        product_data = await scrape_product_data(url, get_runtime().scraper)
+
+        # Adicionar timestamp
+        product_data['scraped_at'] = datetime.utcnow().isoformat()
+
+        logger.info(f"Produto extraído com sucesso: {product_data.get('title', 'N/A')}")
+
+        return ProductJSONResponse(product_data)
+
+    except Exception as scrape_error:
+        logger.error(f"Erro no scraping: {str(scrape_error)}")
+        return ProductJSONResponse({
+            'error': 'Erro ao extrair dados do produto',
+            'details': str(scrape_error)
+        }, status_code=500)
+
+
+async def batch_scrape_products(request: Request):
+    """Scraping em lote com resposta NDJSON gerada direto do iterador assíncrono"""
+
+    error, batch = parse_batch_request(await read_json(request))
+    if error:
+        return ProductJSONResponse({'error': error}, status_code=400)
+
+    logger.info(f"Scraping em lote iniciado: {len(batch['valid_urls'])} URLs")
+
+    async def lines():
+        try:
+            async for item in batch_results(scraper=get_runtime().scraper, **batch):
+                yield dumps(item) + b'\n'
+        except Exception as e:
+            logger.error(f"Erro no scraping em lote: {str(e)}")
+            yield dumps({'status': 'error', 'error': str(e)}) + b'\n'
+
+    # Se o cliente desconectar, o Starlette cancela o gerador e os scrapes pendentes
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+
+async def scrape_job_events(request: Request):
+    """Server-sent events do job sem prender uma thread por cliente"""
+
+    job_id = request.path_params['job_id']
+
+    async def events():
+        state = None
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < flask_app.config['SCRAPE_JOB_EVENTS_TIMEOUT']:
+            state, event, finished = await asyncio.to_thread(poll_job_event, job_id, state)
+            if event is not None:
+                yield event
+                last_sent = time.monotonic()
+            if finished:
+                return
+            if time.monotonic() - last_sent >= JOB_EVENTS_HEARTBEAT:
+                yield b': keep-alive\n\n'
+                last_sent = time.monotonic()
+            await asyncio.sleep(JOB_EVENTS_POLL_INTERVAL)
+        yield sse_event('timeout', {'id': job_id})
+
+    return StreamingResponse(events(), media_type='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: Starlette):
+    # O scraper passa a usar o loop do servidor (sem thread própria)
+    runtime = await attach_runtime()
+    start_rescrape_scheduler(runtime)
+    try:
+        yield
+    finally:
+        scraping_jobs.stop()
+        await runtime.detach()
+
+
+application = Starlette(
+    routes=[
+        Route('/api/scrape-product', scrape_product, methods=['POST']),
+        Route('/api/scrape-products/batch', batch_scrape_products, methods=['POST']),
+        Route('/api/scrape-product/jobs/{job_id}/events', scrape_job_events, methods=['GET']),
+        # Demais rotas: app Flask (compatibilidade)
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(application, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
@@ -0,0 +1,134 @@
+# =====================================================
+# Benchmark dos backends de parsing HTML
+# Arquivo: benchmarks/bench_html_parsing.py
+#
+# Uso:
+#   python benchmarks/bench_html_parsing.py [pagina.html ...] [--marketplace amazon] [--repeat 5]
+#   python benchmarks/bench_html_parsing.py --synthetic
+#
+# Sem argumentos, usa as páginas salvas em benchmarks/fixtures/*.html (cópias
+# anonimizadas de páginas de produto; o marketplace vem do prefixo do nome,
+# ex.: amazon-*.html). A página sintética (~1.5 MB, só os blocos do extrator
+# e enchimento) só é usada com --synthetic ou se não houver fixture, com aviso.
+# =====================================================
+
+import argparse
+import glob
+import multiprocessing
+import os
+import resource
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_parsing import HtmlParser, FALLBACK_PARSER  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+MARKETPLACES = ('amazon', 'shopee')
+
+CONFIGS = [
+    (FALLBACK_PARSER, False),
+    (FALLBACK_PARSER, True),
+    ('lxml', False),
+    ('lxml', True),
+]
+
+
+def page_marketplace(path: str) -> str:
+    """Marketplace de uma fixture pelo prefixo do nome (amazon-*.html, shopee-*.html)"""
+    prefix = os.path.basename(path).split('-', 1)[0].lower()
+    return prefix if prefix in MARKETPLACES else 'amazon'
+
+
+def synthetic_amazon_page(size: int = 1_500_000) -> bytes:
+    """Página com os blocos usados pelo extrator e muito conteúdo irrelevante"""
+    product = (
+        '<span id="productTitle"> Fone de Ouvido Bluetooth JBL Tune 510BT </span>'
+        '<span class="a-price"><span class="a-offscreen">R$ 199,90</span>'
+        '<span class="a-price-whole">199,</span></span>'
+        '<span class="a-text-price"><span class="a-offscreen">R$ 249,90</span></span>'
+        '<img id="landingImage" src="https://m.media-amazon.com/images/I/main.jpg">'
+        '<div id="altImages"><ul>'
+        + ''.join(f'<li><span class="a-button-thumbnail"><img src="https://m.media-amazon.com/images/I/{i}.jpg">'
+                  '</span></li>' for i in range(6))
+        + '</ul></div>'
+        '<span class="a-icon-alt">4,7 de 5 estrelas</span>'
+        '<span id="acrCustomerReviewText">12.345 avaliações</span>'
+        '<div id="feature-bullets"><ul>'
+        + ''.join(f'<li><span class="a-list-item">Característica número {i} do produto</span></li>' for i in range(8))
+        + '</ul></div>'
+        '<table id="productDetails_techSpec_section_1">'
+        + ''.join(f'<tr><td>Spec {i}</td><td>Valor {i}</td></tr>' for i in range(20))
+        + '</table><a id="sellerProfileTriggerId">Loja Oficial</a>'
+        '<div id="availability"><span>Em estoque</span></div>'
+    )
+    filler_block = (
+        '<div class="nav-flyout"><ul>'
+        + ''.join(f'<li><a href="/s?k=item{i}">Recomendado {i}</a></li>' for i in range(20))
+        + '</ul></div><script>var data = {"widgets": [' + ','.join(['{"id": 1, "x": "y"}'] * 30) + ']};</script>'
+    )
+    filler = []
+    while sum(len(block) for block in filler) < size:
+        filler.append(filler_block)
+    return ('<html><head><title>Amazon</title></head><body>'
+            + ''.join(filler[:len(filler) // 2]) + product + ''.join(filler[len(filler) // 2:])
+            + '</body></html>').encode('utf-8')
+
+
+def _measure(args):
+    """Executa em processo separado para isolar o pico de RSS de cada configuração"""
+    content, parser, use_strainers, marketplace, repeat = args
+    html_parser = HtmlParser(parser, use_strainers=use_strainers)
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        soup = html_parser.parse(content, marketplace)
+        timings.append(time.perf_counter() - start)
+        del soup
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return html_parser.parser, statistics.median(timings), max(0, peak_kb - baseline_kb)
+
+
+def main():
+    argument_parser = argparse.ArgumentParser(description='Benchmark dos backends de parsing HTML')
+    argument_parser.add_argument('pages', nargs='*', help='Páginas HTML salvas')
+    argument_parser.add_argument(
+        '--marketplace', choices=MARKETPLACES,
+        help='Marketplace das páginas (padrão: prefixo do nome do arquivo, senão amazon)'
+    )
+    argument_parser.add_argument('--synthetic', action='store_true', help='Usa a página sintética')
+    argument_parser.add_argument('--repeat', type=int, default=5)
+    args = argument_parser.parse_args()
+
+    pages = [] if args.synthetic else args.pages or sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.html')))
+    if pages:
+        documents = [
+            (os.path.basename(path), args.marketplace or page_marketplace(path), open(path, 'rb').read())
+            for path in pages
+        ]
+    else:
+        if not args.synthetic:
+            print(f'Nenhuma fixture em {FIXTURES_DIR}; usando a página sintética')
+        print('Aviso: página sintética, os números não refletem o markup real da Amazon/Shopee')
+        documents = [('synthetic-amazon', 'amazon', synthetic_amazon_page())]
+
+    context = multiprocessing.get_context('spawn')
+    for name, marketplace, content in documents:
+        print(f'\n{name} [{marketplace}] ({len(content) / 1024:.0f} KB)')
+        print(f"{'parser':<12} {'strainer':<9} {'mediana (ms)':>13} {'pico RSS (MB)':>14}")
+        for parser, use_strainers in CONFIGS:
+            with context.Pool(1) as pool:
+                used_parser, median, peak_kb = pool.apply(
+                    _measure, ((content, parser, use_strainers, marketplace, args.repeat),)
+                )
+            label = used_parser if used_parser == parser else f'{parser}->{used_parser}'
+            print(f"{label:<12} {'sim' if use_strainers else 'não':<9} {median * 1000:>13.1f} {peak_kb / 1024:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+# =====================================================
+# Espelho colunar do catálogo para analytics (NumPy)
+# Arquivo: columnar_catalog.py
+# =====================================================
+
+import math
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from product_store import sort_value
+
+# Capacidade inicial das colunas (dobra quando enche)
+INITIAL_CAPACITY = 1024
+
+PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+# Faixas de desconto (%) e de avaliação (estrelas)
+DISCOUNT_BINS = (0, 10, 20, 30, 40, 50, 60, 70, 100)
+RATING_BINS = (0, 1, 2, 3, 4, 5)
+
+
+def optional_float(value) -> float:
+    """Valor numérico ou NaN quando ausente/inválido"""
+    try:
+        return float(value) if value is not None else math.nan
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _round(value, digits: int = 2) -> Optional[float]:
+    value = float(value)
+    return None if math.isnan(value) else round(value, digits)
+
+
+class CategoricalColumn:
+    """Códigos inteiros para valores de baixa cardinalidade"""
+
+    def __init__(self):
+        self.values: List = []
+        self.codes: Dict = {}
+
+    def encode(self, value) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class ColumnarCatalog:
+    """Colunas NumPy com os campos numéricos e categóricos dos produtos
+
+    Registrado como listener do ProductStore, acompanha todas as escritas.
+    Cada produto ocupa uma linha; a remoção move a última linha para o
+    buraco, então inserção e remoção são O(1) e as colunas ficam densas.
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.size = 0
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.marketplaces = CategoricalColumn()
+        self.categories = CategoricalColumn()
+        self.columns: Dict[str, np.ndarray] = {}
+        self._allocate(capacity)
+        self._lock = threading.Lock()
+
+    def _allocate(self, capacity: int):
+        columns = {
+            'price': np.zeros(capacity, dtype=np.float64),
+            'original_price': np.full(capacity, np.nan, dtype=np.float64),
+            'rating': np.full(capacity, np.nan, dtype=np.float64),
+            'review_count': np.zeros(capacity, dtype=np.int64),
+            'marketplace': np.zeros(capacity, dtype=np.int32),
+            'category': np.zeros(capacity, dtype=np.int32),
+        }
+        for name, column in self.columns.items():
+            columns[name][:self.size] = column[:self.size]
+        self.columns = columns
+        self.capacity = capacity
+
+    def __len__(self) -> int:
+        return self.size
+
+    def reset(self):
+        """Esvazia as colunas (o ProductStore repovoa via on_insert)"""
+        with self._lock:
+            self.size = 0
+            self.ids = []
+            self.rows = {}
+
+    def on_insert(self, product: Dict):
+        with self._lock:
+            if self.size == self.capacity:
+                self._allocate(self.capacity * 2)
+
+            row = self.size
+            columns = self.columns
+            columns['price'][row] = sort_value(product, 'price')
+            columns['original_price'][row] = optional_float(product.get('original_price'))
+            columns['rating'][row] = optional_float(product.get('rating'))
+            columns['review_count'][row] = int(sort_value(product, 'review_count'))
+            columns['marketplace'][row] = self.marketplaces.encode(product.get('marketplace', 'unknown'))
+            columns['category'][row] = self.categories.encode(product.get('category', 'uncategorized'))
+
+            self.rows[product['id']] = row
+            self.ids.append(product['id'])
+            self.size += 1
+
+    def on_delete(self, product: Dict):
+        with self._lock:
+            row = self.rows.pop(product['id'], None)
+            if row is None:
+                return
+
+            last = self.size - 1
+            if row != last:
+                for column in self.columns.values():
+                    column[row] = column[last]
+                moved_id = self.ids[last]
+                self.ids[row] = moved_id
+                self.rows[moved_id] = row
+            self.ids.pop()
+            self.size = last
+
+    def snapshot(self, marketplace: Optional[str] = None, category: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Cópia das colunas (opcionalmente filtradas) para calcular fora do lock"""
+        with self._lock:
+            mask = np.ones(self.size, dtype=bool)
+            for name, categorical, value in (
+                ('marketplace', self.marketplaces, marketplace),
+                ('category', self.categories, category),
+            ):
+                if value is None:
+                    continue
+                code = categorical.codes.get(value)
+                if code is None:
+                    mask[:] = False
+                else:
+                    mask &= self.columns[name][:self.size] == code
+            return {name: column[:self.size][mask] for name, column in self.columns.items()}
+
+    # ---------------------------------------------
+    # Estatísticas
+    # ---------------------------------------------
+
+    def stats(self, marketplace: Optional[str] = None, category: Optional[str] = None) -> Dict:
+        """Percentis de preço, descontos, avaliações e agregados por grupo"""
+        columns = self.snapshot(marketplace, category)
+        price = columns['price']
+
+        return {
+            'total_products': int(price.size),
+            'price': self._price_stats(price),
+            'discounts': self._discount_stats(price, columns['original_price']),
+            'ratings': self._rating_stats(columns['rating'], columns['review_count']),
+            'by_marketplace': self._group_stats(columns, 'marketplace', self.marketplaces.values),
+            'by_category': self._group_stats(columns, 'category', self.categories.values),
+        }
+
+    @staticmethod
+    def _price_stats(price: np.ndarray) -> Dict:
+        if not price.size:
+            return {'min': None, 'max': None, 'mean': None, 'percentiles': {}}
+        percentiles = np.percentile(price, PERCENTILES)
+        return {
+            'min': _round(price.min()),
+            'max': _round(price.max()),
+            'mean': _round(price.mean()),
+            'percentiles': {f'p{p}': _round(value) for p, value in zip(PERCENTILES, percentiles)}
+        }
+
+    @staticmethod
+    def _discount_stats(price: np.ndarray, original_price: np.ndarray) -> Dict:
+        # NaN em original_price compara como falso: sem preço original, sem desconto
+        discounted = (original_price > price) & (original_price > 0)
+        discount = (1 - price[discounted] / original_price[discounted]) * 100
+        counts, edges = np.histogram(discount, bins=DISCOUNT_BINS)
+        return {
+            'discounted_products': int(discounted.sum()),
+            'mean_discount_pct': _round(discount.mean()) if discount.size else None,
+            'median_discount_pct': _round(np.median(discount)) if discount.size else None,
+            'distribution': {
+                f'{low:g}-{high:g}%': int(count) for low, high, count in zip(edges[:-1], edges[1:], counts)
+            }
+        }
+
+    @staticmethod
+    def _rating_stats(rating: np.ndarray, review_count: np.ndarray) -> Dict:
+        rated = ~np.isnan(rating)
+        counts, edges = np.histogram(rating[rated], bins=RATING_BINS)
+        weights = review_count[rated]
+        return {
+            'rated_products': int(rated.sum()),
+            'mean_rating': _round(rating[rated].mean()) if rated.any() else None,
+            # Média ponderada pelo número de avaliações
+            'weighted_rating': _round(np.average(rating[rated], weights=weights)) if weights.sum() else None,
+            'histogram': {f'{low:g}-{high:g}': int(count) for low, high, count in zip(edges[:-1], edges[1:], counts)}
+        }
+
+    @staticmethod
+    def _group_stats(columns: Dict[str, np.ndarray], field: str, labels: List) -> Dict:
+        """Group-by vetorizado: contagem, preço médio/mediano e avaliação média"""
+        codes = columns[field]
+        if not codes.size:
+            return {}
+
+        price = columns['price']
+        rating = columns['rating']
+        groups = len(labels)
+        counts = np.bincount(codes, minlength=groups)
+        price_sums = np.bincount(codes, weights=price, minlength=groups)
+
+        rated = ~np.isnan(rating)
+        rated_counts = np.bincount(codes[rated], minlength=groups)
+        rating_sums = np.bincount(codes[rated], weights=rating[rated], minlength=groups)
+
+        # Medianas: ordenar por (grupo, preço) e pegar o meio de cada segmento
+        sorted_prices = price[np.lexsort((price, codes))]
+        ends = np.cumsum(counts)
+        starts = ends - counts
+
+        result = {}
+        for code in np.flatnonzero(counts):
+            count = counts[code]
+            segment = sorted_prices[starts[code]:ends[code]]
+            result[str(labels[code])] = {
+                'count': int(count),
+                'mean_price': _round(price_sums[code] / count),
+                'median_price': _round(np.median(segment)),
+                'min_price': _round(segment[0]),
+                'max_price': _round(segment[-1]),
+                'mean_rating': _round(rating_sums[code] / rated_counts[code]) if rated_counts[code] else None
+            }
+        return result
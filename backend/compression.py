@@ -0,0 +1,95 @@
+# =====================================================
+# Compressão de respostas (gzip/brotli) por Accept-Encoding
+# Arquivo: compression.py
+# =====================================================
+
+import gzip
+import os
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele, só gzip é oferecido
+    brotli = None
+
+# Respostas menores que isso não compensam o custo de comprimir
+MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+# Qualidade baixa: boa taxa com custo de CPU próximo ao do gzip
+BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+COMPRESSIBLE_MIMETYPES = frozenset(('application/json', 'text/html', 'text/plain'))
+
+
+def supported_encodings():
+    """Codificações oferecidas, em ordem de preferência do servidor"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """'gzip;q=0.8, br' -> {'gzip': 0.8, 'br': 1.0}"""
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[coding] = quality
+    return weights
+
+
+def negotiate_encoding(header: Optional[str]) -> Optional[str]:
+    """Melhor codificação aceita pelo cliente (None = sem compressão)"""
+    if not header:
+        return None
+
+    weights = parse_accept_encoding(header)
+    wildcard = weights.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for coding in supported_encodings():
+        quality = weights.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def compress_response(response, accept_encoding: Optional[str]):
+    """Comprime a resposta (werkzeug) se o tipo e o tamanho compensarem"""
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
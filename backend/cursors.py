@@ -0,0 +1,37 @@
+# =====================================================
+# Cursores opacos para paginação por keyset
+# Arquivo: cursors.py
+# =====================================================
+
+import base64
+import json
+from typing import Optional, Tuple
+
+# Chave da posição: (valor da ordenação, id)
+CursorKey = Tuple[float, str]
+
+
+class InvalidCursor(ValueError):
+    """Cursor malformado ou emitido para outra ordenação"""
+
+
+def encode_cursor(sort: str, key: CursorKey) -> str:
+    """Codifica (ordenação, valor, id) em base64 url-safe"""
+    payload = json.dumps([sort, key[0], key[1]], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor: Optional[str], sort: str) -> Optional[CursorKey]:
+    """Chave do cursor (None sem cursor); InvalidCursor se não servir para `sort`"""
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, product_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Cursor inválido')
+
+    if cursor_sort != sort or not isinstance(value, (int, float)) or not isinstance(product_id, str):
+        raise InvalidCursor('Cursor não corresponde à ordenação pedida')
+    return value, product_id
@@ -0,0 +1,185 @@
+# =====================================================
+# Planos de extração compilados (campo -> seletores -> pós-processador)
+# Arquivo: extraction_plan.py
+# =====================================================
+
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import soupsieve
+from bs4 import BeautifulSoup, Tag
+
+
+class FieldRule:
+    """Regra de um campo: seletores em ordem de preferência e pós-processador
+
+    Com `many=False`, vale o primeiro elemento (em ordem de documento) do
+    primeiro seletor cujo pós-processador retornar algo diferente de None.
+    Com `many=True`, o pós-processador recebe todos os elementos que casam
+    com qualquer seletor, em ordem de documento. `marker` é o par (início,
+    fim) de bytes do elemento no HTML cru: com os dois já recebidos, o
+    campo não depende do resto da página.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        selectors: Iterable[str],
+        process: Callable[[Any], Any],
+        default: Any = None,
+        many: bool = False,
+        marker: Optional[Tuple[bytes, bytes]] = None
+    ):
+        self.name = name
+        self.selectors = list(selectors)
+        self.compiled = [soupsieve.compile(selector) for selector in self.selectors]
+        self.process = process
+        self.default = default
+        self.many = many
+        self.marker = marker
+
+
+class ExtractionPlan:
+    """Conjunto de regras compilado uma vez e executado numa única passada
+
+    Em vez de um `select_one` por seletor (cada um percorrendo a árvore
+    desde a raiz), os elementos são visitados uma vez e testados contra os
+    seletores ainda pendentes. As estatísticas registram qual seletor
+    venceu em cada campo, para identificar seletores que nunca casam.
+    """
+
+    def __init__(self, name: str, rules: Iterable[FieldRule]):
+        self.name = name
+        self.rules = list(rules)
+        self.hits: Dict[str, List[int]] = {rule.name: [0] * len(rule.selectors) for rule in self.rules}
+        self.misses: Dict[str, int] = {rule.name: 0 for rule in self.rules}
+        self.runs = 0
+        self._lock = threading.Lock()
+
+    @property
+    def markers(self) -> Tuple[Tuple[bytes, bytes], ...]:
+        """Marcadores das regras (sem repetição), para encerrar a leitura da página
+
+        Vazio se alguma regra não tem marcador: sem ele não há como saber
+        quando o campo chegou, então a página é lida inteira.
+        """
+        if any(rule.marker is None for rule in self.rules):
+            return ()
+        return tuple(dict.fromkeys(rule.marker for rule in self.rules))
+
+    def run(self, soup: BeautifulSoup) -> Tuple[Dict[str, Any], Dict[str, Optional[int]]]:
+        """Extrai todos os campos; retorna (valores, seletor vencedor por campo)"""
+        single = [rule for rule in self.rules if not rule.many]
+        many = [rule for rule in self.rules if rule.many]
+
+        # Primeiro elemento de cada seletor dos campos simples
+        firsts: Dict[str, List[Optional[Tag]]] = {rule.name: [None] * len(rule.compiled) for rule in single}
+        pending = {rule.name: set(range(len(rule.compiled))) for rule in single}
+        collected: Dict[str, List[Tag]] = {rule.name: [] for rule in many}
+
+        for element in soup.descendants:
+            if not isinstance(element, Tag):
+                continue
+
+            for rule in single:
+                indexes = pending[rule.name]
+                if not indexes:
+                    continue
+                for index in tuple(indexes):
+                    if rule.compiled[index].match(element):
+                        firsts[rule.name][index] = element
+                        indexes.discard(index)
+
+            for rule in many:
+                if any(selector.match(element) for selector in rule.compiled):
+                    collected[rule.name].append(element)
+
+        values: Dict[str, Any] = {}
+        winners: Dict[str, Optional[int]] = {}
+
+        for rule in single:
+            values[rule.name] = rule.default
+            winners[rule.name] = None
+            for index, element in enumerate(firsts[rule.name]):
+                if element is None:
+                    continue
+                value = rule.process(element)
+                if value is not None:
+                    values[rule.name] = value
+                    winners[rule.name] = index
+                    break
+
+        for rule in many:
+            elements = collected[rule.name]
+            values[rule.name] = rule.process(elements) if elements else rule.default
+            winners[rule.name] = 0 if elements else None
+
+        return values, winners
+
+    def record(self, winners: Dict[str, Optional[int]]):
+        """Acumula nas estatísticas o resultado de uma execução"""
+        with self._lock:
+            self.runs += 1
+            for field, index in winners.items():
+                if field not in self.hits:
+                    continue
+                if index is None:
+                    self.misses[field] += 1
+                else:
+                    self.hits[field][index] += 1
+
+    def stats(self) -> Dict:
+        """Taxa de acerto por campo e por seletor"""
+        with self._lock:
+            runs = self.runs
+            fields = {}
+            for rule in self.rules:
+                hits = self.hits[rule.name]
+                fields[rule.name] = {
+                    'hit_rate': round(sum(hits) / runs, 4) if runs else None,
+                    'misses': self.misses[rule.name],
+                    'selectors': {
+                        selector: {'hits': count, 'hit_rate': round(count / runs, 4) if runs else None}
+                        for selector, count in zip(rule.selectors, hits)
+                    }
+                }
+            return {'runs': runs, 'fields': fields}
+
+
+class MarkerTracker:
+    """Acompanha, num corpo recebido aos pedaços, quais marcadores já estão completos
+
+    Um marcador (início, fim) está completo quando o início apareceu e o
+    fim apareceu depois dele. Cada `feed` só procura nos bytes novos (com
+    sobreposição do tamanho do marcador), então o custo total é linear no
+    tamanho do corpo.
+    """
+
+    def __init__(self, markers: Sequence[Tuple[bytes, bytes]]):
+        # [início, fim, posição de busca, início já encontrado]
+        self.pending = [[start, end, 0, False] for start, end in markers]
+
+    @property
+    def complete(self) -> bool:
+        return not self.pending
+
+    def feed(self, body: bytearray) -> bool:
+        """Atualiza com o corpo acumulado até agora; True se todos estão completos"""
+        remaining = []
+        for state in self.pending:
+            start, end, position, started = state
+            if not started:
+                found = body.find(start, position)
+                if found == -1:
+                    state[2] = max(len(body) - len(start) + 1, position)
+                    remaining.append(state)
+                    continue
+                state[2] = position = found + len(start)
+                state[3] = True
+
+            found = body.find(end, position)
+            if found == -1:
+                state[2] = max(len(body) - len(end) + 1, position)
+                remaining.append(state)
+        self.pending = remaining
+        return not remaining
@@ -0,0 +1,129 @@
+# =====================================================
+# Backend de parsing HTML (lxml + SoupStrainer)
+# Arquivo: html_parsing.py
+# =====================================================
+
+import logging
+import os
+from typing import Dict, Iterable, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+# Parser preferido (lxml é bem mais rápido); html.parser é o fallback puro Python
+DEFAULT_PARSER = os.environ.get('SCRAPER_HTML_PARSER', 'lxml')
+FALLBACK_PARSER = 'html.parser'
+
+
+def _parser_available(parser: str) -> bool:
+    try:
+        BeautifulSoup('<p></p>', parser)
+        return True
+    except Exception:
+        return False
+
+
+class SubtreeStrainer(SoupStrainer):
+    """Mantém só as subárvores cujo elemento raiz casa com tag, id, classe ou atributo
+
+    O SoupStrainer padrão combina os critérios com E; aqui qualquer um
+    basta. Elementos aninhados num elemento mantido são preservados, então
+    seletores como '#feature-bullets li span' continuam funcionando.
+    """
+
+    def __init__(
+        self,
+        tags: Iterable[str] = (),
+        ids: Iterable[str] = (),
+        classes: Iterable[str] = (),
+        attrs: Optional[Dict[str, str]] = None
+    ):
+        super().__init__()
+        self.keep_tags = frozenset(tags)
+        self.keep_ids = frozenset(ids)
+        self.keep_classes = frozenset(classes)
+        self.keep_attrs = dict(attrs or {})
+
+    def keeps(self, name: str, attrs: Dict) -> bool:
+        if name in self.keep_tags:
+            return True
+        if not attrs:
+            return False
+        if attrs.get('id') in self.keep_ids:
+            return True
+
+        classes = attrs.get('class')
+        if classes:
+            if isinstance(classes, str):
+                classes = classes.split()
+            if not self.keep_classes.isdisjoint(classes):
+                return True
+
+        return any(attrs.get(attr) == value for attr, value in self.keep_attrs.items())
+
+    # bs4 >= 4.13
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        return self.keeps(name, attrs)
+
+    def allow_string_creation(self, string) -> bool:
+        return False
+
+    # bs4 < 4.13
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        return self.keeps(markup_name, markup_attrs)
+
+
+# Subárvores consultadas pelos extratores de cada marketplace
+STRAINERS = {
+    'amazon': SubtreeStrainer(
+        tags=('h1',),
+        ids=(
+            'productTitle', 'landingImage', 'imgBlkFront', 'acrCustomerReviewText',
+            'feature-bullets', 'productDescription', 'productDetails_techSpec_section_1',
+            'sellerProfileTriggerId', 'availability'
+        ),
+        classes=(
+            'product-title', 'a-price', 'a-price-whole', 'a-offscreen', 'a-text-price',
+            'a-dynamic-image', 'a-button-thumbnail', 'a-icon-alt', 'a-unordered-list'
+        )
+    ),
+    'shopee': SubtreeStrainer(
+        tags=('h1', 'script'),
+        classes=('product-price', 'price'),
+        attrs={'data-testid': 'price'}
+    ),
+}
+
+
+class HtmlParser:
+    """Cria árvores BeautifulSoup com o parser configurado e parsing restrito"""
+
+    def __init__(self, parser: str = DEFAULT_PARSER, use_strainers: bool = True):
+        if parser != FALLBACK_PARSER and not _parser_available(parser):
+            logger.warning(f"HTML parser {parser} unavailable, falling back to {FALLBACK_PARSER}")
+            parser = FALLBACK_PARSER
+        self.parser = parser
+        self.use_strainers = use_strainers
+
+    def parse(self, content, marketplace: Optional[str] = None, encoding: Optional[str] = None) -> BeautifulSoup:
+        """Faz o parsing do HTML, limitado às subárvores usadas pelo marketplace"""
+        strainer = STRAINERS.get(marketplace) if self.use_strainers else None
+        if isinstance(content, str):
+            encoding = None
+
+        try:
+            return BeautifulSoup(content, self.parser, parse_only=strainer, from_encoding=encoding)
+        except Exception as e:
+            if self.parser == FALLBACK_PARSER:
+                raise
+            logger.warning(f"{self.parser} failed ({str(e)}), retrying with {FALLBACK_PARSER}")
+            return BeautifulSoup(content, FALLBACK_PARSER, parse_only=strainer, from_encoding=encoding)
+
+
+default_parser = HtmlParser()
+
+
+def make_soup(content, marketplace: Optional[str] = None, encoding: Optional[str] = None) -> BeautifulSoup:
+    """Atalho para o parser padrão do processo"""
+    return default_parser.parse(content, marketplace, encoding)
@@ -0,0 +1,236 @@
+# =====================================================
+# Fila persistente de jobs de scraping (SQLite)
+# Arquivo: job_queue.py
+# =====================================================
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from json_backend import dumps, loads
+
+# Espera por um lock de escrita de outro processo (ms)
+BUSY_TIMEOUT_MS = 5000
+
+# Tentativas por job e espera antes da nova tentativa (dobra a cada falha)
+MAX_ATTEMPTS = 3
+RETRY_BASE_DELAY = 5.0
+RETRY_MAX_DELAY = 300.0
+
+# Tempo de posse de um job; se o worker morrer, volta para a fila depois disto
+LEASE_SECONDS = 300.0
+
+# Jobs concluídos mantidos para consulta
+FINISHED_RETAINED_SECONDS = 7 * 86400
+PRUNE_INTERVAL = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_jobs (
+    id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result BLOB,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS scrape_jobs_queued ON scrape_jobs (status, available_at);
+"""
+
+INSERT_JOB = """
+INSERT INTO scrape_jobs (id, url, status, max_attempts, available_at, created_at)
+VALUES (?, ?, 'queued', ?, ?, ?)
+"""
+
+# Um só UPDATE: dois workers nunca pegam o mesmo job
+CLAIM_JOB = """
+UPDATE scrape_jobs
+SET status = 'running', attempts = attempts + 1, lease_until = :lease_until, worker = :worker,
+    started_at = :now, error = NULL
+WHERE id = (
+    SELECT id FROM scrape_jobs
+    WHERE (status = 'queued' AND available_at <= :now)
+       OR (status = 'running' AND lease_until < :now AND attempts < max_attempts)
+    ORDER BY available_at
+    LIMIT 1
+)
+RETURNING id, url, attempts, max_attempts
+"""
+
+# Prazo vencido na última tentativa: o worker morreu (ou travou) em todas
+EXPIRE_JOBS = """
+UPDATE scrape_jobs SET status = 'failed', error = :error, finished_at = :now, lease_until = NULL
+WHERE status = 'running' AND lease_until < :now AND attempts >= max_attempts
+"""
+
+LEASE_EXPIRED_ERROR = 'Prazo do job vencido sem resposta do worker'
+
+COMPLETE_JOB = """
+UPDATE scrape_jobs SET status = 'done', result = ?, finished_at = ?, lease_until = NULL
+WHERE id = ? AND worker = ?
+"""
+
+RETRY_JOB = """
+UPDATE scrape_jobs SET status = 'queued', available_at = ?, error = ?, lease_until = NULL
+WHERE id = ? AND worker = ?
+"""
+
+FAIL_JOB = """
+UPDATE scrape_jobs SET status = 'failed', error = ?, finished_at = ?, lease_until = NULL
+WHERE id = ? AND worker = ?
+"""
+
+SELECT_JOB = """
+SELECT id, url, status, attempts, max_attempts, available_at, created_at, started_at, finished_at, result, error
+FROM scrape_jobs WHERE id = ?
+"""
+
+SELECT_STATUS = 'SELECT status, attempts FROM scrape_jobs WHERE id = ?'
+
+NEXT_AVAILABLE = """
+SELECT min(CASE WHEN status = 'queued' THEN available_at ELSE lease_until END)
+FROM scrape_jobs WHERE status IN ('queued', 'running')
+"""
+
+COUNT_BY_STATUS = 'SELECT status, count(*) FROM scrape_jobs GROUP BY status'
+
+PRUNE_FINISHED = "DELETE FROM scrape_jobs WHERE status IN ('done', 'failed') AND finished_at < ?"
+
+# Estados finais de um job
+FINISHED = ('done', 'failed')
+
+
+def iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.utcfromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+def retry_delay(attempts: int, base: float = RETRY_BASE_DELAY, maximum: float = RETRY_MAX_DELAY) -> float:
+    """Espera antes da tentativa seguinte à `attempts`-ésima"""
+    return min(maximum, base * 2 ** (attempts - 1))
+
+
+class ScrapeJobQueue:
+    """Fila de scraping gravada em SQLite (WAL), compartilhada entre processos
+
+    A API enfileira (`enqueue`) e responde na hora; workers de outro
+    processo pegam jobs com `claim`, que marca o job como em execução por
+    um prazo (lease). Falhas voltam para a fila com espera exponencial até
+    `max_attempts`; um job cujo worker morreu volta quando o prazo vence,
+    ou falha se aquela já era a última tentativa.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._finished = 0
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão da thread atual (reaberta após um fork)"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    # ---------------------------------------------
+    # Produtor (API)
+    # ---------------------------------------------
+
+    def enqueue(self, url: str, max_attempts: int = MAX_ATTEMPTS) -> str:
+        """Enfileira o scraping de `url` e retorna o id do job"""
+        job_id = f"job_{uuid.uuid4().hex}"
+        now = time.time()
+        self._connection().execute(INSERT_JOB, (job_id, url, max_attempts, now, now))
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self._connection().execute(SELECT_JOB, (job_id,)).fetchone()
+        if row is None:
+            return None
+        job_id, url, status, attempts, max_attempts, available_at, created_at, started_at, finished_at, result, error = row
+        job = {
+            'id': job_id,
+            'url': url,
+            'status': status,
+            'attempts': attempts,
+            'max_attempts': max_attempts,
+            'created_at': iso(created_at),
+            'started_at': iso(started_at),
+            'finished_at': iso(finished_at),
+            'error': error
+        }
+        if status == 'queued' and attempts:
+            job['retry_at'] = iso(available_at)
+        if result is not None:
+            job['result'] = loads(result)
+        return job
+
+    def status(self, job_id: str) -> Optional[tuple]:
+        """(status, tentativas) sem carregar o resultado"""
+        return self._connection().execute(SELECT_STATUS, (job_id,)).fetchone()
+
+    def counts(self) -> Dict[str, int]:
+        counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+        counts.update(self._connection().execute(COUNT_BY_STATUS).fetchall())
+        return counts
+
+    # ---------------------------------------------
+    # Consumidor (workers)
+    # ---------------------------------------------
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """Pega o próximo job disponível, ou None se não houver"""
+        now = time.time()
+        connection = self._connection()
+        if connection.execute(EXPIRE_JOBS, {'now': now, 'error': LEASE_EXPIRED_ERROR}).rowcount:
+            self._maybe_prune()
+        row = connection.execute(
+            CLAIM_JOB, {'now': now, 'lease_until': now + self.lease_seconds, 'worker': worker}
+        ).fetchone()
+        if row is None:
+            return None
+        job_id, url, attempts, max_attempts = row
+        return {'id': job_id, 'url': url, 'attempts': attempts, 'max_attempts': max_attempts}
+
+    def next_available_in(self) -> Optional[float]:
+        """Segundos até algum job ficar disponível (None = fila vazia)"""
+        available_at = self._connection().execute(NEXT_AVAILABLE).fetchone()[0]
+        return None if available_at is None else max(available_at - time.time(), 0.0)
+
+    def complete(self, job: Dict, worker: str, result: Dict):
+        self._connection().execute(COMPLETE_JOB, (dumps(result), time.time(), job['id'], worker))
+        self._maybe_prune()
+
+    def fail(self, job: Dict, worker: str, error: str) -> bool:
+        """Registra a falha; True se o job voltou para a fila"""
+        now = time.time()
+        if job['attempts'] < job['max_attempts']:
+            self._connection().execute(
+                RETRY_JOB, (now + retry_delay(job['attempts']), error, job['id'], worker)
+            )
+            return True
+        self._connection().execute(FAIL_JOB, (error, now, job['id'], worker))
+        self._maybe_prune()
+        return False
+
+    def _maybe_prune(self):
+        self._finished += 1
+        if self._finished >= PRUNE_INTERVAL:
+            self._finished = 0
+            self._connection().execute(PRUNE_FINISHED, (time.time() - FINISHED_RETAINED_SECONDS,))
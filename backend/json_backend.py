@@ -0,0 +1,71 @@
+# =====================================================
+# Backend de serialização JSON (orjson com fallback para json)
+# Arquivo: json_backend.py
+# =====================================================
+
+import json
+import os
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele, usa o json da biblioteca padrão
+    orjson = None
+
+from product_record import json_default
+
+# 'orjson' ou 'json'; orjson só é usado se estiver instalado
+JSON_BACKEND = os.environ.get('JSON_BACKEND', 'orjson')
+
+# Chaves não-string (ex.: None em contagens) viram string, como no json
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if orjson else 0
+
+
+def default(obj: Any) -> Any:
+    """ProductRecord e coleções compartilhadas; demais tipos como no Flask"""
+    try:
+        return json_default(obj)
+    except TypeError:
+        return DefaultJSONProvider.default(obj)
+
+
+def use_orjson() -> bool:
+    return orjson is not None and JSON_BACKEND == 'orjson'
+
+
+def dumps(obj: Any) -> bytes:
+    """Serializa para JSON em UTF-8"""
+    if use_orjson():
+        return orjson.dumps(obj, default=default, option=ORJSON_OPTIONS)
+    return json.dumps(obj, ensure_ascii=False, default=default).encode('utf-8')
+
+
+def loads(data) -> Any:
+    if use_orjson():
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class ProductJSONProvider(DefaultJSONProvider):
+    """JSON provider do Flask usando o backend configurado
+
+    Serializa ProductRecord direto dos slots e gera o corpo da resposta em
+    bytes, sem passar por uma string intermediária.
+    """
+
+    def dumps(self, obj: Any, **kwargs) -> str:
+        if kwargs:
+            # Opções específicas do json (ex.: sort_keys): usar o provider padrão
+            return super().dumps(obj, default=default, **kwargs)
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
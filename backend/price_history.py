@@ -0,0 +1,353 @@
+# =====================================================
+# Histórico de preços por produto (séries compactas)
+# Arquivo: price_history.py
+# =====================================================
+
+import threading
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Resoluções: nome -> largura do período em segundos (None = amostras brutas)
+RESOLUTIONS = {
+    'raw': None,
+    'hour': 3600,
+    'day': 86400,
+    'week': 7 * 86400,
+}
+
+DAY = 86400
+
+# 1970-01-01 foi uma quinta: deslocamento para semanas começando na segunda
+WEEK_OFFSET_DAYS = 3
+
+# Preço original ausente
+NO_PRICE = -1
+
+# Maior preço aceito (centavos): inteiros exatos em float64, o tipo da soma diária
+MAX_CENTS = 2 ** 53
+
+
+def to_cents(value) -> Optional[int]:
+    """Preço em centavos; None se ausente, inválido ou acima de MAX_CENTS"""
+    try:
+        cents = round(float(value) * 100) if value is not None else None
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return cents if cents is not None and -MAX_CENTS <= cents <= MAX_CENTS else None
+
+
+def from_cents(cents: int) -> Optional[float]:
+    return None if cents == NO_PRICE else cents / 100
+
+
+def to_timestamp(value) -> Optional[int]:
+    """Segundos desde a época; datas sem fuso são tratadas como UTC"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp())
+    return None
+
+
+def iso_strings(timestamps: np.ndarray) -> List[str]:
+    """Instantes (segundos, UTC) no formato isoformat() usado pela API"""
+    return np.datetime_as_string(timestamps.astype('datetime64[s]')).tolist()
+
+
+class PriceSeries:
+    """Amostras de preço de um produto em colunas `array`
+
+    Cada instante é gravado como deslocamento (uint32, em segundos) em
+    relação a `base`, o instante da primeira amostra, e não como diferença
+    para a amostra anterior. Os preços são inteiros em centavos (int64,
+    sem teto prático de preço): 12 bytes por amostra. O preço original,
+    que raramente muda, só é gravado quando muda (posição da amostra e
+    valor). Um rollup diário (mínimo, máximo, soma, contagem e último) é
+    mantido a cada inserção, para consultas longas não percorrerem as
+    amostras brutas.
+    """
+
+    __slots__ = (
+        'base', 'offsets', 'prices', 'original_positions', 'original_values',
+        'days', 'day_min', 'day_max', 'day_sum', 'day_count', 'day_last'
+    )
+
+    def __init__(self, base: int):
+        self.base = base
+        self.offsets = array('I')
+        self.prices = array('q')
+        self.original_positions = array('I')
+        self.original_values = array('q')
+        self.days = array('I')
+        self.day_min = array('q')
+        self.day_max = array('q')
+        self.day_sum = array('d')
+        self.day_count = array('I')
+        self.day_last = array('q')
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return self.base + self.offsets[-1] if self.offsets else None
+
+    @property
+    def last_original_price(self) -> int:
+        return self.original_values[-1] if self.original_values else NO_PRICE
+
+    def nbytes(self) -> int:
+        columns = (
+            self.offsets, self.prices, self.original_positions, self.original_values, self.days,
+            self.day_min, self.day_max, self.day_sum, self.day_count, self.day_last
+        )
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def append(self, timestamp: int, price: int, original_price: int = NO_PRICE):
+        """Acrescenta uma amostra; o instante não pode ser anterior ao último"""
+        last = self.last_timestamp
+        if last is not None and timestamp < last:
+            raise ValueError('Amostra anterior à última da série')
+
+        if original_price != self.last_original_price:
+            self.original_positions.append(len(self.offsets))
+            self.original_values.append(original_price)
+        self.offsets.append(timestamp - self.base)
+        self.prices.append(price)
+
+        day = timestamp // DAY
+        if self.days and self.days[-1] == day:
+            self.day_min[-1] = min(self.day_min[-1], price)
+            self.day_max[-1] = max(self.day_max[-1], price)
+            self.day_sum[-1] += price
+            self.day_count[-1] += 1
+            self.day_last[-1] = price
+        else:
+            self.days.append(day)
+            self.day_min.append(price)
+            self.day_max.append(price)
+            self.day_sum.append(price)
+            self.day_count.append(1)
+            self.day_last.append(price)
+
+    # ---------------------------------------------
+    # Consulta (visões NumPy sobre os arrays, sem cópia)
+    # ---------------------------------------------
+
+    def raw(self, start: int, stop: int) -> Dict[str, np.ndarray]:
+        """Amostras com instante em [start, stop]"""
+        offsets = np.frombuffer(self.offsets, dtype=np.uint32)
+        low = np.searchsorted(offsets, max(start - self.base, 0), side='left')
+        high = np.searchsorted(offsets, max(stop - self.base + 1, 0), side='left')
+        # Preço original vigente em cada amostra: a última mudança até ela
+        values = np.frombuffer(self.original_values, dtype=np.int64)
+        if len(values):
+            positions = np.frombuffer(self.original_positions, dtype=np.uint32)
+            changes = np.searchsorted(positions, np.arange(low, high), side='right') - 1
+            original_price = np.where(changes >= 0, values[np.maximum(changes, 0)], NO_PRICE)
+        else:
+            original_price = np.full(high - low, NO_PRICE, dtype=np.int64)
+        return {
+            'timestamp': offsets[low:high].astype(np.int64) + self.base,
+            'price': np.frombuffer(self.prices, dtype=np.int64)[low:high],
+            'original_price': original_price,
+        }
+
+    def rollup(self, start: int, stop: int, width: int) -> Dict[str, np.ndarray]:
+        """Mínimo, máximo, média e último preço por período de `width` segundos
+
+        Períodos de um dia ou mais saem do rollup diário (dias que tocam o
+        intervalo); períodos menores são agregados das amostras brutas.
+        """
+        if width >= DAY:
+            days = np.frombuffer(self.days, dtype=np.uint32)
+            low = np.searchsorted(days, start // DAY, side='left')
+            high = np.searchsorted(days, stop // DAY, side='right')
+            days = days[low:high].astype(np.int64)
+            if width == DAY:
+                periods = days * DAY
+            else:
+                days_per_period = width // DAY
+                periods = ((days + WEEK_OFFSET_DAYS) // days_per_period * days_per_period - WEEK_OFFSET_DAYS) * DAY
+            return self._reduce(
+                periods,
+                np.frombuffer(self.day_min, dtype=np.int64)[low:high],
+                np.frombuffer(self.day_max, dtype=np.int64)[low:high],
+                np.frombuffer(self.day_sum, dtype=np.float64)[low:high],
+                np.frombuffer(self.day_count, dtype=np.uint32)[low:high].astype(np.int64),
+                np.frombuffer(self.day_last, dtype=np.int64)[low:high],
+            )
+
+        samples = self.raw(start, stop)
+        price = samples['price']
+        periods = samples['timestamp'] // width * width
+        return self._reduce(periods, price, price, price.astype(np.float64), np.ones(len(price), dtype=np.int64), price)
+
+    @staticmethod
+    def _reduce(periods, minimum, maximum, total, count, last) -> Dict[str, np.ndarray]:
+        """Agrega linhas consecutivas do mesmo período (entrada ordenada)"""
+        if not len(periods):
+            empty = np.zeros(0, dtype=np.int64)
+            return {'timestamp': empty, 'min': empty, 'max': empty, 'mean': empty.astype(float), 'last': empty, 'count': empty}
+
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+        ends = np.r_[starts[1:], len(periods)] - 1
+        counts = np.add.reduceat(count, starts)
+        return {
+            'timestamp': periods[starts],
+            'min': np.minimum.reduceat(minimum, starts),
+            'max': np.maximum.reduceat(maximum, starts),
+            'mean': np.add.reduceat(total, starts) / counts,
+            'last': last[ends],
+            'count': counts,
+        }
+
+
+class PriceHistory:
+    """Histórico append-only de preços, por produto
+
+    Registrado como listener do ProductStore, grava uma amostra sempre que
+    um produto é inserido ou atualizado, no instante de `updated_at` (ou
+    `scraped_at`/`created_at`). Amostras repetidas (mesmo instante e mesmos
+    preços, como nas reaplicações do catálogo) são ignoradas, e o histórico
+    sobrevive à remoção do produto.
+    """
+
+    def __init__(self):
+        self.series: Dict[str, PriceSeries] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def get(self, product_id: str) -> Optional[PriceSeries]:
+        return self.series.get(product_id)
+
+    def record(self, product_id: str, timestamp: int, price: int, original_price: int = NO_PRICE) -> bool:
+        """Grava uma amostra (preços em centavos); False se for repetida ou antiga"""
+        with self._lock:
+            series = self.series.get(product_id)
+            if series is None:
+                series = self.series[product_id] = PriceSeries(timestamp)
+            else:
+                last = series.last_timestamp
+                if timestamp < last:
+                    return False
+                if (
+                    timestamp == last and series.prices[-1] == price
+                    and series.last_original_price == original_price
+                ):
+                    return False
+            series.append(timestamp, price, original_price)
+            return True
+
+    def memory_usage(self) -> Dict[str, float]:
+        with self._lock:
+            samples = sum(len(series) for series in self.series.values())
+            nbytes = sum(series.nbytes() for series in self.series.values())
+        return {
+            'products': len(self.series),
+            'samples': samples,
+            'bytes': nbytes,
+            'bytes_per_sample': round(nbytes / samples, 2) if samples else None
+        }
+
+    # ---------------------------------------------
+    # Interface de listener do ProductStore
+    # ---------------------------------------------
+
+    def reset(self):
+        """Não esvazia: o histórico não pode ser refeito a partir do catálogo"""
+
+    def on_insert(self, product: Dict):
+        price = to_cents(product.get('price'))
+        if price is None:
+            return
+        timestamp = None
+        for field in ('updated_at', 'scraped_at', 'created_at'):
+            timestamp = to_timestamp(product.get(field))
+            if timestamp is not None:
+                break
+        if timestamp is None:
+            timestamp = int(datetime.now(timezone.utc).timestamp())
+
+        original_price = to_cents(product.get('original_price'))
+        self.record(product['id'], timestamp, price, NO_PRICE if original_price is None else original_price)
+
+    def on_delete(self, product: Dict):
+        pass
+
+    # ---------------------------------------------
+    # Consulta
+    # ---------------------------------------------
+
+    def query(
+        self,
+        product_id: str,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+        resolution: str = 'raw'
+    ) -> Optional[Tuple[List[Dict], Dict]]:
+        """Pontos do intervalo [start, stop] na resolução pedida e um resumo
+
+        Retorna None se o produto não tiver histórico.
+        """
+        width = RESOLUTIONS[resolution]
+        with self._lock:
+            series = self.series.get(product_id)
+            if series is None:
+                return None
+            start = series.base if start is None else start
+            stop = series.last_timestamp if stop is None else stop
+            if width is None:
+                columns = series.raw(start, stop)
+            else:
+                columns = series.rollup(start, stop, width)
+            # Copiar para fora do lock: as visões apontam para arrays que crescem
+            columns = {name: column.copy() for name, column in columns.items()}
+
+        if width is None:
+            points = [
+                {'timestamp': timestamp, 'price': from_cents(price), 'original_price': from_cents(original)}
+                for timestamp, price, original in zip(
+                    iso_strings(columns['timestamp']), columns['price'].tolist(), columns['original_price'].tolist()
+                )
+            ]
+            prices = columns['price']
+            low, high = (prices.min(), prices.max()) if prices.size else (None, None)
+        else:
+            points = [
+                {
+                    'timestamp': timestamp,
+                    'min': from_cents(minimum),
+                    'max': from_cents(maximum),
+                    'mean': round(mean / 100, 2),
+                    'last': from_cents(last),
+                    'samples': count
+                }
+                for timestamp, minimum, maximum, mean, last, count in zip(
+                    iso_strings(columns['timestamp']), columns['min'].tolist(), columns['max'].tolist(),
+                    columns['mean'].tolist(), columns['last'].tolist(), columns['count'].tolist()
+                )
+            ]
+            low = columns['min'].min() if columns['min'].size else None
+            high = columns['max'].max() if columns['max'].size else None
+
+        summary = {
+            'points': len(points),
+            'min_price': from_cents(int(low)) if low is not None else None,
+            'max_price': from_cents(int(high)) if high is not None else None,
+        }
+        return points, summary
@@ -0,0 +1,137 @@
+# =====================================================
+# Agregados do catálogo mantidos incrementalmente
+# Arquivo: product_aggregates.py
+# =====================================================
+
+import threading
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from product_store import sort_value
+
+# Limites das faixas de preço: [0-50), [50-100), [100-500), [500+)
+DEFAULT_PRICE_BUCKETS = (50, 100, 500)
+
+# Granularidades da linha do tempo: nome -> formato do período
+TIME_WINDOWS = {
+    'hour': '%Y-%m-%dT%H:00',
+    'day': '%Y-%m-%d',
+}
+
+
+def parse_price_buckets(value: Optional[str]) -> List[float]:
+    """Converte '50,100,500' nos limites das faixas de preço"""
+    if not value:
+        return list(DEFAULT_PRICE_BUCKETS)
+    return sorted(float(edge) for edge in value.split(',') if edge.strip())
+
+
+def bucket_labels(edges: Iterable[float]) -> List[str]:
+    """Rótulos das faixas: '0-50', '50-100', ..., '500+'"""
+    edges = list(edges)
+    bounds = [0] + edges
+    labels = [f'{low:g}-{high:g}' for low, high in zip(bounds, edges)]
+    labels.append(f'{bounds[-1]:g}+')
+    return labels
+
+
+class ProductAggregates:
+    """Contadores do dashboard atualizados a cada inserção/remoção no ProductStore
+
+    Registrado como listener, mantém as contagens por status, marketplace,
+    categoria, faixa de preço e período de criação, de modo que o dashboard
+    e a linha do tempo não precisam percorrer o catálogo.
+    """
+
+    def __init__(self, price_buckets: Iterable[float] = DEFAULT_PRICE_BUCKETS):
+        self.price_edges = sorted(price_buckets)
+        self.price_labels = bucket_labels(self.price_edges)
+        self.total = 0
+        self.statuses: Counter = Counter()
+        self.marketplaces: Counter = Counter()
+        self.categories: Counter = Counter()
+        self.price_ranges: List[int] = [0] * len(self.price_labels)
+        self.windows: Dict[str, Counter] = {window: Counter() for window in TIME_WINDOWS}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Zera os contadores (o ProductStore repovoa via on_insert)"""
+        with self._lock:
+            self.total = 0
+            self.statuses.clear()
+            self.marketplaces.clear()
+            self.categories.clear()
+            self.price_ranges = [0] * len(self.price_labels)
+            for counter in self.windows.values():
+                counter.clear()
+
+    def on_insert(self, product: Dict):
+        self._apply(product, 1)
+
+    def on_delete(self, product: Dict):
+        self._apply(product, -1)
+
+    def _apply(self, product: Dict, delta: int):
+        created_at = self._created_at(product)
+        price_bucket = bisect_right(self.price_edges, sort_value(product, 'price'))
+
+        with self._lock:
+            self.total += delta
+            self.price_ranges[price_bucket] += delta
+            self._count(self.statuses, product.get('status'), delta)
+            self._count(self.marketplaces, product.get('marketplace', 'unknown'), delta)
+            self._count(self.categories, product.get('category', 'uncategorized'), delta)
+
+            if created_at is not None:
+                for window, period_format in TIME_WINDOWS.items():
+                    self._count(self.windows[window], created_at.strftime(period_format), delta)
+
+    @staticmethod
+    def _count(counter: Counter, key, delta: int):
+        count = counter[key] + delta
+        if count:
+            counter[key] = count
+        else:
+            # Chaves zeradas somem, como se o catálogo fosse recontado
+            del counter[key]
+
+    @staticmethod
+    def _created_at(product: Dict) -> Optional[datetime]:
+        created_at = product.get('created_at')
+        if isinstance(created_at, datetime):
+            return created_at
+        try:
+            return datetime.fromisoformat(created_at)
+        except (TypeError, ValueError):
+            return None
+
+    def dashboard(self) -> Dict:
+        """Resumo no formato de /api/analytics/dashboard"""
+        with self._lock:
+            active_products = self.statuses.get('active', 0)
+            return {
+                'summary': {
+                    'total_products': self.total,
+                    'active_products': active_products,
+                    'inactive_products': self.total - active_products
+                },
+                'marketplaces': dict(self.marketplaces),
+                'categories': dict(self.categories),
+                'price_ranges': dict(zip(self.price_labels, self.price_ranges))
+            }
+
+    def timeline(self, window: str = 'day', limit: Optional[int] = None) -> List[Dict]:
+        """Produtos adicionados por período (mais recentes por último)
+
+        Conta os produtos ainda presentes no catálogo pelo `created_at`;
+        com `limit`, só os `limit` períodos mais recentes (ValueError se < 1).
+        """
+        if limit is not None and limit < 1:
+            raise ValueError('limit deve ser um inteiro positivo')
+        with self._lock:
+            periods = sorted(self.windows[window].items())
+        if limit is not None:
+            periods = periods[-limit:]
+        return [{'period': period, 'count': count} for period, count in periods]
@@ -0,0 +1,116 @@
+# =====================================================
+# Importação de produtos em lote (JSON ou NDJSON)
+# Arquivo: product_ingest.py
+# =====================================================
+
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from json_backend import loads
+
+REQUIRED_FIELDS = ('title', 'price', 'marketplace')
+
+# Campos indexados por valor: só texto (ou ausentes)
+TEXT_FIELDS = ('category', 'status')
+
+# Valores aplicados só a produtos criados (numa atualização, fica o gravado)
+INSERT_DEFAULTS = {'status': 'active'}
+
+
+class InvalidBulkBody(ValueError):
+    """Corpo que não é um array JSON, {"products": [...]} nem NDJSON"""
+
+
+class InvalidRecord:
+    """Registro que não pôde nem ser lido (ex.: linha NDJSON malformada)"""
+
+    __slots__ = ('error',)
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def new_product_id() -> str:
+    """Id único entre processos (não depende do tamanho do catálogo)"""
+    return f"prod_{int(datetime.utcnow().timestamp())}_{uuid.uuid4().hex[:12]}"
+
+
+def parse_bulk_body(body: bytes, ndjson: bool) -> List[Any]:
+    """Registros do corpo; linhas NDJSON inválidas viram um InvalidRecord no lugar"""
+    if ndjson:
+        records = []
+        for line_number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                records.append(loads(line))
+            except ValueError:
+                records.append(InvalidRecord(f'JSON inválido na linha {line_number}'))
+        return records
+
+    try:
+        data = loads(body)
+    except ValueError:
+        raise InvalidBulkBody('JSON inválido')
+    if isinstance(data, dict):
+        data = data.get('products')
+    if not isinstance(data, list):
+        raise InvalidBulkBody('Envie um array de produtos ou NDJSON')
+    return data
+
+
+def validate_record(record: Any) -> Optional[str]:
+    """Mensagem de erro do registro, ou None se ele puder ser gravado"""
+    if isinstance(record, InvalidRecord):
+        return record.error
+    if not isinstance(record, dict):
+        return 'Registro deve ser um objeto'
+
+    for field in REQUIRED_FIELDS:
+        if record.get(field) is None:
+            return f'Campo {field} é obrigatório'
+
+    price = record['price']
+    if isinstance(price, bool) or not isinstance(price, (int, float)) or price < 0:
+        return 'Campo price deve ser um número não negativo'
+    if not isinstance(record['marketplace'], str):
+        return 'Campo marketplace deve ser texto'
+    for field in TEXT_FIELDS:
+        if record.get(field) is not None and not isinstance(record[field], str):
+            return f'Campo {field} deve ser texto'
+
+    marketplace_id = record.get('marketplace_id')
+    if marketplace_id is not None and (isinstance(marketplace_id, bool) or not isinstance(marketplace_id, (str, int))):
+        return 'Campo marketplace_id deve ser texto'
+    return None
+
+
+def prepare_records(records: List[Any]) -> Tuple[List[Tuple[int, Dict]], List[Dict]]:
+    """Valida o lote numa passada e completa os metadados dos válidos
+
+    Retorna [(posição, produto)] dos válidos e os resultados de erro. Os
+    INSERT_DEFAULTS não entram aqui: são passados ao `upsert_many`, que só
+    os aplica aos produtos criados.
+    """
+    now = datetime.utcnow().isoformat()
+    valid: List[Tuple[int, Dict]] = []
+    errors: List[Dict] = []
+
+    for position, record in enumerate(records):
+        error = validate_record(record)
+        if error:
+            errors.append({'index': position, 'status': 'error', 'error': error})
+            continue
+
+        product = dict(record)
+        if product.get('marketplace_id') is not None:
+            product['marketplace_id'] = str(product['marketplace_id'])
+        product.update({
+            'id': new_product_id(),
+            'created_at': now,
+            'updated_at': now
+        })
+        valid.append((position, product))
+
+    return valid, errors
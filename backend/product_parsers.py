@@ -0,0 +1,458 @@
+# =====================================================
+# Extração de dados de produtos a partir do HTML
+# Arquivo: product_parsers.py
+#
+# Funções puras (sem I/O nem estado), para poderem rodar num
+# ProcessPoolExecutor sem bloquear o event loop do scraper.
+# =====================================================
+
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Union
+
+from bs4 import BeautifulSoup
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele, usa json.JSONDecoder
+    orjson = None
+
+from extraction_plan import ExtractionPlan, FieldRule
+from html_parsing import make_soup
+
+logger = logging.getLogger(__name__)
+
+# Processos de parsing, um por núcleo (0 = parsing no próprio processo, sem pool)
+PARSE_WORKERS = int(os.environ.get('SCRAPER_PARSE_WORKERS', os.cpu_count() or 1))
+
+# Estado inicial em JSON embutido nas páginas da Shopee
+INITIAL_STATE_MARKER = b'window.__INITIAL_STATE__'
+INITIAL_STATE_START_RE = re.compile(rb'\s*=\s*\{')
+JSON_DECODER = json.JSONDecoder()
+
+# Expressões dos pós-processadores, compiladas uma vez
+PRICE_RE = re.compile(r'[\d,]+\.?\d*')
+RATING_RE = re.compile(r'(\d+\.?\d*)')
+INTEGER_RE = re.compile(r'(\d+)')
+
+
+@dataclass
+class ProductData:
+    """Estrutura de dados do produto extraído"""
+    title: str
+    price: float
+    original_price: Optional[float] = None
+    description: str = ""
+    image_url: str = ""
+    additional_images: List[str] = None
+    marketplace: str = ""
+    marketplace_id: str = ""
+    rating: Optional[float] = None
+    review_count: int = 0
+    is_in_stock: bool = True
+    specifications: Dict[str, str] = None
+    features: List[str] = None
+    seller_name: str = ""
+    seller_rating: Optional[float] = None
+    category: str = ""
+    shipping_info: Dict[str, Union[str, int, float]] = None
+
+    def __post_init__(self):
+        if self.additional_images is None:
+            self.additional_images = []
+        if self.specifications is None:
+            self.specifications = {}
+        if self.features is None:
+            self.features = []
+        if self.shipping_info is None:
+            self.shipping_info = {}
+
+
+def clean_text(element) -> str:
+    return element.get_text().strip()
+
+
+def parse_price(element) -> Optional[float]:
+    """Preço do texto do elemento; None faz o plano tentar o próximo seletor"""
+    price_match = PRICE_RE.search(element.get_text().strip().replace(',', ''))
+    if price_match:
+        return float(price_match.group())
+    return None
+
+
+def image_source(element) -> str:
+    return element.get('src') or element.get('data-src', '')
+
+
+def parse_rating(element) -> Optional[float]:
+    rating_match = RATING_RE.search(element.get_text())
+    return float(rating_match.group(1)) if rating_match else None
+
+
+def parse_review_count(element) -> Optional[int]:
+    review_match = INTEGER_RE.search(element.get_text().replace(',', ''))
+    return int(review_match.group(1)) if review_match else None
+
+
+def parse_additional_images(elements) -> List[str]:
+    additional_images = []
+    for img in elements[:5]:  # Máximo 5 imagens adicionais
+        img_src = image_source(img)
+        if img_src and img_src not in additional_images:
+            additional_images.append(img_src)
+    return additional_images
+
+
+def parse_features(elements) -> List[str]:
+    features = []
+    for feature in elements[:10]:  # Máximo 10 features
+        feature_text = feature.get_text().strip()
+        if feature_text and len(feature_text) > 10:
+            features.append(feature_text)
+    return features
+
+
+def parse_specifications(spec_table) -> Dict[str, str]:
+    specifications = {}
+    for row in spec_table.find_all('tr'):
+        cells = row.find_all('td')
+        if len(cells) == 2:
+            specifications[cells[0].get_text().strip()] = cells[1].get_text().strip()
+    return specifications
+
+
+def parse_in_stock(element) -> bool:
+    stock_text = element.get_text().lower()
+    return not ('indisponível' in stock_text or 'fora de estoque' in stock_text)
+
+
+# Plano de extração da Amazon, compilado uma vez na importação
+AMAZON_PLAN = ExtractionPlan('amazon', [
+    FieldRule(
+        'title', ['#productTitle', '.product-title', 'h1.a-size-large'], clean_text, default='',
+        marker=(b'id="productTitle"', b'</span>')
+    ),
+    FieldRule(
+        'price', ['.a-price-whole', '.a-offscreen', '.a-price .a-offscreen'], parse_price, default=0.0,
+        marker=(b'class="a-price-whole"', b'</span>')
+    ),
+    FieldRule(
+        'original_price', ['.a-text-price .a-offscreen'], parse_price,
+        marker=(b'a-text-price', b'</span>')
+    ),
+    FieldRule(
+        'image_url', ['#landingImage', '.a-dynamic-image', '#imgBlkFront'], image_source, default='',
+        marker=(b'id="landingImage"', b'>')
+    ),
+    FieldRule(
+        'additional_images', ['.a-button-thumbnail img'], parse_additional_images, many=True,
+        marker=(b'id="altImages"', b'</ul>')
+    ),
+    FieldRule('rating', ['.a-icon-alt'], parse_rating, marker=(b'class="a-icon-alt"', b'</span>')),
+    FieldRule(
+        'review_count', ['#acrCustomerReviewText'], parse_review_count, default=0,
+        marker=(b'id="acrCustomerReviewText"', b'</span>')
+    ),
+    FieldRule(
+        'description',
+        ['#feature-bullets ul', '#productDescription', '.a-unordered-list.a-vertical'],
+        lambda element: element.get_text().strip()[:1000],  # Limitar tamanho
+        default='',
+        marker=(b'id="feature-bullets"', b'</ul>')
+    ),
+    FieldRule(
+        'features', ['#feature-bullets li span.a-list-item'], parse_features, many=True,
+        marker=(b'id="feature-bullets"', b'</ul>')
+    ),
+    FieldRule(
+        'specifications', ['#productDetails_techSpec_section_1'], parse_specifications,
+        marker=(b'id="productDetails_techSpec_section_1"', b'</table>')
+    ),
+    FieldRule(
+        'seller_name', ['#sellerProfileTriggerId'], clean_text, default='',
+        marker=(b'id="sellerProfileTriggerId"', b'</a>')
+    ),
+    FieldRule(
+        'is_in_stock', ['#availability span'], parse_in_stock, default=True,
+        marker=(b'id="availability"', b'</span>')
+    ),
+])
+
+# Fallback HTML da Shopee (quando não há estado inicial em JSON)
+SHOPEE_HTML_PLAN = ExtractionPlan('shopee_html', [
+    FieldRule('title', ['h1'], clean_text, default=''),
+    FieldRule('price', ['.product-price', '.price', '[data-testid="price"]'], parse_price, default=0.0),
+])
+
+EXTRACTION_PLANS = {plan.name: plan for plan in (AMAZON_PLAN, SHOPEE_HTML_PLAN)}
+
+# Marcadores que encerram a leitura da página de cada marketplace. Na
+# Shopee basta o estado inicial completo; sem ele, a página é lida inteira
+# para o fallback HTML.
+STREAM_MARKERS = {
+    'amazon': AMAZON_PLAN.markers,
+    'shopee': ((INITIAL_STATE_MARKER, b'</script'),),
+}
+
+
+def extract_amazon_page(soup: BeautifulSoup, asin: str) -> Tuple[Optional[ProductData], Dict]:
+    """Executa o plano da Amazon; retorna o produto e o seletor vencedor por campo"""
+
+    try:
+        values, winners = AMAZON_PLAN.run(soup)
+        return ProductData(marketplace='amazon', marketplace_id=asin, **values), winners
+
+    except Exception as e:
+        logger.error(f"Error scraping Amazon product {asin}: {str(e)}")
+        return None, {}
+
+
+def parse_amazon_page(soup: BeautifulSoup, asin: str) -> Optional[ProductData]:
+    """Extrai os dados do produto da árvore de uma página da Amazon"""
+    product, winners = extract_amazon_page(soup, asin)
+    AMAZON_PLAN.record(winners)
+    return product
+
+
+def extract_initial_state(html: Union[bytes, str], encoding: Optional[str] = None) -> Optional[Dict]:
+    """Lê o JSON de `window.__INITIAL_STATE__` direto do HTML, sem montar a árvore
+
+    Localiza o marcador nos bytes crus e decodifica só o objeto JSON que o
+    segue: com orjson, recortando até o fim do <script>; senão (ou se o
+    recorte não for JSON válido), com json.JSONDecoder.raw_decode, que para
+    no fim do objeto independente do que vem depois (ao contrário da regex
+    não-gulosa anterior, que cortava no primeiro '};').
+    """
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+        encoding = 'utf-8'
+
+    marker = html.find(INITIAL_STATE_MARKER)
+    if marker == -1:
+        return None
+
+    match = INITIAL_STATE_START_RE.match(html, marker + len(INITIAL_STATE_MARKER))
+    if not match:
+        return None
+    start = match.end() - 1
+
+    script_end = html.find(b'</script', start)
+    payload = html[start:script_end if script_end != -1 else len(html)]
+
+    if orjson is not None and (encoding or 'utf-8').lower().replace('-', '') == 'utf8':
+        try:
+            return orjson.loads(payload.rstrip().rstrip(b';'))
+        except orjson.JSONDecodeError:
+            pass
+
+    try:
+        data, _ = JSON_DECODER.raw_decode(html[start:].decode(encoding or 'utf-8', errors='replace'))
+    except (json.JSONDecodeError, LookupError):
+        return None
+    return data
+
+
+def extract_shopee_page(
+    html: Union[bytes, str],
+    product_id: str,
+    encoding: Optional[str] = None
+) -> Tuple[Optional[ProductData], Optional[str], Dict]:
+    """Extrai os dados do produto de uma página da Shopee
+
+    Usa o estado inicial em JSON da página; a árvore HTML só é montada no
+    fallback, quando o estado não está presente. Retorna (produto, plano
+    usado, seletores vencedores); o plano é None quando veio do JSON.
+    """
+
+    try:
+        # Shopee usa muito JavaScript, então vamos extrair os dados do JSON
+        data = extract_initial_state(html, encoding)
+        product_data = data.get('item') if isinstance(data, dict) else None
+
+        if not product_data:
+            # Fallback para scraping HTML tradicional
+            product, winners = extract_shopee_html(make_soup(html, 'shopee', encoding), product_id)
+            return product, SHOPEE_HTML_PLAN.name, winners
+
+        # Extrair dados do JSON
+        title = product_data.get('name', '')
+
+        # Preço (Shopee usa centavos)
+        price = 0.0
+        if 'price' in product_data:
+            price = product_data['price'] / 100000  # Converter de centavos
+
+        original_price = None
+        if 'price_before_discount' in product_data:
+            original_price = product_data['price_before_discount'] / 100000
+
+        # Imagens
+        image_url = ""
+        additional_images = []
+        if 'images' in product_data:
+            images = product_data['images']
+            if images:
+                image_url = f"https://cf.shopee.com.br/file/{images[0]}"
+                additional_images = [f"https://cf.shopee.com.br/file/{img}" for img in images[1:6]]
+
+        # Avaliação
+        rating = None
+        if 'item_rating' in product_data:
+            rating_data = product_data['item_rating']
+            if 'rating_star' in rating_data:
+                rating = rating_data['rating_star']
+
+        # Número de avaliações
+        review_count = 0
+        if 'cmt_count' in product_data:
+            review_count = product_data['cmt_count']
+
+        # Descrição
+        description = product_data.get('description', '')
+
+        # Vendedor
+        seller_name = ""
+        if 'shop_location' in product_data:
+            seller_name = product_data['shop_location']
+
+        # Status de estoque
+        is_in_stock = product_data.get('stock', 0) > 0
+
+        product = ProductData(
+            title=title,
+            price=price,
+            original_price=original_price,
+            description=description,
+            image_url=image_url,
+            additional_images=additional_images,
+            marketplace='shopee',
+            marketplace_id=product_id,
+            rating=rating,
+            review_count=review_count,
+            is_in_stock=is_in_stock,
+            seller_name=seller_name
+        )
+        return product, None, {}
+
+    except Exception as e:
+        logger.error(f"Error scraping Shopee product {product_id}: {str(e)}")
+        return None, None, {}
+
+
+def parse_shopee_page(html: Union[bytes, str], product_id: str, encoding: Optional[str] = None) -> Optional[ProductData]:
+    """Extrai os dados do produto de uma página da Shopee"""
+    product, plan_name, winners = extract_shopee_page(html, product_id, encoding)
+    record_extraction(plan_name, winners)
+    return product
+
+
+def extract_shopee_html(soup: BeautifulSoup, product_id: str) -> Tuple[Optional[ProductData], Dict]:
+    """Executa o plano do fallback HTML da Shopee"""
+
+    try:
+        values, winners = SHOPEE_HTML_PLAN.run(soup)
+        return ProductData(marketplace='shopee', marketplace_id=product_id, **values), winners
+
+    except Exception as e:
+        logger.error(f"Error in Shopee HTML fallback: {str(e)}")
+        return None, {}
+
+
+def parse_shopee_html(soup: BeautifulSoup, product_id: str) -> Optional[ProductData]:
+    """Fallback para scraping HTML da Shopee"""
+    product, winners = extract_shopee_html(soup, product_id)
+    SHOPEE_HTML_PLAN.record(winners)
+    return product
+
+
+def extract_product_page(
+    html: Union[bytes, str],
+    marketplace: str,
+    product_id: str,
+    encoding: Optional[str] = None
+) -> Tuple[Optional[ProductData], Optional[str], Dict]:
+    """Como parse_product_page, mas retorna (produto, plano usado, seletores vencedores)
+
+    Usada pelo pool de processos: as estatísticas dos planos são acumuladas
+    no processo principal, que recebe os vencedores de cada página.
+    """
+    if marketplace == 'amazon':
+        product, winners = extract_amazon_page(make_soup(html, marketplace, encoding), product_id)
+        return product, AMAZON_PLAN.name, winners
+    elif marketplace == 'shopee':
+        return extract_shopee_page(html, product_id, encoding)
+
+    return None, None, {}
+
+
+def record_extraction(plan_name: Optional[str], winners: Dict):
+    """Acumula as estatísticas de uma extração feita em outro processo"""
+    plan = EXTRACTION_PLANS.get(plan_name)
+    if plan is not None:
+        plan.record(winners)
+
+
+def extraction_stats() -> Dict:
+    return {name: plan.stats() for name, plan in EXTRACTION_PLANS.items()}
+
+
+def parse_product_page(
+    html: Union[bytes, str],
+    marketplace: str,
+    product_id: str,
+    encoding: Optional[str] = None
+) -> Optional[ProductData]:
+    """Faz o parsing da página e extrai o ProductData do marketplace
+
+    `encoding` é o charset declarado na resposta HTTP, quando `html` vem em
+    bytes; sem ele, o parser detecta pelo próprio documento.
+    """
+    product, plan_name, winners = extract_product_page(html, marketplace, product_id, encoding)
+    record_extraction(plan_name, winners)
+    return product
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_parse_executor() -> Optional[ProcessPoolExecutor]:
+    """Pool de processos de parsing do processo (None quando desativado)"""
+    global _executor
+
+    if PARSE_WORKERS <= 0:
+        return None
+
+    with _executor_lock:
+        if _executor is None:
+            # spawn: o processo principal tem threads (runtime, Flask) e fork não é seguro
+            _executor = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            atexit.register(shutdown_parse_executor)
+        return _executor
+
+
+def set_parse_workers(workers: int):
+    """Troca o tamanho do pool; o atual, se já iniciado, é encerrado"""
+    global PARSE_WORKERS
+
+    shutdown_parse_executor()
+    PARSE_WORKERS = workers
+
+
+def shutdown_parse_executor():
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
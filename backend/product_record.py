@@ -0,0 +1,192 @@
+# =====================================================
+# Registro compacto de produto (slots + strings internadas)
+# Arquivo: product_record.py
+# =====================================================
+
+import sys
+from collections.abc import MutableMapping
+from dataclasses import fields
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional
+
+# Campos guardados em slots (os demais vão para um dict extra, criado sob demanda)
+SLOT_FIELDS = (
+    'id', 'title', 'price', 'original_price', 'description', 'image_url',
+    'marketplace', 'marketplace_id', 'product_url', 'rating', 'review_count',
+    'is_in_stock', 'seller_name', 'seller_rating', 'category', 'status',
+    'is_featured', 'created_at', 'updated_at', 'scraped_at',
+    'additional_images', 'specifications', 'features', 'shipping_info'
+)
+SLOT_NAMES = frozenset(SLOT_FIELDS)
+
+# Campos de baixa cardinalidade: uma única cópia de cada valor no processo
+INTERNED_FIELDS = frozenset(('marketplace', 'category', 'status', 'seller_name'))
+
+# Coleções: listas viram tuplas e as vazias compartilham um único objeto
+LIST_FIELDS = frozenset(('additional_images', 'features'))
+DICT_FIELDS = frozenset(('specifications', 'shipping_info'))
+
+EMPTY_TUPLE = ()
+EMPTY_MAPPING = MappingProxyType({})
+
+
+class _Missing:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return 'MISSING'
+
+
+# Slot sem valor (chave ausente, diferente de None)
+MISSING = _Missing()
+
+
+def compact_value(field: str, value: Any) -> Any:
+    """Forma armazenada de um valor: internada, tupla ou coleção vazia compartilhada"""
+    if field in INTERNED_FIELDS:
+        return sys.intern(value) if type(value) is str else value
+    if field in LIST_FIELDS and isinstance(value, list):
+        return tuple(value) if value else EMPTY_TUPLE
+    if field in DICT_FIELDS and isinstance(value, dict) and not value:
+        return EMPTY_MAPPING
+    return value
+
+
+class ProductRecord(MutableMapping):
+    """Produto com a interface de um dict, sem um dict por instância
+
+    Os campos conhecidos ficam em slots e os desconhecidos num dict extra,
+    alocado só quando existe algum. Chaves ausentes são marcadas com
+    MISSING, então a serialização e `in` se comportam como no dict original.
+    Listas são guardadas como tuplas e não devem ser alteradas no lugar:
+    use `record[campo] = novo_valor`.
+    """
+
+    __slots__ = SLOT_FIELDS + ('_extra',)
+
+    def __init__(self, data: Mapping = None, **kwargs):
+        for field in SLOT_FIELDS:
+            object.__setattr__(self, field, MISSING)
+        self._extra = None
+        if data:
+            # Atribuição direta, sem o update() genérico do MutableMapping
+            for key, value in data.items():
+                self[key] = value
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def from_product_data(cls, product) -> 'ProductRecord':
+        """Converte um ProductData lendo os atributos, sem passar por `asdict`"""
+        record = cls()
+        for field in fields(product):
+            record[field.name] = getattr(product, field.name)
+        return record
+
+    # ---------------------------------------------
+    # Interface de mapeamento
+    # ---------------------------------------------
+
+    def __getitem__(self, key: str) -> Any:
+        if key in SLOT_NAMES:
+            value = getattr(self, key)
+            if value is not MISSING:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        if key in SLOT_NAMES:
+            setattr(self, key, compact_value(key, value))
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if key in SLOT_NAMES:
+            if getattr(self, key) is MISSING:
+                raise KeyError(key)
+            setattr(self, key, MISSING)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for field in SLOT_FIELDS:
+            if getattr(self, field) is not MISSING:
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        count = sum(1 for field in SLOT_FIELDS if getattr(self, field) is not MISSING)
+        return count + (len(self._extra) if self._extra is not None else 0)
+
+    def __contains__(self, key: object) -> bool:
+        if key in SLOT_NAMES:
+            return getattr(self, key) is not MISSING
+        return self._extra is not None and key in self._extra
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # Caminho rápido: usado pelos índices a cada inserção
+        if key in SLOT_NAMES:
+            value = getattr(self, key)
+            return default if value is MISSING else value
+        if self._extra is not None:
+            return self._extra.get(key, default)
+        return default
+
+    def copy(self) -> 'ProductRecord':
+        """Cópia rasa (os valores são compartilhados, como em dict.copy)"""
+        record = ProductRecord.__new__(ProductRecord)
+        for field in SLOT_FIELDS:
+            object.__setattr__(record, field, getattr(self, field))
+        record._extra = dict(self._extra) if self._extra is not None else None
+        return record
+
+    def __repr__(self) -> str:
+        return f'ProductRecord({self.to_json()!r})'
+
+    # ---------------------------------------------
+    # Serialização
+    # ---------------------------------------------
+
+    def to_json(self, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Dict raso para o encoder JSON (sem copiar os valores)
+
+        Com `fields`, só as chaves pedidas que existirem no registro.
+        """
+        if fields is not None:
+            return {field: self[field] for field in fields if field in self}
+
+        data = {}
+        for field in SLOT_FIELDS:
+            value = getattr(self, field)
+            if value is not MISSING:
+                data[field] = value
+        if self._extra is not None:
+            data.update(self._extra)
+        return data
+
+
+def project(product: Mapping, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Dict raso do produto com só os `fields` pedidos (todos quando None)"""
+    if isinstance(product, ProductRecord):
+        return product.to_json(fields)
+    if fields is None:
+        return dict(product)
+    return {field: product[field] for field in fields if field in product}
+
+
+def json_default(obj: Any) -> Any:
+    """`default` para json.dumps: registros e coleções compartilhadas"""
+    if isinstance(obj, ProductRecord):
+        return obj.to_json()
+    if isinstance(obj, MappingProxyType):
+        return dict(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
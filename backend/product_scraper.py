@@ -6,73 +6,115 @@
 import asyncio
 import aiohttp
 import json
+import os
 import re
 import time
-from typing import Dict, List, Optional, Union
-from dataclasses import dataclass, asdict
+from collections import defaultdict
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass
 from urllib.parse import urlparse, parse_qs
 from bs4 import BeautifulSoup
 from fake_useragent import UserAgent
 import logging
 
+from extraction_plan import MarkerTracker
+from product_parsers import (
+    STREAM_MARKERS, ProductData, extract_product_page, get_parse_executor, parse_product_page, parse_shopee_html,
+    record_extraction, shutdown_parse_executor
+)
+from product_record import ProductRecord
+from rate_limiter import BLOCK_STATUSES, THROTTLE_STATUSES, get_limiter, parse_retry_after
+from scrape_cache import CacheEntry, ScrapeCache
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
-class ProductData:
-    """Estrutura de dados do produto extraído"""
-    title: str
-    price: float
-    original_price: Optional[float] = None
-    description: str = ""
-    image_url: str = ""
-    additional_images: List[str] = None
-    marketplace: str = ""
-    marketplace_id: str = ""
-    rating: Optional[float] = None
-    review_count: int = 0
-    is_in_stock: bool = True
-    specifications: Dict[str, str] = None
-    features: List[str] = None
-    seller_name: str = ""
-    seller_rating: Optional[float] = None
-    category: str = ""
-    shipping_info: Dict[str, Union[str, int, float]] = None
+# Concorrência padrão do scraping em lote
+DEFAULT_BATCH_CONCURRENCY = 20
+DEFAULT_MARKETPLACE_CONCURRENCY = 5
+
+# Leitura do corpo aos pedaços, com teto de tamanho (bytes)
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_BODY_BYTES = int(os.environ.get('SCRAPER_MAX_BODY_BYTES', 8 * 1024 * 1024))
+
+# Parar de ler quando os marcadores do plano de extração já chegaram
+EARLY_STOP = os.environ.get('SCRAPER_EARLY_STOP', '1').lower() in ('1', 'true', 'yes')
 
-    def __post_init__(self):
-        if self.additional_images is None:
-            self.additional_images = []
-        if self.specifications is None:
-            self.specifications = {}
-        if self.features is None:
-            self.features = []
-        if self.shipping_info is None:
-            self.shipping_info = {}
+# Charset usado quando a resposta não declara um (evita a detecção pelo parser)
+MARKETPLACE_CHARSETS = {'amazon': 'utf-8', 'shopee': 'utf-8'}
+
+@dataclass
+class PageResponse:
+    """Resposta de uma página buscada, com validadores para revalidação"""
+    status: int
+    content: Optional[bytes] = None
+    encoding: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
 
 class ProductScraper:
     """Classe principal para scraping de produtos"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        max_connections: int = 10,
+        max_connections_per_host: int = 5,
+        dns_cache_ttl: int = 10,
+        keepalive_timeout: float = 15,
+        session: Optional[aiohttp.ClientSession] = None,
+        cache: Optional[ScrapeCache] = None,
+        parse_executor: Optional[Executor] = None,
+        max_body_bytes: int = MAX_BODY_BYTES,
+        early_stop: bool = EARLY_STOP
+    ):
         self.ua = UserAgent()
-        self.session = None
+        self.session = session
+        self.owns_session = session is None
         self.proxies = []  # Lista de proxies para rotação
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.cache = cache
+        # Sem executor explícito, usa o pool de processos global (SCRAPER_PARSE_WORKERS)
+        self.parse_executor = parse_executor
+        self.max_body_bytes = max_body_bytes
+        self.early_stop = early_stop
+    
+    async def open(self):
+        """Abre a sessão HTTP (pool de conexões com cache de DNS)"""
+        if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            timeout = aiohttp.ClientTimeout(total=30)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers={'User-Agent': self.ua.random}
+            )
+            self.owns_session = True
+        return self
+    
+    async def close(self):
+        """Fecha a sessão, se ela foi criada por este scraper"""
+        if self.session and self.owns_session:
+            await self.session.close()
+            self.session = None
         
     async def __aenter__(self):
         """Context manager para sessão async"""
-        connector = aiohttp.TCPConnector(limit=10, limit_per_host=5)
-        timeout = aiohttp.ClientTimeout(total=30)
-        self.session = aiohttp.ClientSession(
-            connector=connector,
-            timeout=timeout,
-            headers={'User-Agent': self.ua.random}
-        )
-        return self
+        return await self.open()
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Fechar sessão"""
-        if self.session:
-            await self.session.close()
+        await self.close()
     
     def detect_marketplace(self, url: str) -> Optional[str]:
         """Detecta o marketplace pela URL"""
@@ -111,10 +153,67 @@ class ProductScraper:
         
         return None
     
-    async def get_page_content(self, url: str, retries: int = 3) -> Optional[str]:
+    async def get_page_content(
+        self,
+        url: str,
+        retries: int = 3,
+        markers: Optional[Sequence[Tuple[bytes, bytes]]] = None
+    ) -> Optional[str]:
         """Obtém conteúdo da página com retry e rotação de headers"""
         
+        page = await self.fetch_page(url, retries, markers=markers)
+        if not page or page.status != 200:
+            return None
+        return page.content.decode(page.encoding or 'utf-8', errors='replace')
+    
+    async def read_body(
+        self,
+        response: aiohttp.ClientResponse,
+        markers: Optional[Sequence[Tuple[bytes, bytes]]] = None
+    ) -> bytes:
+        """Lê o corpo aos pedaços, até `max_body_bytes` ou até todos os marcadores chegarem
+        
+        Parar cedo descarta a conexão (o resto do corpo não é lido), mas
+        evita baixar os scripts enormes do fim das páginas.
+        """
+        
+        tracker = MarkerTracker(markers) if markers and self.early_stop else None
+        body = bytearray()
+        
+        async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+            body += chunk
+            if len(body) >= self.max_body_bytes:
+                logger.warning(f"Body of {response.url} truncated at {self.max_body_bytes} bytes")
+                del body[self.max_body_bytes:]
+                break
+            if tracker is not None and tracker.feed(body):
+                break
+        
+        return bytes(body)
+    
+    async def fetch_page(
+        self,
+        url: str,
+        retries: int = 3,
+        validators: Optional[Dict[str, str]] = None,
+        markers: Optional[Sequence[Tuple[bytes, bytes]]] = None
+    ) -> Optional[PageResponse]:
+        """Busca a página, opcionalmente com headers condicionais (ETag/Last-Modified)
+        
+        Retorna status 304 quando a página não mudou desde os validadores.
+        Cada requisição passa pelo limiter compartilhado do marketplace: 429/503
+        reduzem a taxa de todos os scrapes daquele site (respeitando Retry-After)
+        e bloqueios seguidos abrem o circuito, que falha rápido com
+        CircuitOpenError. Com `markers`, a leitura do corpo para assim que
+        todos eles chegaram (ver `read_body`).
+        """
+        
+        marketplace = self.detect_marketplace(url)
+        limiter = get_limiter(marketplace)
+        
         for attempt in range(retries):
+            await limiter.acquire()
+            
             try:
                 headers = {
                     'User-Agent': self.ua.random,
@@ -128,20 +227,41 @@ class ProductScraper:
                     'Sec-Fetch-Site': 'none',
                     'Cache-Control': 'max-age=0'
                 }
+                if validators:
+                    headers.update(validators)
                 
                 async with self.session.get(url, headers=headers) as response:
                     if response.status == 200:
-                        content = await response.text()
-                        return content
-                    elif response.status == 429:  # Rate limited
-                        wait_time = 2 ** attempt
-                        logger.warning(f"Rate limited, waiting {wait_time}s before retry")
-                        await asyncio.sleep(wait_time)
+                        # Bytes crus: a decodificação fica com o parser, fora do event loop
+                        content = await self.read_body(response, markers)
+                        limiter.record_success()
+                        return PageResponse(
+                            status=200,
+                            content=content,
+                            encoding=response.charset or MARKETPLACE_CHARSETS.get(marketplace),
+                            etag=response.headers.get('ETag'),
+                            last_modified=response.headers.get('Last-Modified')
+                        )
+                    elif response.status == 304:
+                        limiter.record_success()
+                        return PageResponse(status=304)
+                    elif response.status in THROTTLE_STATUSES:
+                        # Rate limited: a espera fica a cargo do limiter compartilhado
+                        limiter.record_throttle(parse_retry_after(response.headers.get('Retry-After')))
+                    elif response.status in BLOCK_STATUSES:
+                        logger.warning(f"HTTP {response.status} (blocked) for {url}")
+                        limiter.record_failure()
                     else:
+                        # Erro definitivo (ex.: 404): não adianta repetir
                         logger.warning(f"HTTP {response.status} for {url}")
+                        limiter.record_available()
+                        if response.status < 500:
+                            return None
+                        await asyncio.sleep(2 ** attempt)
                         
             except Exception as e:
                 logger.error(f"Attempt {attempt + 1} failed for {url}: {str(e)}")
+                limiter.record_failure()
                 if attempt < retries - 1:
                     await asyncio.sleep(2 ** attempt)
         
@@ -150,297 +270,35 @@ class ProductScraper:
     async def scrape_amazon_product(self, url: str, asin: str) -> Optional[ProductData]:
         """Scraping específico para Amazon"""
         
-        content = await self.get_page_content(url)
+        content = await self.get_page_content(url, markers=STREAM_MARKERS['amazon'])
         if not content:
             return None
         
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        try:
-            # Título do produto
-            title_selectors = [
-                '#productTitle',
-                '.product-title',
-                'h1.a-size-large'
-            ]
-            title = ""
-            for selector in title_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    title = element.get_text().strip()
-                    break
-            
-            # Preço
-            price = 0.0
-            original_price = None
-            
-            price_selectors = [
-                '.a-price-whole',
-                '.a-offscreen',
-                '.a-price .a-offscreen'
-            ]
-            
-            for selector in price_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    price_text = element.get_text().strip()
-                    price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
-                    if price_match:
-                        price = float(price_match.group().replace(',', ''))
-                        break
-            
-            # Preço original (se houver desconto)
-            original_price_element = soup.select_one('.a-text-price .a-offscreen')
-            if original_price_element:
-                original_price_text = original_price_element.get_text().strip()
-                original_price_match = re.search(r'[\d,]+\.?\d*', original_price_text.replace(',', ''))
-                if original_price_match:
-                    original_price = float(original_price_match.group().replace(',', ''))
-            
-            # Imagem principal
-            image_url = ""
-            image_selectors = [
-                '#landingImage',
-                '.a-dynamic-image',
-                '#imgBlkFront'
-            ]
-            
-            for selector in image_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    image_url = element.get('src') or element.get('data-src', '')
-                    break
-            
-            # Imagens adicionais
-            additional_images = []
-            image_elements = soup.select('.a-button-thumbnail img')
-            for img in image_elements[:5]:  # Máximo 5 imagens adicionais
-                img_src = img.get('src') or img.get('data-src', '')
-                if img_src and img_src not in additional_images:
-                    additional_images.append(img_src)
-            
-            # Avaliação
-            rating = None
-            rating_element = soup.select_one('.a-icon-alt')
-            if rating_element:
-                rating_text = rating_element.get_text()
-                rating_match = re.search(r'(\d+\.?\d*)', rating_text)
-                if rating_match:
-                    rating = float(rating_match.group(1))
-            
-            # Número de avaliações
-            review_count = 0
-            review_element = soup.select_one('#acrCustomerReviewText')
-            if review_element:
-                review_text = review_element.get_text()
-                review_match = re.search(r'(\d+)', review_text.replace(',', ''))
-                if review_match:
-                    review_count = int(review_match.group(1))
-            
-            # Descrição
-            description = ""
-            desc_selectors = [
-                '#feature-bullets ul',
-                '#productDescription',
-                '.a-unordered-list.a-vertical'
-            ]
-            
-            for selector in desc_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    description = element.get_text().strip()[:1000]  # Limitar tamanho
-                    break
-            
-            # Características/Features
-            features = []
-            feature_elements = soup.select('#feature-bullets li span.a-list-item')
-            for feature in feature_elements[:10]:  # Máximo 10 features
-                feature_text = feature.get_text().strip()
-                if feature_text and len(feature_text) > 10:
-                    features.append(feature_text)
-            
-            # Especificações técnicas
-            specifications = {}
-            spec_table = soup.select_one('#productDetails_techSpec_section_1')
-            if spec_table:
-                rows = spec_table.select('tr')
-                for row in rows:
-                    cells = row.select('td')
-                    if len(cells) == 2:
-                        key = cells[0].get_text().strip()
-                        value = cells[1].get_text().strip()
-                        specifications[key] = value
-            
-            # Vendedor
-            seller_name = ""
-            seller_element = soup.select_one('#sellerProfileTriggerId')
-            if seller_element:
-                seller_name = seller_element.get_text().strip()
-            
-            # Status de estoque
-            is_in_stock = True
-            stock_element = soup.select_one('#availability span')
-            if stock_element:
-                stock_text = stock_element.get_text().lower()
-                if 'indisponível' in stock_text or 'fora de estoque' in stock_text:
-                    is_in_stock = False
-            
-            return ProductData(
-                title=title,
-                price=price,
-                original_price=original_price,
-                description=description,
-                image_url=image_url,
-                additional_images=additional_images,
-                marketplace='amazon',
-                marketplace_id=asin,
-                rating=rating,
-                review_count=review_count,
-                is_in_stock=is_in_stock,
-                specifications=specifications,
-                features=features,
-                seller_name=seller_name
-            )
-            
-        except Exception as e:
-            logger.error(f"Error scraping Amazon product {asin}: {str(e)}")
-            return None
+        return await self.parse_amazon_product(content, asin)
+    
+    async def parse_amazon_product(self, content: Union[str, bytes], asin: str) -> Optional[ProductData]:
+        """Extrai os dados do produto do HTML de uma página da Amazon"""
+        return await self.parse_product(content, 'amazon', asin)
     
     async def scrape_shopee_product(self, url: str, product_id: str) -> Optional[ProductData]:
         """Scraping específico para Shopee"""
         
-        content = await self.get_page_content(url)
+        content = await self.get_page_content(url, markers=STREAM_MARKERS['shopee'])
         if not content:
             return None
         
-        soup = BeautifulSoup(content, 'html.parser')
-        
-        try:
-            # Shopee usa muito JavaScript, então vamos tentar extrair dados do JSON
-            script_tags = soup.find_all('script')
-            product_data = None
-            
-            for script in script_tags:
-                if script.string and 'window.__INITIAL_STATE__' in script.string:
-                    # Extrair dados JSON do estado inicial
-                    json_match = re.search(r'window\.__INITIAL_STATE__\s*=\s*({.+?});', script.string)
-                    if json_match:
-                        try:
-                            data = json.loads(json_match.group(1))
-                            # Navegar pela estrutura JSON para encontrar dados do produto
-                            if 'item' in data:
-                                product_data = data['item']
-                                break
-                        except json.JSONDecodeError:
-                            continue
-            
-            if not product_data:
-                # Fallback para scraping HTML tradicional
-                return await self.scrape_shopee_html(soup, product_id)
-            
-            # Extrair dados do JSON
-            title = product_data.get('name', '')
-            
-            # Preço (Shopee usa centavos)
-            price = 0.0
-            if 'price' in product_data:
-                price = product_data['price'] / 100000  # Converter de centavos
-            
-            original_price = None
-            if 'price_before_discount' in product_data:
-                original_price = product_data['price_before_discount'] / 100000
-            
-            # Imagens
-            image_url = ""
-            additional_images = []
-            if 'images' in product_data:
-                images = product_data['images']
-                if images:
-                    image_url = f"https://cf.shopee.com.br/file/{images[0]}"
-                    additional_images = [f"https://cf.shopee.com.br/file/{img}" for img in images[1:6]]
-            
-            # Avaliação
-            rating = None
-            if 'item_rating' in product_data:
-                rating_data = product_data['item_rating']
-                if 'rating_star' in rating_data:
-                    rating = rating_data['rating_star']
-            
-            # Número de avaliações
-            review_count = 0
-            if 'cmt_count' in product_data:
-                review_count = product_data['cmt_count']
-            
-            # Descrição
-            description = product_data.get('description', '')
-            
-            # Vendedor
-            seller_name = ""
-            if 'shop_location' in product_data:
-                seller_name = product_data['shop_location']
-            
-            # Status de estoque
-            is_in_stock = product_data.get('stock', 0) > 0
-            
-            return ProductData(
-                title=title,
-                price=price,
-                original_price=original_price,
-                description=description,
-                image_url=image_url,
-                additional_images=additional_images,
-                marketplace='shopee',
-                marketplace_id=product_id,
-                rating=rating,
-                review_count=review_count,
-                is_in_stock=is_in_stock,
-                seller_name=seller_name
-            )
-            
-        except Exception as e:
-            logger.error(f"Error scraping Shopee product {product_id}: {str(e)}")
-            return None
+        return await self.parse_shopee_product(content, product_id)
+    
+    async def parse_shopee_product(self, content: Union[str, bytes], product_id: str) -> Optional[ProductData]:
+        """Extrai os dados do produto do HTML de uma página da Shopee"""
+        return await self.parse_product(content, 'shopee', product_id)
     
     async def scrape_shopee_html(self, soup: BeautifulSoup, product_id: str) -> Optional[ProductData]:
         """Fallback para scraping HTML da Shopee"""
-        
-        try:
-            # Título
-            title = ""
-            title_element = soup.select_one('h1')
-            if title_element:
-                title = title_element.get_text().strip()
-            
-            # Preço (buscar em elementos comuns)
-            price = 0.0
-            price_selectors = [
-                '.product-price',
-                '.price',
-                '[data-testid="price"]'
-            ]
-            
-            for selector in price_selectors:
-                element = soup.select_one(selector)
-                if element:
-                    price_text = element.get_text().strip()
-                    price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
-                    if price_match:
-                        price = float(price_match.group().replace(',', ''))
-                        break
-            
-            return ProductData(
-                title=title,
-                price=price,
-                marketplace='shopee',
-                marketplace_id=product_id
-            )
-            
-        except Exception as e:
-            logger.error(f"Error in Shopee HTML fallback: {str(e)}")
-            return None
+        return parse_shopee_html(soup, product_id)
     
-    async def scrape_product(self, url: str) -> Optional[ProductData]:
-        """Método principal para scraping de produto"""
+    def identify_product(self, url: str) -> Tuple[str, str]:
+        """Retorna (marketplace, marketplace_id) da URL"""
         
         marketplace = self.detect_marketplace(url)
         if not marketplace:
@@ -450,27 +308,144 @@ class ProductScraper:
             asin = self.extract_amazon_asin(url)
             if not asin:
                 raise ValueError("Não foi possível extrair ASIN da URL da Amazon")
-            return await self.scrape_amazon_product(url, asin)
+            return marketplace, asin
         
-        elif marketplace == 'shopee':
-            product_id = self.extract_shopee_id(url)
-            if not product_id:
-                raise ValueError("Não foi possível extrair ID do produto da Shopee")
-            return await self.scrape_shopee_product(url, product_id)
+        product_id = self.extract_shopee_id(url)
+        if not product_id:
+            raise ValueError("Não foi possível extrair ID do produto da Shopee")
+        return marketplace, product_id
+    
+    async def parse_product(
+        self,
+        content: Union[str, bytes],
+        marketplace: str,
+        product_id: str,
+        encoding: Optional[str] = None
+    ) -> Optional[ProductData]:
+        """Extrai os dados do produto do HTML conforme o marketplace
         
-        return None
+        O parsing roda no pool de processos, para não travar os downloads
+        em andamento no event loop.
+        """
+        
+        executor = self.parse_executor or get_parse_executor()
+        if executor is None:
+            return parse_product_page(content, marketplace, product_id, encoding)
+        
+        loop = asyncio.get_running_loop()
+        try:
+            product, plan_name, winners = await loop.run_in_executor(
+                executor, extract_product_page, content, marketplace, product_id, encoding
+            )
+            # Estatísticas dos planos ficam no processo principal
+            record_extraction(plan_name, winners)
+            return product
+        except BrokenProcessPool:
+            # Um worker morreu: descartar o pool (recriado na próxima chamada)
+            logger.error("Parse pool is broken, parsing inline")
+            if executor is not self.parse_executor:
+                shutdown_parse_executor()
+            return parse_product_page(content, marketplace, product_id, encoding)
+    
+    async def scrape_product(self, url: str) -> Optional[ProductData]:
+        """Método principal para scraping de produto
+        
+        Com cache configurado, o resultado é reaproveitado por
+        (marketplace, marketplace_id), independente da URL usada.
+        """
+        
+        marketplace, product_id = self.identify_product(url)
+        markers = STREAM_MARKERS.get(marketplace)
+        
+        if self.cache is None:
+            page = await self.fetch_page(url, markers=markers)
+            if not page or page.status != 200:
+                return None
+            return await self.parse_product(page.content, marketplace, product_id, page.encoding)
+        
+        key = (marketplace, product_id)
+        
+        async def fetch(stale: Optional[CacheEntry]) -> Optional[ProductData]:
+            page = await self.fetch_page(url, validators=stale.validators() if stale else None, markers=markers)
+            if not page:
+                return None
+            
+            if page.status == 304 and stale is not None:
+                # Página não mudou: só renovar o TTL
+                self.cache.refresh(key)
+                return stale.product
+            
+            product_data = await self.parse_product(page.content, marketplace, product_id, page.encoding)
+            if product_data:
+                self.cache.put(key, product_data, page.etag, page.last_modified)
+            return product_data
+        
+        return await self.cache.get_or_fetch(key, fetch)
 
 # Função utilitária para uso em APIs
-async def scrape_product_data(url: str) -> Dict:
-    """Função para scraping de produto que retorna dict"""
+async def scrape_product_data(url: str, scraper: Optional[ProductScraper] = None) -> ProductRecord:
+    """Função para scraping de produto que retorna um ProductRecord (interface de dict)
+    
+    Com `scraper`, reutiliza a sessão já aberta dele; sem, abre uma própria.
+    """
+    
+    if scraper is None:
+        async with ProductScraper() as own_scraper:
+            return await scrape_product_data(url, own_scraper)
+    
+    product_data = await scraper.scrape_product(url)
+    
+    if product_data:
+        return ProductRecord.from_product_data(product_data)
+    else:
+        raise Exception("Não foi possível extrair dados do produto")
+
+async def scrape_products_batch(
+    urls: Iterable[str],
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    marketplace_concurrency: int = DEFAULT_MARKETPLACE_CONCURRENCY,
+    scraper: Optional[ProductScraper] = None
+) -> AsyncIterator[Dict]:
+    """Scraping concorrente de várias URLs com uma única sessão
+
+    `concurrency` limita o total de scrapes simultâneos e
+    `marketplace_concurrency` o número simultâneo por marketplace. Os
+    resultados são produzidos conforme cada URL termina (fora de ordem).
+    Com `scraper`, reutiliza a sessão dele em vez de abrir uma nova.
+    """
+    
+    if scraper is None:
+        async with ProductScraper(
+            max_connections=concurrency,
+            max_connections_per_host=marketplace_concurrency
+        ) as own_scraper:
+            async for result in scrape_products_batch(urls, concurrency, marketplace_concurrency, own_scraper):
+                yield result
+        return
+    
+    global_limit = asyncio.Semaphore(concurrency)
+    marketplace_limits = defaultdict(lambda: asyncio.Semaphore(marketplace_concurrency))
     
-    async with ProductScraper() as scraper:
-        product_data = await scraper.scrape_product(url)
+    async def scrape_one(url: str) -> Dict:
+        # Vaga do marketplace primeiro, para um site lento não ocupar vagas globais
+        async with marketplace_limits[scraper.detect_marketplace(url)]:
+            async with global_limit:
+                try:
+                    product_data = await scraper.scrape_product(url)
+                except Exception as e:
+                    return {'url': url, 'status': 'error', 'error': str(e)}
         
-        if product_data:
-            return asdict(product_data)
-        else:
-            raise Exception("Não foi possível extrair dados do produto")
+        if not product_data:
+            return {'url': url, 'status': 'error', 'error': 'Não foi possível extrair dados do produto'}
+        return {'url': url, 'status': 'ok', 'product': ProductRecord.from_product_data(product_data)}
+    
+    tasks = [asyncio.ensure_future(scrape_one(url)) for url in urls]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
 
 # Exemplo de uso
 if __name__ == "__main__":
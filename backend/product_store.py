@@ -0,0 +1,574 @@
+# =====================================================
+# Armazenamento de produtos em memória com índices
+# Arquivo: product_store.py
+# =====================================================
+
+import threading
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from product_record import ProductRecord
+from sorted_index import SortedIndex
+
+# Campos com índice secundário (valor -> ids)
+INDEXED_FIELDS = ('marketplace', 'category', 'status')
+
+# Campos numéricos com índice ordenado
+SORTED_FIELDS = ('price', 'rating')
+
+# Ordenações suportadas: nome -> (índice ordenado, decrescente)
+SORT_ORDERS = {
+    'price_asc': ('price', False),
+    'price_desc': ('price', True),
+    'rating': ('rating', True),
+}
+
+# Abaixo desta fração do catálogo, ordenar os candidatos sai mais barato
+# do que percorrer o índice ordenado filtrando por pertinência
+SORT_CANDIDATES_RATIO = 0.1
+
+# Campos mantidos quando um upsert atualiza um produto existente
+UPSERT_PRESERVED_FIELDS = frozenset(('id', 'created_at'))
+
+
+# Chave de uma posição na ordenação: (valor do índice, id)
+SortKey = Tuple[float, str]
+
+
+@dataclass
+class Page:
+    """Página de um `seek`: produtos, chave do último (se houver mais) e total"""
+    products: List[Dict]
+    next_key: Optional[SortKey]
+    total: int
+    total_exact: bool
+
+
+def with_defaults(product: Dict, defaults: Optional[Dict]) -> Dict:
+    """Produto completado com os `defaults` dos campos ausentes (ou None)"""
+    if not defaults:
+        return product
+    missing = {field: value for field, value in defaults.items() if product.get(field) is None}
+    return {**product, **missing} if missing else product
+
+
+def sort_value(product: Dict, field: str) -> float:
+    """Valor numérico usado nos índices ordenados (ausente/inválido = 0)"""
+    try:
+        return float(product.get(field) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ProductStore:
+    """Armazena produtos por id, com índices secundários para os filtros da API
+
+    Listeners registrados com `add_listener` recebem `on_insert(product)` e
+    `on_delete(product)`; uma atualização é notificada como remoção da versão
+    antiga seguida da inserção da nova.
+    """
+
+    def __init__(self):
+        self.products: Dict[str, Dict] = {}
+        self.indexes: Dict[str, Dict[Optional[str], Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        self.marketplace_ids: Dict[Tuple[str, str], str] = {}
+        self.sequence: Dict[str, int] = {}
+        # 'sequence' guarda a ordem de inserção (ordenação padrão)
+        self.sorted_indexes: Dict[str, SortedIndex] = {
+            field: SortedIndex() for field in SORTED_FIELDS + ('sequence',)
+        }
+        self.listeners = []
+        self._next_sequence = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.products)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(list(self.products.values()))
+
+    def __contains__(self, product_id: str) -> bool:
+        return product_id in self.products
+
+    def add_listener(self, listener):
+        """Registra um índice derivado e o popula com os produtos atuais"""
+        with self._lock:
+            self.listeners.append(listener)
+            for product in self.products.values():
+                listener.on_insert(product)
+
+    # ---------------------------------------------
+    # Leitura
+    # ---------------------------------------------
+
+    def get(self, product_id: str) -> Optional[Dict]:
+        return self.products.get(product_id)
+
+    def get_many(self, product_ids: Iterable[str]) -> List[Dict]:
+        """Busca vários produtos por id, ignorando os inexistentes"""
+        products = self.products
+        return [products[pid] for pid in product_ids if pid in products]
+
+    def find_by_marketplace_id(self, marketplace: str, marketplace_id: str) -> Optional[Dict]:
+        product_id = self.marketplace_ids.get((marketplace, marketplace_id))
+        return self.products.get(product_id) if product_id else None
+
+    def postings(self, field: str, value: Optional[str]) -> Set[str]:
+        """Ids de produtos com `field == value`"""
+        return self.indexes[field].get(value, set())
+
+    def select_ids(self, **filters) -> Optional[Set[str]]:
+        """Intersecção das postings dos filtros de igualdade informados
+
+        Retorna None quando nenhum filtro foi informado (todos os produtos).
+        """
+        postings = [self.postings(field, value) for field, value in filters.items() if value is not None]
+        if not postings:
+            return None
+
+        postings.sort(key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result.intersection_update(posting)
+            if not result:
+                break
+        return result
+
+    def query(
+        self,
+        within: Optional[Iterable[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+        **filters
+    ) -> Tuple[List[Dict], int]:
+        """Página de produtos filtrada e ordenada, com o total de resultados
+
+        Sem filtros de igualdade, a página é fatiada direto do índice ordenado
+        (O(log n + limit), independente de `offset`). Com filtros, os
+        candidatos vêm da intersecção das postings e são ordenados pelo
+        índice (ou diretamente, quando são poucos).
+        """
+        field, reverse = SORT_ORDERS.get(sort, ('sequence', False))
+        offset = max(offset, 0)
+        limit = max(limit, 0)
+
+        with self._lock:
+            ids = self.select_ids(**filters)
+            if within is not None:
+                ids = {pid for pid in within if pid in self.products} if ids is None else ids.intersection(within)
+
+            has_price_range = min_price is not None or max_price is not None
+            price_index = self.sorted_indexes['price']
+            start, stop = price_index.bounds(min_price, max_price)
+
+            if ids is None:
+                if not has_price_range or field == 'price':
+                    # Faixa contígua no índice: fatiar pela posição
+                    index = self.sorted_indexes[field]
+                    if not has_price_range:
+                        start, stop = 0, len(index)
+                    page_ids = index.slice(start, stop, offset, limit, reverse)
+                    return self.get_many(page_ids), stop - start
+
+                ids = set(price_index.iter_ids(start, stop))
+            elif has_price_range:
+                if stop - start < len(ids):
+                    ids.intersection_update(price_index.iter_ids(start, stop))
+                else:
+                    low = min_price if min_price is not None else float('-inf')
+                    high = max_price if max_price is not None else float('inf')
+                    ids = {pid for pid in ids if low <= sort_value(self.products[pid], 'price') <= high}
+
+            total = len(ids)
+            if not total or offset >= total or not limit:
+                return [], total
+
+            index = self.sorted_indexes[field]
+            if total <= len(index) * SORT_CANDIDATES_RATIO:
+                key = self._sort_key(field)
+                ordered = sorted(ids, key=key, reverse=reverse)
+                page_ids = ordered[offset:offset + limit]
+            else:
+                in_order = (pid for pid in index.iter_ids(0, len(index), reverse) if pid in ids)
+                page_ids = list(islice(in_order, offset, offset + limit))
+
+            return self.get_many(page_ids), total
+
+    def seek(
+        self,
+        within: Optional[Iterable[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort: Optional[str] = None,
+        after: Optional[SortKey] = None,
+        limit: int = 20,
+        exact_total: bool = False,
+        **filters
+    ) -> Page:
+        """Página por keyset: os `limit` produtos depois de `after` na ordenação
+
+        A posição vem da chave (valor, id), não de um deslocamento, então cada
+        página custa O(log n + página) e inserções não deslocam as seguintes.
+        Os filtros são testados por pertinência durante a varredura, sem
+        materializar o conjunto de candidatos; o total é estimado, salvo
+        com `exact_total`.
+        """
+        field, reverse = SORT_ORDERS.get(sort, ('sequence', False))
+        limit = max(limit, 0)
+        has_price_range = min_price is not None or max_price is not None
+        low = min_price if min_price is not None else float('-inf')
+        high = max_price if max_price is not None else float('inf')
+
+        with self._lock:
+            postings = [self.postings(name, value) for name, value in filters.items() if value is not None]
+            postings.sort(key=len)
+            check_price = has_price_range and field != 'price'
+
+            def accept(pid: str) -> bool:
+                if within is not None and pid not in within:
+                    return False
+                if check_price and not low <= sort_value(self.products[pid], 'price') <= high:
+                    return False
+                return all(pid in posting for posting in postings)
+
+            index = self.sorted_indexes[field]
+            start, stop = index.bounds(min_price, max_price) if field == 'price' else (0, len(index))
+            key = self._sort_key(field)
+
+            # Menor conjunto de candidatos disponível (postings ou `within`)
+            drivers = list(postings[:1])
+            if within is not None:
+                drivers.append(within)
+            driver = min(drivers, key=len) if drivers else None
+
+            if driver is not None and len(driver) <= len(index) * SORT_CANDIDATES_RATIO:
+                # Poucos candidatos: ordenar só eles
+                candidates = [pid for pid in driver if pid in self.products and accept(pid)]
+                if field == 'price':
+                    candidates = [pid for pid in candidates if low <= sort_value(self.products[pid], 'price') <= high]
+                if after is not None:
+                    candidates = [pid for pid in candidates if (key(pid) < after if reverse else key(pid) > after)]
+                page_ids = sorted(candidates, key=key, reverse=reverse)[:limit + 1]
+            else:
+                if after is not None:
+                    start, stop = index.after(after, start, stop, reverse)
+                if driver is None and not check_price:
+                    page_ids = index.slice(start, stop, 0, limit + 1, reverse)
+                else:
+                    in_order = (pid for pid in index.iter_ids(start, stop, reverse) if accept(pid))
+                    page_ids = list(islice(in_order, limit + 1))
+
+            has_more = len(page_ids) > limit
+            page_ids = page_ids[:limit]
+            next_key = key(page_ids[-1]) if has_more and page_ids else None
+
+            if exact_total:
+                total = self._count(within, min_price, max_price, filters)
+                total_exact = True
+            else:
+                total, total_exact = self._estimate(postings, within, min_price, max_price)
+
+            return Page(self.get_many(page_ids), next_key, total, total_exact)
+
+    def _count(self, within, min_price, max_price, filters) -> int:
+        """Total exato de produtos que passam pelos filtros"""
+        return self.query(
+            within=within, min_price=min_price, max_price=max_price, limit=0, **filters
+        )[1]
+
+    def _estimate(self, postings, within, min_price, max_price) -> Tuple[int, bool]:
+        """Total estimado supondo filtros independentes; exato com um só filtro"""
+        total = len(self.products)
+        if not total:
+            return 0, True
+
+        sizes = [len(posting) for posting in postings]
+        if within is not None:
+            sizes.append(len(within))
+        if min_price is not None or max_price is not None:
+            start, stop = self.sorted_indexes['price'].bounds(min_price, max_price)
+            sizes.append(stop - start)
+
+        if not sizes:
+            return total, True
+        if len(sizes) == 1 and within is None:
+            return sizes[0], True
+
+        fraction = 1.0
+        for size in sizes:
+            fraction *= size / total
+        return round(total * fraction), False
+
+    def _sort_key(self, field: str):
+        if field == 'sequence':
+            return lambda pid: (self.sequence[pid], pid)
+        products = self.products
+        return lambda pid: (sort_value(products[pid], field), pid)
+
+    # ---------------------------------------------
+    # Escrita
+    # ---------------------------------------------
+
+    def insert(self, product: Dict) -> ProductRecord:
+        """Armazena o produto como ProductRecord (dicts são convertidos)
+
+        Se a indexação ou um listener falhar, nada fica gravado.
+        """
+        if not isinstance(product, ProductRecord):
+            product = ProductRecord(product)
+
+        with self._lock:
+            product_id = product['id']
+            if product_id in self.products:
+                raise KeyError(f"Produto já existe: {product_id}")
+            self._check_indexable(product)
+
+            self.products[product_id] = product
+            self.sequence[product_id] = self._next_sequence
+            self._next_sequence += 1
+            self._index(product)
+
+            try:
+                self._notify_insert(product)
+            except BaseException:
+                self._unindex(product)
+                del self.products[product_id]
+                del self.sequence[product_id]
+                raise
+
+            return product
+
+    def extend(self, products: Iterable[Dict]):
+        for product in products:
+            self.insert(product)
+
+    def upsert(self, product: Dict, defaults: Optional[Dict] = None) -> Tuple[ProductRecord, bool]:
+        """Atualiza o produto de mesmo (marketplace, marketplace_id) ou insere
+
+        Retorna (produto, criado). Numa atualização, `id` e `created_at` do
+        produto existente são mantidos; `defaults` só completa produtos criados.
+        """
+        with self._lock:
+            existing = self.find_by_marketplace_id(product.get('marketplace'), product.get('marketplace_id'))
+            if existing is None:
+                return self.insert(with_defaults(product, defaults)), True
+            changes = {field: value for field, value in product.items() if field not in UPSERT_PRESERVED_FIELDS}
+            return self.update(existing['id'], changes), False
+
+    def upsert_many(self, products: Iterable[Dict], defaults: Optional[Dict] = None) -> List[Tuple[ProductRecord, bool]]:
+        """Upsert de um lote, com as inserções indexadas de uma vez no fim
+
+        Atualizações seguem o caminho de `update`; os produtos novos entram
+        nos índices ordenados num único passo e são entregues aos listeners
+        que implementam `on_insert_many` como um lote. Um produto repetido
+        no lote atualiza o que foi criado antes nele. O lote é tudo ou nada:
+        se algo falhar, as atualizações já feitas são revertidas.
+        """
+        with self._lock:
+            results: List[Tuple[ProductRecord, bool]] = []
+            created: Dict[Tuple[str, str], ProductRecord] = {}
+            new_products: Dict[str, ProductRecord] = {}
+            # Versões anteriores dos produtos atualizados, para reverter
+            replaced: List[ProductRecord] = []
+
+            try:
+                for product in products:
+                    key = (product.get('marketplace'), product.get('marketplace_id'))
+                    pending = created.get(key) if key[1] else None
+                    if pending is not None:
+                        pending.update({
+                            field: value for field, value in product.items() if field not in UPSERT_PRESERVED_FIELDS
+                        })
+                        results.append((pending, False))
+                        continue
+
+                    existing = self.find_by_marketplace_id(*key)
+                    if existing is not None:
+                        changes = {
+                            field: value for field, value in product.items() if field not in UPSERT_PRESERVED_FIELDS
+                        }
+                        updated = self.update(existing['id'], changes)
+                        replaced.append(existing)
+                        results.append((updated, False))
+                        continue
+
+                    product = with_defaults(product, defaults)
+                    if not isinstance(product, ProductRecord):
+                        product = ProductRecord(product)
+                    product_id = product['id']
+                    if product_id in self.products or product_id in new_products:
+                        raise KeyError(f"Produto já existe: {product_id}")
+                    new_products[product_id] = product
+                    if key[1]:
+                        created[key] = product
+                    results.append((product, True))
+
+                self._insert_many(list(new_products.values()))
+            except BaseException:
+                for previous in reversed(replaced):
+                    self._replace(self.products[previous['id']], previous)
+                raise
+
+            return results
+
+    def _insert_many(self, products: List[ProductRecord]):
+        """Insere produtos novos; se a indexação ou um listener falhar, nada fica gravado"""
+        for product in products:
+            self._check_indexable(product)
+
+        for product in products:
+            product_id = product['id']
+            self.products[product_id] = product
+            self.sequence[product_id] = self._next_sequence
+            self._next_sequence += 1
+            self._index_postings(product)
+
+        for field in SORTED_FIELDS:
+            self.sorted_indexes[field].add_many((product['id'], sort_value(product, field)) for product in products)
+        self.sorted_indexes['sequence'].add_many((product['id'], self.sequence[product['id']]) for product in products)
+
+        # Produto a produto nos listeners sem lote, para que compartilhem
+        # o cache de tokenização enquanto o produto ainda está nele
+        batched = []
+        each = []
+        delivered = 0
+        try:
+            for listener in self.listeners:
+                on_insert_many = getattr(listener, 'on_insert_many', None)
+                if on_insert_many is not None:
+                    on_insert_many(products)
+                    batched.append(listener)
+                else:
+                    each.append(listener)
+            for product in products:
+                self._notify_insert(product, each)
+                delivered += 1
+        except BaseException:
+            for listener in batched:
+                for product in products:
+                    listener.on_delete(product)
+            for listener in each:
+                for product in products[:delivered]:
+                    listener.on_delete(product)
+            for product in products:
+                self._unindex(product)
+                del self.products[product['id']]
+                del self.sequence[product['id']]
+            raise
+
+    def update(self, product_id: str, changes: Dict) -> ProductRecord:
+        """Aplica `changes` ao produto, mantendo índices e listeners em dia
+
+        A nova versão substitui a anterior só depois de indexada e entregue
+        aos listeners; se algo falhar, a anterior continua valendo.
+        """
+        with self._lock:
+            previous = self.products[product_id]
+            product = previous.copy()
+            product.update(changes)
+            product['id'] = product_id
+            self._replace(previous, product)
+            return product
+
+    def _replace(self, previous: ProductRecord, product: ProductRecord):
+        """Troca a versão de um produto (mesmo id) de forma atômica"""
+        self._check_indexable(product)
+        self._unindex(previous)
+        self.products[product['id']] = product
+        self._index(product)
+
+        try:
+            self._notify_update(previous, product)
+        except BaseException:
+            self._unindex(product)
+            self.products[product['id']] = previous
+            self._index(previous)
+            raise
+
+    def delete(self, product_id: str) -> ProductRecord:
+        with self._lock:
+            product = self.products.pop(product_id)
+            self._unindex(product)
+            del self.sequence[product_id]
+
+            for listener in self.listeners:
+                listener.on_delete(product)
+
+            return product
+
+    def _notify_insert(self, product: ProductRecord, listeners: Optional[List] = None):
+        """on_insert em cada listener; se um falhar, desfaz nos anteriores e repassa o erro"""
+        listeners = self.listeners if listeners is None else listeners
+        for position, listener in enumerate(listeners):
+            try:
+                listener.on_insert(product)
+            except BaseException:
+                for notified in reversed(listeners[:position]):
+                    notified.on_delete(product)
+                raise
+
+    def _notify_update(self, previous: ProductRecord, product: ProductRecord):
+        """Remoção da versão anterior e inserção da nova, desfeitas se um listener falhar"""
+        for position, listener in enumerate(self.listeners):
+            removed = False
+            try:
+                listener.on_delete(previous)
+                removed = True
+                listener.on_insert(product)
+            except BaseException:
+                if removed:
+                    listener.on_insert(previous)
+                for notified in reversed(self.listeners[:position]):
+                    notified.on_delete(product)
+                    notified.on_insert(previous)
+                raise
+
+    @staticmethod
+    def _check_indexable(product: Dict):
+        """Falha antes de qualquer escrita se um campo indexado não puder ser chave"""
+        for field in INDEXED_FIELDS + ('marketplace_id',):
+            value = product.get(field)
+            try:
+                hash(value)
+            except TypeError:
+                raise TypeError(f"Campo {field} não pode ser indexado: {type(value).__name__}")
+
+    def _index(self, product: Dict):
+        product_id = product['id']
+        self._index_postings(product)
+
+        for field in SORTED_FIELDS:
+            self.sorted_indexes[field].add(product_id, sort_value(product, field))
+        self.sorted_indexes['sequence'].add(product_id, self.sequence[product_id])
+
+    def _index_postings(self, product: Dict):
+        """Índices de igualdade e de id no marketplace (sem os ordenados)"""
+        product_id = product['id']
+        for field, index in self.indexes.items():
+            index.setdefault(product.get(field), set()).add(product_id)
+
+        marketplace_id = product.get('marketplace_id')
+        if marketplace_id:
+            self.marketplace_ids[(product.get('marketplace'), marketplace_id)] = product_id
+
+    def _unindex(self, product: Dict):
+        product_id = product['id']
+        for field, index in self.indexes.items():
+            value = product.get(field)
+            posting = index.get(value)
+            if posting is not None:
+                posting.discard(product_id)
+                if not posting:
+                    del index[value]
+
+        for field in SORTED_FIELDS:
+            self.sorted_indexes[field].remove(product_id, sort_value(product, field))
+        self.sorted_indexes['sequence'].remove(product_id, self.sequence[product_id])
+
+        key = (product.get('marketplace'), product.get('marketplace_id'))
+        if self.marketplace_ids.get(key) == product_id:
+            del self.marketplace_ids[key]
@@ -0,0 +1,245 @@
+# =====================================================
+# Rate limiting adaptativo e circuit breaker por marketplace
+# Arquivo: rate_limiter.py
+# =====================================================
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Limites por marketplace (requisições/segundo)
+MARKETPLACE_LIMITS = {
+    'amazon': {'rate': 2.0, 'min_rate': 0.1, 'max_rate': 10.0, 'burst': 5},
+    'shopee': {'rate': 2.0, 'min_rate': 0.1, 'max_rate': 8.0, 'burst': 5},
+}
+DEFAULT_LIMITS = {'rate': 1.0, 'min_rate': 0.1, 'max_rate': 5.0, 'burst': 2}
+
+# AIMD: aumento aditivo por sucesso e fator de redução ao ser limitado
+ADDITIVE_INCREASE = 0.05
+MULTIPLICATIVE_DECREASE = 0.5
+# Intervalo mínimo entre duas reduções (uma rajada de 429 conta uma vez)
+DECREASE_COOLDOWN = 1.0
+
+# Circuit breaker: falhas seguidas para abrir e tempo aberto (dobra a cada reabertura)
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+MAX_RESET_TIMEOUT = 600.0
+
+# Respostas que indicam bloqueio/limitação pelo site
+THROTTLE_STATUSES = (429, 503)
+BLOCK_STATUSES = (403,)
+
+
+class CircuitOpenError(Exception):
+    """O marketplace está bloqueando as requisições; falhar rápido"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Converte o header Retry-After (segundos ou data HTTP) em segundos"""
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveTokenBucket:
+    """Token bucket cuja taxa se ajusta por AIMD
+
+    Cada sucesso aumenta a taxa aditivamente; cada limitação (429/503) a
+    reduz multiplicativamente e respeita o Retry-After, de modo que a taxa
+    converge para o máximo tolerado pelo site. `acquire` reserva o token
+    sem aguardar sob lock, então é seguro entre threads e event loops.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        min_rate: float,
+        max_rate: float,
+        burst: int,
+        additive_increase: float = ADDITIVE_INCREASE,
+        multiplicative_decrease: float = MULTIPLICATIVE_DECREASE
+    ):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(float(self.burst), self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """Consome um token e retorna quanto tempo esperar para usá-lo"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self.blocked_until - now)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.max_rate, self.rate + self.additive_increase)
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+            if now - self.last_decrease >= DECREASE_COOLDOWN:
+                self.rate = max(self.min_rate, self.rate * self.multiplicative_decrease)
+                self.last_decrease = now
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+
+class CircuitBreaker:
+    """Abre após falhas seguidas e libera uma requisição de teste depois do timeout"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+        max_reset_timeout: float = MAX_RESET_TIMEOUT
+    ):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        # Início do estado atual (aberto ou com a requisição de teste liberada)
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Indica se uma requisição pode ser feita agora"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at >= self.reset_timeout:
+                # Libera uma única requisição de teste. Em HALF_OPEN, o teste
+                # anterior ficou sem resultado no prazo (ex.: cancelado)
+                self.state = self.HALF_OPEN
+                self.opened_at = now
+                return True
+            return False
+
+    def blocking(self) -> bool:
+        """Indica se `allow` recusaria agora, sem liberar a requisição de teste"""
+        with self._lock:
+            return self.state != self.CLOSED and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                # Teste falhou: reabrir por mais tempo
+                self.reset_timeout = min(self.max_reset_timeout, self.reset_timeout * 2)
+                self._open()
+            elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+
+
+class MarketplaceLimiter:
+    """Token bucket adaptativo + circuit breaker de um marketplace"""
+
+    def __init__(self, marketplace: str, limits: Dict):
+        self.marketplace = marketplace
+        self.bucket = AdaptiveTokenBucket(**limits)
+        self.breaker = CircuitBreaker()
+
+    async def acquire(self):
+        """Aguarda a vez da próxima requisição ou falha se o circuito estiver aberto"""
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Marketplace {self.marketplace} bloqueando requisições, tente mais tarde")
+        await self.bucket.acquire()
+
+    def record_success(self):
+        self.bucket.on_success()
+        self.breaker.record_success()
+
+    def record_throttle(self, retry_after: Optional[float] = None):
+        self.bucket.on_throttle(retry_after)
+        self.breaker.record_failure()
+        logger.warning(
+            f"{self.marketplace} throttled, rate reduced to {self.bucket.rate:.2f} req/s"
+            + (f", retry after {retry_after:.0f}s" if retry_after else "")
+        )
+
+    def record_failure(self):
+        self.breaker.record_failure()
+
+    def record_available(self):
+        """Resposta que não indica bloqueio (ex.: 404): só fecha o circuito"""
+        self.breaker.record_success()
+
+    def stats(self) -> Dict:
+        return {
+            'rate': round(self.bucket.rate, 3),
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures
+        }
+
+
+_limiters: Dict[str, MarketplaceLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(marketplace: Optional[str]) -> MarketplaceLimiter:
+    """Limiter compartilhado do marketplace (criado sob demanda)"""
+    key = marketplace or 'default'
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                limiter = MarketplaceLimiter(key, dict(MARKETPLACE_LIMITS.get(key, DEFAULT_LIMITS)))
+                _limiters[key] = limiter
+    return limiter
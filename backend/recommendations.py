@@ -0,0 +1,93 @@
+# =====================================================
+# Ranking de popularidade para recomendações
+# Arquivo: recommendations.py
+# =====================================================
+
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from product_store import sort_value
+from sorted_index import SortedIndex
+
+
+def popularity_score(product: Dict) -> float:
+    """Score de recomendação: avaliação, número de avaliações e destaque"""
+    score = sort_value(product, 'rating') * 20
+    score += min(sort_value(product, 'review_count') / 100, 10)
+    score += 10 if product.get('is_featured') else 0
+    return score
+
+
+class PopularityRanking:
+    """Produtos ativos ordenados por popularidade, no geral e por categoria
+
+    Registrado como listener do ProductStore, recalcula o score só do
+    produto alterado (O(log n)); o top-k de uma requisição é uma fatia do
+    fim do índice, sem percorrer nem copiar o catálogo.
+    """
+
+    def __init__(self):
+        self.overall = SortedIndex()
+        self.by_category: Dict[Optional[str], SortedIndex] = {}
+        # id -> (score, categoria) usados na inserção, para remover a mesma chave
+        self.entries: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Esvazia o ranking (o ProductStore repovoa via on_insert)"""
+        with self._lock:
+            self.overall = SortedIndex()
+            self.by_category = {}
+            self.entries = {}
+
+    def on_insert(self, product: Dict):
+        if product.get('status') != 'active':
+            return
+
+        product_id = product['id']
+        score = popularity_score(product)
+        category = product.get('category')
+
+        with self._lock:
+            self.entries[product_id] = (score, category)
+            self.overall.add(product_id, score)
+            self.by_category.setdefault(category, SortedIndex()).add(product_id, score)
+
+    def on_insert_many(self, products: List[Dict]):
+        """Lote de inserções: cada índice ordenado é atualizado uma só vez"""
+        entries = [
+            (product['id'], popularity_score(product), product.get('category'))
+            for product in products if product.get('status') == 'active'
+        ]
+        by_category: Dict[Optional[str], List[Tuple[str, float]]] = {}
+        for product_id, score, category in entries:
+            by_category.setdefault(category, []).append((product_id, score))
+
+        with self._lock:
+            for product_id, score, category in entries:
+                self.entries[product_id] = (score, category)
+            self.overall.add_many((product_id, score) for product_id, score, _ in entries)
+            for category, items in by_category.items():
+                self.by_category.setdefault(category, SortedIndex()).add_many(items)
+
+    def on_delete(self, product: Dict):
+        with self._lock:
+            entry = self.entries.pop(product['id'], None)
+            if entry is None:
+                return
+
+            score, category = entry
+            self.overall.remove(product['id'], score)
+            index = self.by_category[category]
+            index.remove(product['id'], score)
+            if not len(index):
+                del self.by_category[category]
+
+    def top(self, limit: int, category: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Os `limit` produtos mais populares (ids e scores), em O(limit)"""
+        with self._lock:
+            index = self.overall if category is None else self.by_category.get(category)
+            if index is None or limit <= 0:
+                return []
+            keys = index.keys[-limit:]
+        return [(product_id, score) for score, product_id in reversed(keys)]
@@ -0,0 +1,441 @@
+# =====================================================
+# Re-scraping agendado para monitorar preços
+# Arquivo: rescrape_scheduler.py
+# =====================================================
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from product_record import ProductRecord
+from product_store import sort_value
+from rate_limiter import get_limiter
+from recommendations import popularity_score
+
+logger = logging.getLogger(__name__)
+
+# Intervalo inicial entre re-scrapes e seus limites (segundos)
+BASE_INTERVAL = 6 * 3600
+MIN_INTERVAL = 30 * 60
+MAX_INTERVAL = 7 * 86400
+
+# Preço mudou desde o último scrape: intervalo encurta; não mudou: alonga
+VOLATILE_FACTOR = 0.5
+STABLE_FACTOR = 1.5
+
+# Popularidade (score das recomendações) que dobra a frequência
+POPULARITY_SCALE = 100.0
+
+# Espalha as datas iniciais (+-20%) para um lote importado não vencer junto
+INITIAL_JITTER = 0.2
+
+# Falhas: nova tentativa em RETRY_DELAY, dobrando a cada falha seguida
+RETRY_DELAY = 10 * 60
+
+# Orçamento de re-scrapes por marketplace: taxa (req/s) e vagas simultâneas.
+# Fica abaixo dos limites do rate_limiter, deixando folga para os scrapes da API.
+MARKETPLACE_BUDGETS = {
+    'amazon': {'rate': 1.0, 'concurrency': 4},
+    'shopee': {'rate': 1.0, 'concurrency': 4},
+}
+DEFAULT_BUDGET = {'rate': 0.5, 'concurrency': 2}
+
+# Espera máxima do dispatcher sem nada vencer, e com o circuito do marketplace aberto
+MAX_IDLE = 60.0
+CIRCUIT_RETRY = 30.0
+
+# Jobs recentes mantidos para /api/scrape-jobs
+MAX_RECENT_JOBS = 1000
+
+# Campos atualizados por um re-scrape (os demais são do cadastro)
+REFRESHED_FIELDS = (
+    'price', 'original_price', 'is_in_stock', 'rating', 'review_count', 'seller_name', 'seller_rating'
+)
+
+
+def iso_now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+class MarketplaceBudget:
+    """Taxa máxima e vagas simultâneas de re-scrape de um marketplace"""
+
+    def __init__(self, rate: float, concurrency: int):
+        self.rate = rate
+        self.concurrency = concurrency
+        self.tokens = float(concurrency)
+        self.updated_at = time.monotonic()
+        self.in_flight = 0
+
+    def try_acquire(self) -> Optional[float]:
+        """0 se liberou uma vaga, segundos até o próximo token, ou None com as vagas cheias"""
+        if self.in_flight >= self.concurrency:
+            return None
+        now = time.monotonic()
+        self.tokens = min(float(self.concurrency), self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        self.in_flight += 1
+        return 0.0
+
+    def release(self):
+        self.in_flight -= 1
+
+
+class ScheduleEntry:
+    """Estado de monitoramento de um produto"""
+
+    __slots__ = (
+        'product_id', 'url', 'marketplace', 'boost', 'interval', 'due_at', 'generation',
+        'active', 'running', 'last_price', 'price_changed', 'failures', 'last_scraped_at', 'last_status'
+    )
+
+    def __init__(self, product_id: str, url: str, marketplace: str, interval: float):
+        self.product_id = product_id
+        self.url = url
+        self.marketplace = marketplace
+        self.boost = 1.0
+        self.interval = interval
+        self.due_at = 0.0
+        # Entradas antigas do heap (geração diferente) são descartadas ao sair
+        self.generation = 0
+        self.active = True
+        self.running = False
+        self.last_price: Optional[float] = None
+        self.price_changed = False
+        self.failures = 0
+        self.last_scraped_at: Optional[str] = None
+        self.last_status: Optional[str] = None
+
+    def to_json(self) -> Dict:
+        return {
+            'product_id': self.product_id,
+            'url': self.url,
+            'marketplace': self.marketplace,
+            'interval_seconds': round(self.interval / self.boost),
+            'next_run_at': datetime.utcfromtimestamp(self.due_at).isoformat(),
+            'running': self.running,
+            'failures': self.failures,
+            'last_scraped_at': self.last_scraped_at,
+            'last_status': self.last_status
+        }
+
+
+class RescrapeScheduler:
+    """Re-scraping periódico dos produtos com URL, em ordem de vencimento
+
+    Registrado como listener do ProductStore, agenda todo produto ativo com
+    `product_url`. Cada marketplace tem um heap por data de vencimento e um
+    orçamento (taxa e vagas); o dispatcher, rodando no event loop do
+    ScraperRuntime, só tira do heap o que venceu e cabe no orçamento, então
+    um backlog vira atraso em vez de rajada. O intervalo de cada produto se
+    adapta: encurta quando o preço muda, alonga quando não muda, e é
+    dividido pelo peso de popularidade.
+    """
+
+    def __init__(
+        self,
+        store,
+        base_interval: float = BASE_INTERVAL,
+        min_interval: float = MIN_INTERVAL,
+        max_interval: float = MAX_INTERVAL,
+        budgets: Optional[Dict[str, Dict]] = None
+    ):
+        self.store = store
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget_limits = MARKETPLACE_BUDGETS if budgets is None else budgets
+        self.entries: Dict[str, ScheduleEntry] = {}
+        self.heaps: Dict[str, List] = {}
+        self.budgets: Dict[str, MarketplaceBudget] = {}
+        self.jobs = deque(maxlen=MAX_RECENT_JOBS)
+        self.counters: Counter = Counter()
+        self._job_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._future = None
+
+    # ---------------------------------------------
+    # Interface de listener do ProductStore
+    # ---------------------------------------------
+
+    def reset(self):
+        """Esvazia a agenda (o ProductStore repovoa via on_insert)"""
+        with self._lock:
+            self.entries.clear()
+            self.heaps.clear()
+
+    def on_insert(self, product: Dict):
+        url = product.get('product_url')
+        if not url or product.get('status') != 'active':
+            return
+
+        product_id = product['id']
+        marketplace = product.get('marketplace') or 'default'
+        price = sort_value(product, 'price')
+        boost = 1 + popularity_score(product) / POPULARITY_SCALE
+
+        with self._lock:
+            entry = self.entries.get(product_id)
+            if entry is None:
+                entry = self.entries[product_id] = ScheduleEntry(product_id, url, marketplace, self.base_interval)
+                entry.boost = boost
+                jitter = 1 + random.uniform(-INITIAL_JITTER, INITIAL_JITTER)
+                self._push(entry, time.time() + self._effective_interval(entry) * jitter)
+            else:
+                # Atualização (remoção + inserção) ou resultado de um re-scrape
+                entry.active = True
+                entry.url = url
+                entry.boost = boost
+                if entry.last_price is not None and price != entry.last_price:
+                    entry.price_changed = True
+                if marketplace != entry.marketplace:
+                    entry.marketplace = marketplace
+                    if not entry.running:
+                        self._push(entry, entry.due_at)
+            entry.last_price = price
+
+    def on_delete(self, product: Dict):
+        with self._lock:
+            entry = self.entries.get(product['id'])
+            if entry is not None:
+                # Uma atualização reativa em seguida; senão sai ao chegar no topo do heap
+                entry.active = False
+
+    # ---------------------------------------------
+    # Agenda
+    # ---------------------------------------------
+
+    def _effective_interval(self, entry: ScheduleEntry) -> float:
+        return min(self.max_interval, max(self.min_interval, entry.interval / entry.boost))
+
+    def _push(self, entry: ScheduleEntry, due_at: float):
+        entry.generation += 1
+        entry.due_at = due_at
+        heapq.heappush(self.heaps.setdefault(entry.marketplace, []), (due_at, entry.generation, entry.product_id))
+
+    def _budget(self, marketplace: str) -> MarketplaceBudget:
+        budget = self.budgets.get(marketplace)
+        if budget is None:
+            budget = self.budgets[marketplace] = MarketplaceBudget(
+                **self.budget_limits.get(marketplace, DEFAULT_BUDGET)
+            )
+        return budget
+
+    def _reschedule(self, entry: ScheduleEntry, ok: bool):
+        entry.running = False
+        if ok:
+            entry.failures = 0
+            factor = VOLATILE_FACTOR if entry.price_changed else STABLE_FACTOR
+            entry.interval = min(self.max_interval, max(self.min_interval, entry.interval * factor))
+            entry.price_changed = False
+            delay = self._effective_interval(entry)
+        else:
+            entry.failures += 1
+            delay = min(self.max_interval, RETRY_DELAY * 2 ** (entry.failures - 1))
+
+        if self.entries.get(entry.product_id) is entry:
+            self._push(entry, time.time() + delay)
+
+    def trigger(self, product_id: str) -> bool:
+        """Antecipa o re-scrape do produto para agora"""
+        with self._lock:
+            entry = self.entries.get(product_id)
+            if entry is None or not entry.active:
+                return False
+            if not entry.running:
+                self._push(entry, time.time())
+        self._wake()
+        return True
+
+    # ---------------------------------------------
+    # Dispatcher
+    # ---------------------------------------------
+
+    @property
+    def running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def start(self, runtime):
+        """Inicia o dispatcher no event loop do ScraperRuntime"""
+        with self._lock:
+            if self.running:
+                return
+            self._loop = runtime.loop
+            self._future = asyncio.run_coroutine_threadsafe(self.run(runtime), runtime.loop)
+        logger.info("Agendador de re-scraping iniciado")
+
+    def stop(self):
+        future = self._future
+        if future is not None:
+            future.cancel()
+            self._future = None
+
+    def _wake(self):
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run(self, runtime):
+        """Despacha os produtos vencidos até ser cancelado"""
+        self._wakeup = asyncio.Event()
+        tasks = set()
+        try:
+            while True:
+                self._wakeup.clear()
+                delay = self._dispatch_due(runtime, tasks)
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _dispatch_due(self, runtime, tasks: set) -> float:
+        """Inicia os re-scrapes vencidos que cabem no orçamento; retorna quanto dormir"""
+        now = time.time()
+        delay = MAX_IDLE
+
+        with self._lock:
+            for marketplace, heap in self.heaps.items():
+                if get_limiter(marketplace).breaker.blocking():
+                    # Site bloqueando: nada deste marketplace até o circuito fechar
+                    delay = min(delay, CIRCUIT_RETRY)
+                    continue
+
+                budget = self._budget(marketplace)
+                while heap:
+                    due_at, generation, product_id = heap[0]
+                    entry = self.entries.get(product_id)
+                    if entry is None or entry.generation != generation or entry.marketplace != marketplace:
+                        heapq.heappop(heap)
+                        continue
+                    if not entry.active:
+                        heapq.heappop(heap)
+                        del self.entries[product_id]
+                        continue
+                    if due_at > now:
+                        delay = min(delay, due_at - now)
+                        break
+
+                    wait = budget.try_acquire()
+                    if wait is None:
+                        # Vagas cheias: um re-scrape terminando acorda o dispatcher
+                        break
+                    if wait > 0:
+                        delay = min(delay, wait)
+                        break
+
+                    heapq.heappop(heap)
+                    entry.running = True
+                    task = asyncio.ensure_future(self._rescrape(runtime, entry, budget))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+        return max(delay, 0.0)
+
+    async def _rescrape(self, runtime, entry: ScheduleEntry, budget: MarketplaceBudget):
+        job = {
+            'id': next(self._job_ids),
+            'product_id': entry.product_id,
+            'url': entry.url,
+            'marketplace': entry.marketplace,
+            'status': 'running',
+            'started_at': iso_now(),
+            'finished_at': None,
+            'error': None
+        }
+        self.jobs.appendleft(job)
+        ok = False
+
+        try:
+            product_data = await runtime.scraper.scrape_product(entry.url)
+            if not product_data:
+                raise Exception("Não foi possível extrair dados do produto")
+
+            record = ProductRecord.from_product_data(product_data)
+            changes = {field: record[field] for field in REFRESHED_FIELDS if record.get(field) is not None}
+            changes['scraped_at'] = changes['updated_at'] = iso_now()
+            # O listener (on_insert) marca se o preço mudou
+            await asyncio.to_thread(self.store.update, entry.product_id, changes)
+            ok = True
+            job['status'] = 'ok'
+        except KeyError:
+            # Removido durante o scrape
+            job['status'] = 'skipped'
+        except asyncio.CancelledError:
+            job['status'] = 'cancelled'
+            raise
+        except Exception as e:
+            job['status'] = 'error'
+            job['error'] = str(e)
+            logger.warning(f"Re-scrape falhou para {entry.product_id}: {str(e)}")
+        finally:
+            job['finished_at'] = iso_now()
+            with self._lock:
+                budget.release()
+                job['price_changed'] = entry.price_changed
+                entry.last_scraped_at = job['finished_at']
+                entry.last_status = job['status']
+                self.counters[job['status']] += 1
+                self._reschedule(entry, ok)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    # ---------------------------------------------
+    # Status
+    # ---------------------------------------------
+
+    def entry(self, product_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self.entries.get(product_id)
+            return entry.to_json() if entry is not None and entry.active else None
+
+    def recent_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        jobs = [job for job in list(self.jobs) if status is None or job['status'] == status]
+        return [dict(job) for job in jobs[:max(limit, 0)]]
+
+    def stats(self) -> Dict:
+        """Totais da agenda e, por marketplace, fila, vencidos e atraso"""
+        now = time.time()
+        with self._lock:
+            marketplaces: Dict[str, Dict] = {}
+            for entry in self.entries.values():
+                if not entry.active:
+                    continue
+                item = marketplaces.setdefault(entry.marketplace, {
+                    'scheduled': 0, 'due': 0, 'running': 0, 'max_lag_seconds': 0, 'next_run_at': None
+                })
+                item['scheduled'] += 1
+                if entry.running:
+                    item['running'] += 1
+                elif entry.due_at <= now:
+                    item['due'] += 1
+                    item['max_lag_seconds'] = max(item['max_lag_seconds'], round(now - entry.due_at))
+                elif item['next_run_at'] is None or entry.due_at < item['next_run_at']:
+                    item['next_run_at'] = entry.due_at
+
+            for marketplace, item in marketplaces.items():
+                if item['next_run_at'] is not None:
+                    item['next_run_at'] = datetime.utcfromtimestamp(item['next_run_at']).isoformat()
+                limits = self.budget_limits.get(marketplace, DEFAULT_BUDGET)
+                item['budget'] = {'rate': limits['rate'], 'concurrency': limits['concurrency']}
+
+            return {
+                'running': self.running,
+                'scheduled': sum(item['scheduled'] for item in marketplaces.values()),
+                'jobs': dict(self.counters),
+                'marketplaces': marketplaces
+            }
@@ -0,0 +1,142 @@
+# =====================================================
+# Cache de resultados de scraping
+# Arquivo: scrape_cache.py
+# =====================================================
+
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+# Chave do cache: (marketplace, marketplace_id)
+CacheKey = Tuple[str, str]
+
+# Overhead aproximado por entrada (objetos Python além do conteúdo)
+ENTRY_OVERHEAD = 512
+
+
+def estimate_size(product) -> int:
+    """Tamanho aproximado em bytes de um ProductData em cache"""
+    return len(json.dumps(asdict(product), ensure_ascii=False, default=str)) + ENTRY_OVERHEAD
+
+
+class CacheEntry:
+    """Produto em cache com os validadores HTTP da página de origem"""
+
+    __slots__ = ('product', 'etag', 'last_modified', 'expires_at', 'size')
+
+    def __init__(self, product, etag: Optional[str], last_modified: Optional[str], expires_at: float, size: int):
+        self.product = product
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+        self.size = size
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        """Headers para revalidação condicional da página"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ScrapeCache:
+    """Cache LRU com TTL e limite de memória, com coalescência de requisições
+
+    Entradas vencidas são mantidas (até serem despejadas) para revalidação
+    com ETag/Last-Modified. Chamadas concorrentes para o mesmo produto
+    aguardam uma única busca em andamento.
+    """
+
+    def __init__(self, ttl: float = 900, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries: 'OrderedDict[CacheKey, CacheEntry]' = OrderedDict()
+        self.total_bytes = 0
+        self.inflight: Dict[CacheKey, asyncio.Future] = {}
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'coalesced': 0, 'evictions': 0}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: CacheKey) -> Optional[CacheEntry]:
+        """Entrada do produto (fresca ou vencida), marcando-a como usada"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key: CacheKey, product, etag: Optional[str] = None, last_modified: Optional[str] = None) -> CacheEntry:
+        entry = CacheEntry(product, etag, last_modified, time.monotonic() + self.ttl, estimate_size(product))
+        with self._lock:
+            self._discard(key)
+            self.entries[key] = entry
+            self.total_bytes += entry.size
+            self._evict()
+        return entry
+
+    def refresh(self, key: CacheKey):
+        """Renova o TTL de uma entrada revalidada (HTTP 304)"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry.expires_at = time.monotonic() + self.ttl
+                self.stats['revalidated'] += 1
+
+    def invalidate(self, key: CacheKey):
+        with self._lock:
+            self._discard(key)
+
+    def _discard(self, key: CacheKey):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def _evict(self):
+        while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            _, entry = self.entries.popitem(last=False)
+            self.total_bytes -= entry.size
+            self.stats['evictions'] += 1
+
+    async def get_or_fetch(self, key: CacheKey, fetch: Callable[[Optional[CacheEntry]], Awaitable]):
+        """Retorna o produto do cache ou executa `fetch(entrada_vencida)` uma única vez
+
+        `fetch` recebe a entrada vencida (ou None) para poder revalidar e é
+        responsável por gravar/renovar o cache.
+        """
+        entry = self.get(key)
+        if entry is not None and entry.fresh:
+            self.stats['hits'] += 1
+            return entry.product
+
+        task = self.inflight.get(key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+        else:
+            self.stats['misses'] += 1
+            task = asyncio.ensure_future(fetch(entry))
+            self.inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        # shield: o cancelamento de um chamador não cancela a busca dos demais
+        return await asyncio.shield(task)
+
+    def _finish(self, key: CacheKey, task: asyncio.Future):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+
+    def info(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, entries=len(self.entries), bytes=self.total_bytes)
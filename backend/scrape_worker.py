@@ -0,0 +1,107 @@
+# =====================================================
+# Workers da fila de scraping
+# Arquivo: scrape_worker.py
+#
+# Uso:
+#   python scrape_worker.py
+#
+# Processo separado da API: consome a fila persistente (SCRAPE_QUEUE_PATH)
+# com SCRAPE_WORKER_CONCURRENCY scrapes simultâneos, num único event loop
+# e uma única sessão HTTP.
+# =====================================================
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+from datetime import datetime
+
+from job_queue import ScrapeJobQueue
+from product_scraper import scrape_product_data
+from scraper_runtime import attach_runtime
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUEUE_PATH = os.environ.get('SCRAPE_QUEUE_PATH', 'scrape_jobs.db')
+CONCURRENCY = int(os.environ.get('SCRAPE_WORKER_CONCURRENCY', 8))
+
+# Espera máxima entre consultas com a fila vazia (s)
+POLL_INTERVAL = float(os.environ.get('SCRAPE_WORKER_POLL_INTERVAL', 1.0))
+
+# Limite de um scrape (inclui as retentativas HTTP do próprio scraper)
+JOB_TIMEOUT = float(os.environ.get('SCRAPE_WORKER_JOB_TIMEOUT', 120))
+
+
+class WorkerPool:
+    """`concurrency` workers consumindo a fila até `stop`"""
+
+    def __init__(self, job_queue: ScrapeJobQueue, concurrency: int = CONCURRENCY):
+        self.queue = job_queue
+        self.concurrency = concurrency
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    async def run(self, scraper):
+        logger.info(f"Workers de scraping iniciados ({self.concurrency}) em {self.queue.path}")
+        await asyncio.gather(*(self._work(scraper, number) for number in range(self.concurrency)))
+        logger.info("Workers de scraping encerrados")
+
+    async def _work(self, scraper, number: int):
+        worker = f"{self.name}:{number}"
+        while not self._stopping.is_set():
+            job = await asyncio.to_thread(self.queue.claim, worker)
+            if job is None:
+                await self._idle()
+                continue
+            await self._process(scraper, worker, job)
+
+    async def _idle(self):
+        """Dorme até o próximo job com espera vencer (no máximo POLL_INTERVAL)"""
+        delay = await asyncio.to_thread(self.queue.next_available_in)
+        delay = POLL_INTERVAL if delay is None else min(max(delay, 0.05), POLL_INTERVAL)
+        try:
+            await asyncio.wait_for(self._stopping.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _process(self, scraper, worker: str, job):
+        try:
+            product_data = await asyncio.wait_for(scrape_product_data(job['url'], scraper), JOB_TIMEOUT)
+            product_data['scraped_at'] = datetime.utcnow().isoformat()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            retried = await asyncio.to_thread(self.queue.fail, job, worker, error)
+            logger.warning(
+                f"Job {job['id']} falhou (tentativa {job['attempts']}/{job['max_attempts']}"
+                f"{', vai ser repetido' if retried else ''}): {error}"
+            )
+            return
+
+        await asyncio.to_thread(self.queue.complete, job, worker, product_data)
+        logger.info(f"Job {job['id']} concluído: {product_data.get('title', 'N/A')}")
+
+
+async def main():
+    pool = WorkerPool(ScrapeJobQueue(QUEUE_PATH))
+
+    loop = asyncio.get_running_loop()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        # Para de pegar jobs novos e termina os em andamento
+        loop.add_signal_handler(signal_number, pool.stop)
+
+    runtime = await attach_runtime()
+    try:
+        await pool.run(runtime.scraper)
+    finally:
+        await runtime.detach()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
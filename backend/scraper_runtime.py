@@ -0,0 +1,196 @@
+# =====================================================
+# Runtime compartilhado do scraper (event loop + sessão)
+# Arquivo: scraper_runtime.py
+# =====================================================
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Awaitable, Optional
+
+from product_parsers import shutdown_parse_executor
+from product_scraper import ProductScraper
+from scrape_cache import ScrapeCache
+
+logger = logging.getLogger(__name__)
+
+# Limites do pool de conexões compartilhado (ajustáveis por ambiente)
+MAX_CONNECTIONS = int(os.environ.get('SCRAPER_MAX_CONNECTIONS', 100))
+MAX_CONNECTIONS_PER_HOST = int(os.environ.get('SCRAPER_MAX_CONNECTIONS_PER_HOST', 10))
+DNS_CACHE_TTL = int(os.environ.get('SCRAPER_DNS_CACHE_TTL', 300))
+KEEPALIVE_TIMEOUT = float(os.environ.get('SCRAPER_KEEPALIVE_TIMEOUT', 30))
+
+# Cache de resultados por (marketplace, marketplace_id)
+CACHE_TTL = float(os.environ.get('SCRAPE_CACHE_TTL', 900))
+CACHE_MAX_ENTRIES = int(os.environ.get('SCRAPE_CACHE_MAX_ENTRIES', 10000))
+CACHE_MAX_BYTES = int(os.environ.get('SCRAPE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+
+class ScraperRuntime:
+    """Event loop em thread própria com um ProductScraper de sessão longa
+
+    Handlers síncronos (Flask) submetem corrotinas com `submit`/`run`; todas
+    compartilham o mesmo pool de conexões, com keep-alive e cache de DNS.
+    Sob um servidor ASGI, `attach` usa o loop do próprio servidor em vez
+    de criar uma thread, e os handlers async usam o `scraper` diretamente.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = MAX_CONNECTIONS,
+        max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST,
+        dns_cache_ttl: int = DNS_CACHE_TTL,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT
+    ):
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.cache = ScrapeCache(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.scraper: Optional[ProductScraper] = None
+        self._thread: Optional[threading.Thread] = None
+        self._attached = False
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        if self._attached:
+            return self.loop is not None and not self.loop.is_closed()
+        return self._thread is not None and self._thread.is_alive()
+
+    def _create_scraper(self) -> ProductScraper:
+        return ProductScraper(
+            max_connections=self.max_connections,
+            max_connections_per_host=self.max_connections_per_host,
+            dns_cache_ttl=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+            cache=self.cache
+        )
+
+    def start(self) -> 'ScraperRuntime':
+        """Inicia a thread do event loop e abre a sessão compartilhada"""
+        with self._lock:
+            if self.running:
+                return self
+
+            self.loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(
+                target=self._run_loop,
+                name='scraper-runtime',
+                daemon=True
+            )
+            self._thread.start()
+
+            self.scraper = self._create_scraper()
+            self.submit(self.scraper.open()).result()
+
+            logger.info("Scraper runtime iniciado")
+            return self
+
+    async def attach(self) -> 'ScraperRuntime':
+        """Passa a usar o event loop em execução (ex.: o do servidor ASGI)"""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Scraper runtime já está em execução")
+            self.loop = asyncio.get_running_loop()
+            self._attached = True
+            self.scraper = self._create_scraper()
+
+        await self.scraper.open()
+        logger.info("Scraper runtime anexado ao event loop do servidor")
+        return self
+
+    async def detach(self):
+        """Fecha a sessão do runtime anexado (o loop pertence ao servidor)"""
+        with self._lock:
+            if not self._attached:
+                return
+            scraper = self.scraper
+            self._attached = False
+            self.loop = None
+            self.scraper = None
+
+        await scraper.close()
+        shutdown_parse_executor()
+        logger.info("Scraper runtime desanexado")
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Agenda uma corrotina no loop do runtime (thread-safe)"""
+        if not self.running:
+            raise RuntimeError("Scraper runtime não está em execução")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None):
+        """Executa uma corrotina no runtime e aguarda o resultado"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout: float = 10):
+        """Cancela tarefas pendentes, fecha a sessão e encerra o loop"""
+        with self._lock:
+            if self._attached or not self.running:
+                return
+
+            async def close():
+                current = asyncio.current_task()
+                pending = [task for task in asyncio.all_tasks() if task is not current]
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                await self.scraper.close()
+
+            try:
+                asyncio.run_coroutine_threadsafe(close(), self.loop).result(timeout)
+            except Exception as e:
+                logger.error(f"Erro ao encerrar scraper runtime: {str(e)}")
+
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+            self.loop.close()
+            self._thread = None
+            self.loop = None
+            self.scraper = None
+            shutdown_parse_executor()
+
+            logger.info("Scraper runtime encerrado")
+
+
+_runtime: Optional[ScraperRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> ScraperRuntime:
+    """Runtime único do processo, iniciado sob demanda e encerrado no exit"""
+    global _runtime
+
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = ScraperRuntime()
+            atexit.register(_runtime.shutdown)
+        if not _runtime.running:
+            _runtime.start()
+        return _runtime
+
+
+async def attach_runtime() -> ScraperRuntime:
+    """Anexa o runtime único do processo ao event loop em execução"""
+    global _runtime
+
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = ScraperRuntime()
+            atexit.register(_runtime.shutdown)
+        runtime = _runtime
+    return await runtime.attach()
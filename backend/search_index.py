@@ -0,0 +1,233 @@
+# =====================================================
+# Índice invertido para busca de produtos
+# Arquivo: search_index.py
+# =====================================================
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Peso do título em relação à descrição (antes: 10 pontos vs 5)
+TITLE_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+# Parâmetros padrão do BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Sufixos de plural em português (já sem acentos), do mais longo ao mais curto
+PLURAL_SUFFIXES = [
+    ('oes', 'ao'),
+    ('aes', 'ao'),
+    ('ais', 'al'),
+    ('eis', 'el'),
+    ('ois', 'ol'),
+    ('res', 'r'),
+    ('zes', 'z'),
+    ('ns', 'm'),
+]
+
+
+class _FoldTable(dict):
+    """Tabela de str.translate: cada caractere decomposto (NFKD) e sem acentos
+
+    Preenchida sob demanda, um caractere por vez; como os acentos são
+    removidos, decompor caractere a caractere dá o mesmo que decompor o
+    texto inteiro.
+    """
+
+    def __missing__(self, codepoint: int) -> str:
+        normalized = unicodedata.normalize('NFKD', chr(codepoint))
+        folded = ''.join(c for c in normalized if not unicodedata.combining(c))
+        self[codepoint] = folded
+        return folded
+
+
+FOLD_TABLE = _FoldTable()
+
+
+def fold_accents(text: str) -> str:
+    """Remove acentos e converte para minúsculas"""
+    text = text.lower()
+    if text.isascii():
+        return text
+    return text.translate(FOLD_TABLE)
+
+
+@lru_cache(maxsize=65536)
+def stem_plural(token: str) -> str:
+    """Reduz plurais comuns do português ao singular ("fones" -> "fone")"""
+    if len(token) <= 3 or token.isdigit():
+        return token
+
+    for suffix, replacement in PLURAL_SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            return token[:-len(suffix)] + replacement
+
+    if token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+
+    return token
+
+
+@lru_cache(maxsize=1024)
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Tokeniza texto: minúsculas, sem acentos e com plurais reduzidos
+
+    O cache pequeno evita tokenizar de novo o mesmo título/descrição quando
+    vários índices recebem o mesmo produto em seguida.
+    """
+    if not text:
+        return ()
+    return tuple([stem_plural(token) for token in TOKEN_RE.findall(fold_accents(text))])
+
+
+class SearchIndex:
+    """Índice invertido com ranking BM25 sobre título e descrição"""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.documents: Dict[str, Dict] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_terms: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def _document_terms(self, product: Dict) -> Counter:
+        """Frequência ponderada dos termos do produto"""
+        terms = Counter()
+        for token in tokenize(product.get('title') or ''):
+            terms[token] += TITLE_WEIGHT
+        for token in tokenize(product.get('description') or ''):
+            terms[token] += DESCRIPTION_WEIGHT
+        return terms
+
+    def add_product(self, product: Dict):
+        """Indexa (ou reindexa) um produto"""
+        product_id = product['id']
+        terms = self._document_terms(product)
+
+        with self._lock:
+            self._remove(product_id)
+
+            for term, frequency in terms.items():
+                self.postings.setdefault(term, {})[product_id] = frequency
+
+            length = sum(terms.values())
+            self.documents[product_id] = product
+            self.doc_terms[product_id] = terms
+            self.doc_lengths[product_id] = length
+            self.total_length += length
+
+    def remove_product(self, product_id: str):
+        """Remove um produto do índice"""
+        with self._lock:
+            self._remove(product_id)
+
+    def _remove(self, product_id: str):
+        terms = self.doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(product_id, None)
+            if not posting:
+                del self.postings[term]
+
+        self.total_length -= self.doc_lengths.pop(product_id, 0)
+        self.documents.pop(product_id, None)
+
+    # Interface de listener do ProductStore
+    def on_insert(self, product: Dict):
+        self.add_product(product)
+
+    def on_delete(self, product: Dict):
+        self.remove_product(product['id'])
+
+    def match(self, query: str) -> Dict[str, float]:
+        """Retorna {id: score BM25} de todos os produtos que contêm algum termo da busca"""
+        query_terms = set(tokenize(query))
+        scores: Dict[str, float] = {}
+
+        with self._lock:
+            total_docs = len(self.doc_lengths)
+            if not total_docs or not query_terms:
+                return scores
+
+            average_length = self.total_length / total_docs
+
+            for term in query_terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+
+                df = len(posting)
+                idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+
+                for product_id, frequency in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[product_id] / average_length)
+                    score = idf * frequency * (self.k1 + 1) / (frequency + norm)
+                    scores[product_id] = scores.get(product_id, 0.0) + score
+
+        return scores
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        accept: Optional[Callable[[Dict], bool]] = None,
+        after: Optional[Tuple[float, str]] = None,
+        **filters
+    ) -> Tuple[List[Tuple[Dict, float]], int]:
+        """Busca os `limit` produtos mais relevantes
+
+        Retorna a lista [(produto, score)] ordenada por relevância (empates
+        pelo id) e o total de produtos encontrados (após os filtros de
+        igualdade `filters` e o filtro `accept`). Com `after` = (score, id)
+        do último resultado de uma página, busca os seguintes a ele.
+        """
+        scores = self.match(query)
+        wanted = [(field, value) for field, value in filters.items() if value is not None]
+        matches = []
+        following = []
+        for product_id, score in scores.items():
+            product = self.documents.get(product_id)
+            if product is None or any(product.get(field) != value for field, value in wanted):
+                continue
+            if accept is None or accept(product):
+                matches.append((product, score))
+                if after is None or (score, product_id) < after:
+                    following.append((product, score))
+
+        top = heapq.nlargest(max(limit, 0), following, key=lambda item: (item[1], item[0]['id']))
+        return top, len(matches)
+
+    def reset(self):
+        """Esvazia o índice (o ProductStore repovoa via on_insert)"""
+        self.rebuild(())
+
+    def rebuild(self, products: Iterable[Dict]):
+        """Reconstrói o índice a partir de uma coleção de produtos"""
+        with self._lock:
+            self.documents.clear()
+            self.postings.clear()
+            self.doc_terms.clear()
+            self.doc_lengths.clear()
+            self.total_length = 0
+            for product in products:
+                self.add_product(product)
@@ -0,0 +1,267 @@
+# =====================================================
+# Produtos similares por TF-IDF (matriz esparsa SciPy)
+# Arquivo: similar_products.py
+# =====================================================
+
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from search_index import DESCRIPTION_WEIGHT, TITLE_WEIGHT, tokenize
+
+# Peso de cada feature do produto (listas de características)
+FEATURE_WEIGHT = 1
+
+# Consolidar as linhas pendentes quando passarem desta fração do catálogo
+MERGE_RATIO = 0.02
+MIN_MERGE_ROWS = 1000
+
+# Termos de maior peso usados na consulta (limita as colunas percorridas)
+MAX_QUERY_TERMS = 32
+
+# Consultas calculadas juntas numa multiplicação (limita a matriz de scores)
+QUERY_BATCH_SIZE = 16
+
+DTYPE = np.float32
+
+
+class SimilarProducts:
+    """Similaridade de cosseno entre vetores TF-IDF de título, descrição e features
+
+    Os vetores consolidados ficam numa matriz CSC normalizada (coluna =
+    termo), então uma consulta só percorre as postings dos seus termos.
+    Produtos novos entram numa área pendente, pontuada à parte, e são
+    consolidados (com o IDF recalculado) quando ela cresce; remoções só
+    marcam a linha como morta até a próxima consolidação.
+    """
+
+    def __init__(self, merge_ratio: float = MERGE_RATIO, min_merge_rows: int = MIN_MERGE_ROWS):
+        self.merge_ratio = merge_ratio
+        self.min_merge_rows = min_merge_rows
+        self._lock = threading.RLock()
+        self._clear()
+
+    def _clear(self):
+        self.vocabulary: Dict[str, int] = {}
+        # Documentos vivos que contêm cada termo
+        self.df: List[int] = []
+        # Linha -> id (None = removido) e id -> linha
+        self.ids: List[Optional[str]] = []
+        self.rows: Dict[str, int] = {}
+        # Linhas consolidadas: tf bruto (CSR) e vetores normalizados (CSC)
+        self.counts = sparse.csr_matrix((0, 0), dtype=DTYPE)
+        self.weights = sparse.csc_matrix((0, 0), dtype=DTYPE)
+        self.alive = np.zeros(0, dtype=bool)
+        self.main_rows = 0
+        self.dead = 0
+        # Linhas pendentes: linha -> (termos, tf)
+        self.pending: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._pending_matrix = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    # ---------------------------------------------
+    # Interface de listener do ProductStore
+    # ---------------------------------------------
+
+    def reset(self):
+        """Descarta os vetores (o ProductStore repovoa via on_insert)"""
+        with self._lock:
+            self._clear()
+
+    def on_insert(self, product: Dict):
+        with self._lock:
+            if product['id'] in self.rows:
+                return
+            columns, tf = self._term_vector(product)
+            row = len(self.ids)
+            self.ids.append(product['id'])
+            self.rows[product['id']] = row
+            self.pending[row] = (columns, tf)
+            self._pending_matrix = None
+            for column in columns:
+                self.df[column] += 1
+
+    def on_delete(self, product: Dict):
+        with self._lock:
+            row = self.rows.pop(product['id'], None)
+            if row is None:
+                return
+
+            columns, _ = self._row_terms(row)
+            for column in columns:
+                self.df[column] -= 1
+
+            self.ids[row] = None
+            if row in self.pending:
+                del self.pending[row]
+                self._pending_matrix = None
+            else:
+                self.alive[row] = False
+                self.dead += 1
+
+    def _term_vector(self, product: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """Termos do produto (colunas) e tf sublinear, criando termos novos"""
+        terms = Counter()
+        for token in tokenize(product.get('title') or ''):
+            terms[token] += TITLE_WEIGHT
+        for token in tokenize(product.get('description') or ''):
+            terms[token] += DESCRIPTION_WEIGHT
+        for feature in product.get('features') or ():
+            for token in tokenize(feature if isinstance(feature, str) else ''):
+                terms[token] += FEATURE_WEIGHT
+
+        columns = np.empty(len(terms), dtype=np.int32)
+        tf = np.empty(len(terms), dtype=DTYPE)
+        for position, (term, count) in enumerate(terms.items()):
+            column = self.vocabulary.get(term)
+            if column is None:
+                column = len(self.vocabulary)
+                self.vocabulary[term] = column
+                self.df.append(0)
+            columns[position] = column
+            tf[position] = 1 + math.log(count)
+
+        order = np.argsort(columns)
+        return columns[order], tf[order]
+
+    def _row_terms(self, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        if row in self.pending:
+            return self.pending[row]
+        start, stop = self.counts.indptr[row], self.counts.indptr[row + 1]
+        return self.counts.indices[start:stop], self.counts.data[start:stop]
+
+    # ---------------------------------------------
+    # Consolidação
+    # ---------------------------------------------
+
+    def _idf(self) -> np.ndarray:
+        """IDF suavizado com as frequências atuais"""
+        df = np.asarray(self.df, dtype=np.float64)
+        return (np.log((1 + len(self.rows)) / (1 + df)) + 1).astype(DTYPE)
+
+    @staticmethod
+    def _normalize(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags((1 / norms).astype(DTYPE)) @ matrix
+
+    def _pending_counts(self, rows: Sequence[int]) -> sparse.csr_matrix:
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        for position, row in enumerate(rows):
+            indptr[position + 1] = indptr[position] + len(self.pending[row][0])
+        indices = np.concatenate([self.pending[row][0] for row in rows]) if rows else np.zeros(0, np.int32)
+        data = np.concatenate([self.pending[row][1] for row in rows]) if rows else np.zeros(0, DTYPE)
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), len(self.vocabulary)))
+
+    def _maybe_consolidate(self):
+        if len(self.pending) + self.dead > max(self.min_merge_rows, self.merge_ratio * self.main_rows):
+            self.consolidate()
+
+    def consolidate(self):
+        """Junta as linhas pendentes, descarta as removidas e recalcula o IDF"""
+        with self._lock:
+            vocabulary_size = len(self.vocabulary)
+            alive_rows = np.flatnonzero(self.alive)
+            main = self.counts[alive_rows]
+            main = sparse.csr_matrix(
+                (main.data, main.indices, main.indptr), shape=(main.shape[0], vocabulary_size)
+            )
+            pending_rows = sorted(self.pending)
+            counts = sparse.vstack([main, self._pending_counts(pending_rows)], format='csr', dtype=DTYPE)
+
+            self.ids = [self.ids[row] for row in alive_rows] + [self.ids[row] for row in pending_rows]
+            self.rows = {product_id: row for row, product_id in enumerate(self.ids)}
+            self.counts = counts
+            self.weights = self._normalize(counts.multiply(self._idf()).tocsr()).tocsc()
+            self.alive = np.ones(len(self.ids), dtype=bool)
+            self.main_rows = len(self.ids)
+            self.dead = 0
+            self.pending = {}
+            self._pending_matrix = None
+
+    # ---------------------------------------------
+    # Consulta
+    # ---------------------------------------------
+
+    def _query_vector(self, row: int, idf: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        columns, tf = self._row_terms(row)
+        weights = tf * idf[columns]
+        if len(columns) > MAX_QUERY_TERMS:
+            keep = np.sort(np.argpartition(weights, -MAX_QUERY_TERMS)[-MAX_QUERY_TERMS:])
+            columns, weights = columns[keep], weights[keep]
+        norm = np.sqrt(np.dot(weights, weights))
+        return columns, weights / norm if norm else weights
+
+    def similar(self, product_id: str, limit: int = 10) -> List[Tuple[str, float]]:
+        """Os `limit` produtos mais parecidos com `product_id`: [(id, score)]"""
+        return self.similar_batch([product_id], limit).get(product_id, [])
+
+    def similar_batch(self, product_ids: Sequence[str], limit: int = 10) -> Dict[str, List[Tuple[str, float]]]:
+        """Top-k de vários produtos, com as consultas multiplicadas em lotes"""
+        results: Dict[str, List[Tuple[str, float]]] = {}
+        if limit <= 0:
+            return results
+
+        with self._lock:
+            self._maybe_consolidate()
+            known = [product_id for product_id in product_ids if product_id in self.rows]
+            if not known:
+                return results
+
+            idf = self._idf()
+            pending_rows = sorted(self.pending)
+            if self._pending_matrix is None and pending_rows:
+                counts = self._pending_counts(pending_rows)
+                self._pending_matrix = self._normalize(counts.multiply(idf).tocsr()).tocsc()
+
+            for start in range(0, len(known), QUERY_BATCH_SIZE):
+                batch = known[start:start + QUERY_BATCH_SIZE]
+                query_rows = [self.rows[product_id] for product_id in batch]
+                queries = self._query_matrix(query_rows, idf)
+
+                # Scores das linhas consolidadas e das pendentes (linhas x consultas)
+                scores = self._scores(self.weights, queries)
+                row_ids = np.arange(self.main_rows)
+                if pending_rows:
+                    scores = np.vstack([scores, self._scores(self._pending_matrix, queries)])
+                    row_ids = np.concatenate([row_ids, pending_rows])
+
+                valid = np.concatenate([self.alive, np.ones(len(pending_rows), dtype=bool)])
+                scores[~valid] = 0
+
+                for column, (product_id, row) in enumerate(zip(batch, query_rows)):
+                    results[product_id] = self._top_k(scores[:, column], row_ids, row, limit)
+
+        return results
+
+    def _query_matrix(self, rows: Sequence[int], idf: np.ndarray) -> sparse.csr_matrix:
+        """Vetores normalizados das consultas (termos x consultas)"""
+        vectors = [self._query_vector(row, idf) for row in rows]
+        indptr = np.cumsum([0] + [len(columns) for columns, _ in vectors])
+        indices = np.concatenate([columns for columns, _ in vectors])
+        data = np.concatenate([weights for _, weights in vectors]).astype(DTYPE)
+        return sparse.csc_matrix((data, indices, indptr), shape=(len(self.vocabulary), len(rows)))
+
+    @staticmethod
+    def _scores(matrix: sparse.csc_matrix, queries: sparse.csc_matrix) -> np.ndarray:
+        """Produto restrito às colunas (termos) usadas por alguma consulta"""
+        columns = np.unique(queries.indices)
+        columns = columns[columns < matrix.shape[1]]
+        if not matrix.shape[0] or not len(columns):
+            return np.zeros((matrix.shape[0], queries.shape[1]), dtype=DTYPE)
+        return np.asarray((matrix[:, columns] @ queries[columns, :]).todense())
+
+    def _top_k(self, scores: np.ndarray, row_ids: np.ndarray, exclude_row: int, limit: int) -> List[Tuple[str, float]]:
+        scores = scores.copy()
+        scores[row_ids == exclude_row] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(self.ids[row_ids[position]], float(scores[position])) for position in candidates]
@@ -0,0 +1,80 @@
+# =====================================================
+# Índice ordenado (bisect) para faixas e ordenação
+# Arquivo: sorted_index.py
+# =====================================================
+
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Lotes menores que isto são inseridos um a um (insort); os maiores são
+# anexados e reordenados, o que o Timsort faz fundindo as duas sequências
+BULK_ADD_MIN = 64
+
+# Maior id possível, usado como sentinela no limite superior das faixas
+MAX_ID = '\U0010ffff'
+
+
+class SortedIndex:
+    """Array ordenado de (valor, id) mantido com bisect
+
+    Consultas de faixa custam O(log n + k) e a página na posição `offset`
+    é obtida por fatiamento, sem ordenar nada na consulta.
+    """
+
+    def __init__(self):
+        self.keys: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, product_id: str, value: float):
+        insort(self.keys, (value, product_id))
+
+    def add_many(self, items: Iterable[Tuple[str, float]]):
+        """Insere vários (id, valor) de uma vez, em O(n + k log k)"""
+        new_keys = sorted((value, product_id) for product_id, value in items)
+        if len(new_keys) < BULK_ADD_MIN:
+            for key in new_keys:
+                insort(self.keys, key)
+            return
+
+        in_order = not self.keys or self.keys[-1] <= new_keys[0]
+        self.keys.extend(new_keys)
+        if not in_order:
+            self.keys.sort()
+
+    def remove(self, product_id: str, value: float):
+        key = (value, product_id)
+        position = bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+
+    def bounds(self, low: Optional[float] = None, high: Optional[float] = None) -> Tuple[int, int]:
+        """Posições [início, fim) dos valores em [low, high]"""
+        start = bisect_left(self.keys, (low,)) if low is not None else 0
+        stop = bisect_right(self.keys, (high, MAX_ID)) if high is not None else len(self.keys)
+        return start, max(start, stop)
+
+    def after(self, key: Tuple[float, str], start: int, stop: int, reverse: bool = False) -> Tuple[int, int]:
+        """Restringe a faixa [start, stop) às chaves depois de `key` na ordem pedida"""
+        if reverse:
+            return start, max(start, min(stop, bisect_left(self.keys, key)))
+        return max(start, min(stop, bisect_right(self.keys, key))), stop
+
+    def slice(self, start: int, stop: int, offset: int, limit: int, reverse: bool = False) -> List[str]:
+        """Ids da página [offset, offset + limit) dentro da faixa [start, stop)"""
+        if reverse:
+            end = max(stop - offset, start)
+            begin = max(end - limit, start)
+            return [key[1] for key in reversed(self.keys[begin:end])]
+
+        begin = min(start + offset, stop)
+        end = min(begin + limit, stop)
+        return [key[1] for key in self.keys[begin:end]]
+
+    def iter_ids(self, start: int, stop: int, reverse: bool = False) -> Iterator[str]:
+        """Percorre os ids da faixa [start, stop) em ordem"""
+        positions = range(stop - 1, start - 1, -1) if reverse else range(start, stop)
+        keys = self.keys
+        for position in positions:
+            yield keys[position][1]
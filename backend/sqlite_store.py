@@ -0,0 +1,702 @@
+# =====================================================
+# Armazenamento de produtos em SQLite (WAL + FTS5)
+# Arquivo: sqlite_store.py
+# =====================================================
+
+import heapq
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from json_backend import dumps, loads
+from product_record import ProductRecord
+from product_store import INDEXED_FIELDS, SORT_ORDERS, UPSERT_PRESERVED_FIELDS, Page, SortKey, sort_value, with_defaults
+from search_index import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Statements preparados mantidos em cache por conexão
+CACHED_STATEMENTS = 256
+
+# Espera por um lock de escrita de outro processo (ms)
+BUSY_TIMEOUT_MS = 5000
+
+# Entradas do registro de alterações mantidas para outros processos
+CHANGES_RETAINED = 100000
+PRUNE_INTERVAL = 1000
+
+# Acima disto, o total de um `seek` é informado como estimativa (limite inferior)
+COUNT_CAP = 10000
+
+# Pesos do BM25 do FTS5 por coluna: título, descrição
+FTS_WEIGHTS = (2.0, 1.0)
+
+# Ordenação: campo do índice -> coluna
+SORT_COLUMNS = {'sequence': 'seq', 'price': 'price', 'rating': 'rating'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    marketplace TEXT,
+    marketplace_id TEXT,
+    category TEXT,
+    status TEXT,
+    price REAL NOT NULL,
+    rating REAL NOT NULL,
+    title_terms TEXT NOT NULL,
+    description_terms TEXT NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_marketplace ON products (marketplace);
+CREATE INDEX IF NOT EXISTS products_category ON products (category);
+CREATE INDEX IF NOT EXISTS products_status ON products (status);
+CREATE INDEX IF NOT EXISTS products_price ON products (price, id);
+CREATE INDEX IF NOT EXISTS products_rating ON products (rating, id);
+CREATE INDEX IF NOT EXISTS products_marketplace_id ON products (marketplace, marketplace_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5 (
+    title_terms, description_terms,
+    content='products', content_rowid='seq',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts (rowid, title_terms, description_terms)
+    VALUES (new.seq, new.title_terms, new.description_terms);
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, title_terms, description_terms)
+    VALUES ('delete', old.seq, old.title_terms, old.description_terms);
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF title_terms, description_terms ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, title_terms, description_terms)
+    VALUES ('delete', old.seq, old.title_terms, old.description_terms);
+    INSERT INTO products_fts (rowid, title_terms, description_terms)
+    VALUES (new.seq, new.title_terms, new.description_terms);
+END;
+
+-- Alterações para os listeners dos outros processos: versões antes/depois
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    origin TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    before BLOB,
+    after BLOB
+);
+"""
+
+INSERT_PRODUCT = """
+INSERT INTO products (
+    id, marketplace, marketplace_id, category, status, price, rating, title_terms, description_terms, data
+)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+UPDATE_PRODUCT = """
+UPDATE products SET marketplace = ?, marketplace_id = ?, category = ?, status = ?,
+    price = ?, rating = ?, title_terms = ?, description_terms = ?, data = ?
+WHERE id = ?
+"""
+DELETE_PRODUCT = 'DELETE FROM products WHERE id = ?'
+SELECT_PRODUCT = 'SELECT data FROM products WHERE id = ?'
+SELECT_PRODUCTS = 'SELECT id, data FROM products WHERE id IN (SELECT value FROM json_each(?))'
+SELECT_ALL = 'SELECT data FROM products ORDER BY seq'
+SELECT_BY_MARKETPLACE_ID = 'SELECT data FROM products WHERE marketplace = ? AND marketplace_id = ? LIMIT 1'
+SELECT_BY_MARKETPLACE_IDS = """
+SELECT marketplace, marketplace_id, data FROM products
+WHERE (marketplace, marketplace_id) IN (SELECT value ->> 0, value ->> 1 FROM json_each(?))
+"""
+COUNT_PRODUCTS = 'SELECT COUNT(*) FROM products'
+EXISTS_PRODUCT = 'SELECT 1 FROM products WHERE id = ?'
+
+INSERT_CHANGE = 'INSERT INTO changes (origin, product_id, before, after) VALUES (?, ?, ?, ?)'
+SELECT_CHANGES = 'SELECT seq, origin, before, after FROM changes WHERE seq > ? ORDER BY seq'
+CHANGES_RANGE = 'SELECT MIN(seq), MAX(seq) FROM changes'
+PRUNE_CHANGES = 'DELETE FROM changes WHERE seq <= ?'
+
+# Bancos criados antes de title/description guardarem os termos normalizados
+MIGRATE_TERMS = (
+    'DROP TRIGGER IF EXISTS products_fts_insert',
+    'DROP TRIGGER IF EXISTS products_fts_delete',
+    'DROP TRIGGER IF EXISTS products_fts_update',
+    'DROP TABLE IF EXISTS products_fts',
+    'ALTER TABLE products RENAME COLUMN title TO title_terms',
+    'ALTER TABLE products RENAME COLUMN description TO description_terms',
+)
+UPDATE_TERMS = 'UPDATE products SET title_terms = ?, description_terms = ? WHERE seq = ?'
+REBUILD_FTS = "INSERT INTO products_fts (products_fts) VALUES ('rebuild')"
+
+FTS_MATCH = f"""
+SELECT p.id, -bm25(products_fts, {FTS_WEIGHTS[0]}, {FTS_WEIGHTS[1]})
+FROM products_fts JOIN products p ON p.seq = products_fts.rowid
+WHERE products_fts MATCH ?
+"""
+
+
+def search_terms(text) -> str:
+    """Texto indexado pelo FTS5: os termos do tokenize do SearchIndex
+
+    Índice e consulta passam pela mesma normalização (acentos e plurais),
+    então "botões" encontra "botão" como no índice em memória.
+    """
+    return ' '.join(tokenize(str(text or '')))
+
+
+def product_row(product: Dict) -> Tuple:
+    """Colunas indexadas do produto (mesma ordem de INSERT_PRODUCT, sem o id)"""
+    return (
+        product.get('marketplace'),
+        product.get('marketplace_id'),
+        product.get('category'),
+        product.get('status'),
+        sort_value(product, 'price'),
+        sort_value(product, 'rating'),
+        search_terms(product.get('title')),
+        search_terms(product.get('description')),
+        dumps(product),
+    )
+
+
+def load_product(data: bytes) -> ProductRecord:
+    return ProductRecord(loads(data))
+
+
+class SQLiteProductStore:
+    """ProductStore persistido num arquivo SQLite, com a mesma interface
+
+    O banco fica em modo WAL: leitores não bloqueiam o escritor, então
+    vários processos (workers do gunicorn) podem abrir o mesmo arquivo.
+    Cada thread usa sua própria conexão, com os statements preparados em
+    cache; os filtros da API usam índices das colunas e a busca usa FTS5.
+
+    Listeners funcionam como no ProductStore. As escritas dos outros
+    processos chegam pelo registro de alterações, aplicado por `sync()`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.listeners = []
+        # Identifica as alterações deste processo no registro
+        self.origin = uuid.uuid4().hex
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._pending: Optional[List[Tuple[Optional[ProductRecord], Optional[ProductRecord]]]] = None
+        self._writes = 0
+
+        connection = self._connection()
+        migrated = self._migrate_terms(connection)
+        connection.executescript(SCHEMA)
+        if migrated:
+            connection.execute(REBUILD_FTS)
+        self._last_change = connection.execute(CHANGES_RANGE).fetchone()[1] or 0
+
+    @staticmethod
+    def _migrate_terms(connection: sqlite3.Connection) -> bool:
+        """Troca o texto cru das colunas do FTS pelos termos normalizados (uma vez)"""
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            columns = {row[1] for row in connection.execute("SELECT * FROM pragma_table_info('products')")}
+            if 'title' not in columns:
+                connection.execute('COMMIT')
+                return False
+
+            for statement in MIGRATE_TERMS:
+                connection.execute(statement)
+            rows = connection.execute('SELECT seq, data FROM products').fetchall()
+            terms = []
+            for seq, data in rows:
+                product = loads(data)
+                terms.append((search_terms(product.get('title')), search_terms(product.get('description')), seq))
+            connection.executemany(UPDATE_TERMS, terms)
+            connection.execute('COMMIT')
+            return True
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão da thread atual (reaberta após um fork)"""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False,
+                cached_statements=CACHED_STATEMENTS
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+            local.connection = connection
+            local.pid = os.getpid()
+            local.data_version = None
+        return local.connection
+
+    @contextmanager
+    def _snapshot(self):
+        """Leituras consistentes entre si (uma transação de leitura)"""
+        connection = self._connection()
+        if connection.in_transaction:
+            yield connection
+            return
+        connection.execute('BEGIN')
+        try:
+            yield connection
+        finally:
+            connection.execute('COMMIT')
+
+    def __len__(self) -> int:
+        return self._connection().execute(COUNT_PRODUCTS).fetchone()[0]
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self._all(self._connection()))
+
+    def __contains__(self, product_id: str) -> bool:
+        return self._connection().execute(EXISTS_PRODUCT, (product_id,)).fetchone() is not None
+
+    def _all(self, connection: sqlite3.Connection) -> List[ProductRecord]:
+        return [load_product(data) for data, in connection.execute(SELECT_ALL)]
+
+    def add_listener(self, listener):
+        """Registra um índice derivado e o popula com os produtos atuais"""
+        with self._lock, self._snapshot() as connection:
+            # Listeners atuais e o novo partem do mesmo ponto do registro
+            self._catch_up(connection)
+            for product in self._all(connection):
+                listener.on_insert(product)
+            self.listeners.append(listener)
+
+    # ---------------------------------------------
+    # Alterações de outros processos
+    # ---------------------------------------------
+
+    def sync(self):
+        """Aplica aos listeners as escritas feitas por outros processos
+
+        Barato quando não houve escrita: só compara o `data_version` da
+        conexão. Se o registro já foi podado além do último ponto aplicado,
+        os listeners são esvaziados e repovoados.
+        """
+        connection = self._connection()
+        data_version = connection.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self._local.data_version:
+            return
+
+        with self._lock, self._snapshot() as connection:
+            self._catch_up(connection)
+        self._local.data_version = data_version
+
+    def _catch_up(self, connection: sqlite3.Connection):
+        first, last = connection.execute(CHANGES_RANGE).fetchone()
+        if last is None or last <= self._last_change:
+            return
+
+        if first > self._last_change + 1:
+            products = self._all(connection)
+            for listener in self.listeners:
+                listener.reset()
+                for product in products:
+                    listener.on_insert(product)
+        else:
+            for _, origin, before, after in connection.execute(SELECT_CHANGES, (self._last_change,)):
+                if origin != self.origin:
+                    self._notify([(
+                        load_product(before) if before is not None else None,
+                        load_product(after) if after is not None else None,
+                    )])
+        self._last_change = last
+
+    def _notify(self, changes):
+        """Aplica aos listeners alterações já gravadas no banco
+
+        A gravação não é desfeita se um listener falhar (o cliente recebe o
+        que foi persistido): a falha vai para o log e o listener é
+        repovoado a partir do banco, para não ficar divergente.
+        """
+        failed = []
+        for listener in self.listeners:
+            try:
+                for before, after in changes:
+                    if before is not None:
+                        listener.on_delete(before)
+                    if after is not None:
+                        listener.on_insert(after)
+            except Exception:
+                logger.exception(f"Listener {type(listener).__name__} falhou; repovoando a partir do banco")
+                failed.append(listener)
+
+        if failed:
+            products = self._all(self._connection())
+            for listener in failed:
+                try:
+                    listener.reset()
+                    for product in products:
+                        listener.on_insert(product)
+                except Exception:
+                    logger.exception(f"Listener {type(listener).__name__} não pôde ser repovoado")
+
+    # ---------------------------------------------
+    # Leitura
+    # ---------------------------------------------
+
+    def get(self, product_id: str) -> Optional[Dict]:
+        row = self._connection().execute(SELECT_PRODUCT, (product_id,)).fetchone()
+        return load_product(row[0]) if row else None
+
+    def get_many(self, product_ids: Iterable[str]) -> List[Dict]:
+        """Busca vários produtos por id (na ordem pedida), ignorando os inexistentes"""
+        product_ids = list(product_ids)
+        if not product_ids:
+            return []
+        rows = dict(self._connection().execute(SELECT_PRODUCTS, (dumps(product_ids).decode('utf-8'),)))
+        return [load_product(rows[pid]) for pid in product_ids if pid in rows]
+
+    def find_by_marketplace_id(self, marketplace: str, marketplace_id: str) -> Optional[Dict]:
+        row = self._connection().execute(SELECT_BY_MARKETPLACE_ID, (marketplace, marketplace_id)).fetchone()
+        return load_product(row[0]) if row else None
+
+    def postings(self, field: str, value: Optional[str]) -> Set[str]:
+        """Ids de produtos com `field == value`"""
+        return self.select_ids(**{field: value}) if value is not None else self._ids_where(f'{field} IS NULL', [])
+
+    def select_ids(self, **filters) -> Optional[Set[str]]:
+        """Ids que passam pelos filtros de igualdade (None sem filtros)"""
+        where, params = self._where(None, None, None, filters)
+        if not where:
+            return None
+        return self._ids_where(where, params)
+
+    def _ids_where(self, where: str, params: List) -> Set[str]:
+        rows = self._connection().execute(f'SELECT id FROM products WHERE {where}', params)
+        return {product_id for product_id, in rows}
+
+    @staticmethod
+    def _where(within, min_price, max_price, filters) -> Tuple[str, List]:
+        """Cláusula WHERE (sem a palavra-chave) e parâmetros dos filtros"""
+        clauses, params = [], []
+        for field, value in filters.items():
+            if value is None:
+                continue
+            if field not in INDEXED_FIELDS:
+                raise KeyError(field)
+            clauses.append(f'{field} = ?')
+            params.append(value)
+        if min_price is not None:
+            clauses.append('price >= ?')
+            params.append(min_price)
+        if max_price is not None:
+            clauses.append('price <= ?')
+            params.append(max_price)
+        if within is not None:
+            clauses.append('id IN (SELECT value FROM json_each(?))')
+            params.append(dumps(list(within)).decode('utf-8'))
+        return ' AND '.join(clauses), params
+
+    def query(
+        self,
+        within: Optional[Iterable[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+        **filters
+    ) -> Tuple[List[Dict], int]:
+        """Página de produtos filtrada e ordenada, com o total de resultados"""
+        field, reverse = SORT_ORDERS.get(sort, ('sequence', False))
+        where, params = self._where(within, min_price, max_price, filters)
+        where = f'WHERE {where}' if where else ''
+        order = self._order(field, reverse)
+
+        with self._snapshot() as connection:
+            total = connection.execute(f'SELECT COUNT(*) FROM products {where}', params).fetchone()[0]
+            if not total or offset >= total or limit <= 0:
+                return [], total
+            rows = connection.execute(
+                f'SELECT data FROM products {where} ORDER BY {order} LIMIT ? OFFSET ?',
+                params + [limit, max(offset, 0)]
+            )
+            return [load_product(data) for data, in rows], total
+
+    def seek(
+        self,
+        within: Optional[Iterable[str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        sort: Optional[str] = None,
+        after: Optional[SortKey] = None,
+        limit: int = 20,
+        exact_total: bool = False,
+        **filters
+    ) -> Page:
+        """Página por keyset: os `limit` produtos depois de `after` na ordenação
+
+        A posição é uma comparação de row values sobre o índice (valor, id).
+        Sem `exact_total`, a contagem para em COUNT_CAP e o total passa a
+        ser um limite inferior.
+        """
+        field, reverse = SORT_ORDERS.get(sort, ('sequence', False))
+        column = SORT_COLUMNS[field]
+        limit = max(limit, 0)
+        where, params = self._where(within, min_price, max_price, filters)
+
+        page_where, page_params = where, list(params)
+        if after is not None:
+            seek_clause = f"({column}, id) {'<' if reverse else '>'} (?, ?)"
+            page_where = f'{where} AND {seek_clause}' if where else seek_clause
+            page_params += [after[0], after[1]]
+        page_where = f'WHERE {page_where}' if page_where else ''
+        count_where = f'WHERE {where}' if where else ''
+
+        with self._snapshot() as connection:
+            rows = connection.execute(
+                f'SELECT {column}, id, data FROM products {page_where} '
+                f'ORDER BY {self._order(field, reverse)} LIMIT ?',
+                page_params + [limit + 1]
+            ).fetchall()
+
+            if exact_total or not where:
+                total = connection.execute(f'SELECT COUNT(*) FROM products {count_where}', params).fetchone()[0]
+                total_exact = True
+            else:
+                total = connection.execute(
+                    f'SELECT COUNT(*) FROM (SELECT 1 FROM products {count_where} LIMIT ?)', params + [COUNT_CAP]
+                ).fetchone()[0]
+                total_exact = total < COUNT_CAP
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_key = (rows[-1][0], rows[-1][1]) if has_more and rows else None
+        return Page([load_product(data) for _, _, data in rows], next_key, total, total_exact)
+
+    @staticmethod
+    def _order(field: str, reverse: bool) -> str:
+        direction = 'DESC' if reverse else 'ASC'
+        column = SORT_COLUMNS[field]
+        if column == 'seq':
+            return f'seq {direction}'
+        return f'{column} {direction}, id {direction}'
+
+    # ---------------------------------------------
+    # Escrita
+    # ---------------------------------------------
+
+    @contextmanager
+    def batch(self):
+        """Agrupa escritas numa única transação
+
+        Os listeners só são notificados depois do commit (falhas deles não
+        desfazem a gravação, ver `_notify`); se o bloco falhar, nada é gravado
+        nem notificado. Blocos aninhados juntam-se ao externo.
+        """
+        with self._lock:
+            if self._pending is not None:
+                yield
+                return
+
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+            self._pending = []
+            try:
+                yield
+                self._writes += len(self._pending)
+                if self._writes >= PRUNE_INTERVAL:
+                    self._prune(connection)
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                self._pending = None
+                raise
+
+            changes, self._pending = self._pending, None
+            self._notify(changes)
+
+    def _record(self, connection: sqlite3.Connection, product_id: str, before, after, before_data, after_data):
+        """Registra a alteração (com as versões já serializadas) para o commit"""
+        connection.execute(INSERT_CHANGE, (self.origin, product_id, before_data, after_data))
+        self._pending.append((before, after))
+
+    def _prune(self, connection: sqlite3.Connection):
+        last = connection.execute(CHANGES_RANGE).fetchone()[1] or 0
+        connection.execute(PRUNE_CHANGES, (last - CHANGES_RETAINED,))
+        self._writes = 0
+
+    def insert(self, product: Dict) -> ProductRecord:
+        """Grava o produto; KeyError se o id já existir"""
+        if not isinstance(product, ProductRecord):
+            product = ProductRecord(product)
+
+        product_id = product['id']
+        with self.batch():
+            connection = self._connection()
+            row = product_row(product)
+            try:
+                connection.execute(INSERT_PRODUCT, (product_id,) + row)
+            except sqlite3.IntegrityError:
+                raise KeyError(f"Produto já existe: {product_id}")
+            self._record(connection, product_id, None, product, None, row[-1])
+        return product
+
+    def extend(self, products: Iterable[Dict]):
+        """Insere vários produtos numa única transação"""
+        with self.batch():
+            for product in products:
+                self.insert(product)
+
+    def upsert(self, product: Dict, defaults: Optional[Dict] = None) -> Tuple[ProductRecord, bool]:
+        """Atualiza o produto de mesmo (marketplace, marketplace_id) ou insere (ver ProductStore)"""
+        with self.batch():
+            existing = None
+            if product.get('marketplace_id'):
+                existing = self.find_by_marketplace_id(product.get('marketplace'), product['marketplace_id'])
+            if existing is None:
+                return self.insert(with_defaults(product, defaults)), True
+            changes = {field: value for field, value in product.items() if field not in UPSERT_PRESERVED_FIELDS}
+            return self.update(existing['id'], changes), False
+
+    def upsert_many(self, products: Iterable[Dict], defaults: Optional[Dict] = None) -> List[Tuple[ProductRecord, bool]]:
+        """Upsert de um lote numa única transação
+
+        Os produtos existentes são buscados numa só consulta e os novos
+        gravados com executemany. Um produto repetido no lote atualiza o
+        que foi criado antes nele; `defaults` só completa os criados.
+        """
+        products = [product if isinstance(product, ProductRecord) else ProductRecord(product) for product in products]
+
+        with self.batch():
+            connection = self._connection()
+            keys = [
+                [product.get('marketplace'), product['marketplace_id']]
+                for product in products if product.get('marketplace_id')
+            ]
+            current: Dict[Tuple[str, str], ProductRecord] = {}
+            if keys:
+                rows = connection.execute(SELECT_BY_MARKETPLACE_IDS, (dumps(keys).decode('utf-8'),))
+                for marketplace, marketplace_id, data in rows:
+                    current.setdefault((marketplace, marketplace_id), load_product(data))
+
+            results: List[Tuple[ProductRecord, bool]] = []
+            new_products: Dict[str, ProductRecord] = {}
+            for product in products:
+                key = (product.get('marketplace'), product.get('marketplace_id'))
+                existing = current.get(key) if key[1] else None
+                if existing is not None:
+                    changes = {field: value for field, value in product.items() if field not in UPSERT_PRESERVED_FIELDS}
+                    if existing['id'] in new_products:
+                        existing.update(changes)
+                    else:
+                        existing = current[key] = self.update(existing['id'], changes)
+                    results.append((existing, False))
+                else:
+                    if product['id'] in new_products:
+                        raise KeyError(f"Produto já existe: {product['id']}")
+                    if defaults:
+                        product.update(
+                            (field, value) for field, value in defaults.items() if product.get(field) is None
+                        )
+                    new_products[product['id']] = product
+                    if key[1]:
+                        current[key] = product
+                    results.append((product, True))
+
+            rows = [(product_id,) + product_row(product) for product_id, product in new_products.items()]
+            try:
+                connection.executemany(INSERT_PRODUCT, rows)
+            except sqlite3.IntegrityError:
+                raise KeyError('Produto já existe')
+            connection.executemany(INSERT_CHANGE, [(self.origin, row[0], None, row[-1]) for row in rows])
+            self._pending.extend((None, product) for product in new_products.values())
+
+        return results
+
+    def update(self, product_id: str, changes: Dict) -> ProductRecord:
+        """Aplica `changes` ao produto, mantendo índices e listeners em dia"""
+        with self.batch():
+            connection = self._connection()
+            row = connection.execute(SELECT_PRODUCT, (product_id,)).fetchone()
+            if row is None:
+                raise KeyError(product_id)
+
+            product = load_product(row[0])
+            previous = product.copy()
+            product.update(changes)
+            product['id'] = product_id
+            new_row = product_row(product)
+            connection.execute(UPDATE_PRODUCT, new_row + (product_id,))
+            self._record(connection, product_id, previous, product, row[0], new_row[-1])
+        return product
+
+    def delete(self, product_id: str) -> ProductRecord:
+        with self.batch():
+            connection = self._connection()
+            row = connection.execute(SELECT_PRODUCT, (product_id,)).fetchone()
+            if row is None:
+                raise KeyError(product_id)
+
+            product = load_product(row[0])
+            connection.execute(DELETE_PRODUCT, (product_id,))
+            self._record(connection, product_id, product, None, row[0], None)
+        return product
+
+
+def fts_query(query: str) -> Optional[str]:
+    """Expressão MATCH do FTS5: OR dos termos da busca
+
+    Os termos passam pelo mesmo tokenize usado ao indexar (`search_terms`),
+    então casam termo a termo, como no índice em memória.
+    """
+    terms = dict.fromkeys(tokenize(query))
+    if not terms:
+        return None
+    return ' OR '.join(f'"{term}"' for term in terms)
+
+
+class FTSSearchIndex:
+    """Busca de /api/search sobre a tabela FTS5 do SQLiteProductStore
+
+    Mesma interface de consulta do SearchIndex (`match` e `search`); o
+    índice é mantido pelos triggers do banco, então não é um listener.
+    """
+
+    def __init__(self, store: SQLiteProductStore):
+        self.store = store
+
+    def match(self, query: str, **filters) -> Dict[str, float]:
+        """Retorna {id: score BM25} de todos os produtos que contêm algum termo da busca
+
+        Os filtros de igualdade (`marketplace`, `category`, ...) entram no
+        próprio SQL, sobre as colunas de `products`.
+        """
+        expression = fts_query(query)
+        if expression is None:
+            return {}
+        where, params = self.store._where(None, None, None, filters)
+        sql = FTS_MATCH + (f' AND {where}' if where else '')
+        return dict(self.store._connection().execute(sql, [expression, *params]))
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        accept: Optional[Callable[[Dict], bool]] = None,
+        after: Optional[Tuple[float, str]] = None,
+        **filters
+    ) -> Tuple[List[Tuple[Dict, float]], int]:
+        """Busca os `limit` produtos mais relevantes (mesmo contrato do SearchIndex)
+
+        Prefira `filters` a `accept`: `accept` precisa carregar cada produto
+        encontrado, os filtros não saem do SQLite.
+        """
+        scores = self.match(query, **filters)
+        if accept is not None:
+            products = self.store.get_many(scores)
+            scores = {product['id']: scores[product['id']] for product in products if accept(product)}
+
+        following = scores.items()
+        if after is not None:
+            following = [(pid, score) for pid, score in following if (score, pid) < after]
+
+        top = heapq.nlargest(max(limit, 0), following, key=lambda item: (item[1], item[0]))
+        products = {product['id']: product for product in self.store.get_many(pid for pid, _ in top)}
+        return [(products[pid], score) for pid, score in top if pid in products], len(scores)
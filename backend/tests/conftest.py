@@ -0,0 +1,45 @@
+# =====================================================
+# Configuração dos testes do backend
+# Arquivo: tests/conftest.py
+#
+# Uso (a partir de backend/):
+#   python -m pytest -q
+# =====================================================
+
+import os
+import sys
+
+import pytest
+
+# Os módulos do backend são importados pelo nome (como no app.py)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from product_store import ProductStore  # noqa: E402
+from sqlite_store import SQLiteProductStore  # noqa: E402
+
+
+def make_products(count: int):
+    """Catálogo com preços e avaliações repetidos (empates na ordenação)"""
+    return [
+        {
+            'id': f'prod_{number:03d}',
+            'title': f'Produto {number}',
+            'marketplace': ('amazon', 'shopee')[number % 2],
+            'marketplace_id': f'MKT{number:03d}',
+            'category': ('electronics', 'home', None)[number % 3],
+            'status': 'active',
+            'price': float(10 + number % 7),
+            'rating': (number % 5) or None,
+        }
+        for number in range(count)
+    ]
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    """ProductStore e SQLiteProductStore, para os testes valerem nos dois backends"""
+    if request.param == 'memory':
+        return ProductStore()
+    return SQLiteProductStore(str(tmp_path / 'products.db'))
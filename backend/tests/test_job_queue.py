@@ -0,0 +1,87 @@
+# =====================================================
+# Fila de scraping: retentativas e prazo (lease) dos jobs
+# Arquivo: tests/test_job_queue.py
+# =====================================================
+
+import time
+
+import pytest
+
+from job_queue import LEASE_EXPIRED_ERROR, ScrapeJobQueue, retry_delay
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return ScrapeJobQueue(str(tmp_path / 'jobs.db'), lease_seconds=0.01)
+
+
+def expire_lease():
+    time.sleep(0.02)
+
+
+def test_expired_lease_is_reclaimed_then_failed_on_last_attempt(queue):
+    job_id = queue.enqueue('https://www.amazon.com.br/dp/B0TEST0001', max_attempts=2)
+
+    first = queue.claim('worker-1')
+    assert first['attempts'] == 1
+    expire_lease()
+
+    # Worker morreu: o job volta para outro worker
+    second = queue.claim('worker-2')
+    assert second['id'] == job_id
+    assert second['attempts'] == 2
+    expire_lease()
+
+    # Última tentativa também venceu: falha em vez de voltar para sempre
+    assert queue.claim('worker-3') is None
+    job = queue.get(job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == LEASE_EXPIRED_ERROR
+    assert job['finished_at'] is not None
+    assert queue.counts()['failed'] == 1
+
+
+def test_running_job_within_lease_is_not_claimed_twice(tmp_path):
+    queue = ScrapeJobQueue(str(tmp_path / 'jobs.db'), lease_seconds=60)
+    queue.enqueue('https://shopee.com.br/produto-i.1.2')
+
+    assert queue.claim('worker-1') is not None
+    assert queue.claim('worker-2') is None
+
+
+def test_fail_retries_with_backoff_until_max_attempts(queue):
+    job_id = queue.enqueue('https://www.amazon.com.br/dp/B0TEST0002', max_attempts=2)
+
+    job = queue.claim('worker-1')
+    assert queue.fail(job, 'worker-1', 'HTTP 503') is True
+    retried = queue.get(job_id)
+    assert retried['status'] == 'queued'
+    assert retried['retry_at'] is not None
+    # Ainda esperando o backoff
+    assert queue.claim('worker-1') is None
+
+    assert retry_delay(1) < retry_delay(2) <= retry_delay(100)
+
+
+def test_fail_on_last_attempt_marks_job_failed(tmp_path):
+    queue = ScrapeJobQueue(str(tmp_path / 'jobs.db'))
+    job_id = queue.enqueue('https://www.amazon.com.br/dp/B0TEST0003', max_attempts=1)
+
+    job = queue.claim('worker-1')
+    assert queue.fail(job, 'worker-1', 'HTTP 404') is False
+    assert queue.get(job_id)['status'] == 'failed'
+
+
+def test_late_result_from_expired_worker_is_ignored(queue):
+    job_id = queue.enqueue('https://www.amazon.com.br/dp/B0TEST0004', max_attempts=3)
+    stale = queue.claim('worker-1')
+    expire_lease()
+    current = queue.claim('worker-2')
+
+    queue.complete(stale, 'worker-1', {'title': 'resultado antigo'})
+    assert queue.get(job_id)['status'] == 'running'
+
+    queue.complete(current, 'worker-2', {'title': 'resultado'})
+    job = queue.get(job_id)
+    assert job['status'] == 'done'
+    assert job['result'] == {'title': 'resultado'}
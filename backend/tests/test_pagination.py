@@ -0,0 +1,124 @@
+# =====================================================
+# Paginação por cursor (keyset) x paginação por offset
+# Arquivo: tests/test_pagination.py
+# =====================================================
+
+import pytest
+
+from cursors import decode_cursor, encode_cursor
+from product_store import SORT_ORDERS
+
+from tests.conftest import make_products
+
+SORTS = [None, *SORT_ORDERS]
+FILTERS = [
+    {},
+    {'marketplace': 'amazon'},
+    {'category': 'home'},
+    {'min_price': 12.0, 'max_price': 15.0},
+]
+
+
+def walk_seek(store, limit, **arguments):
+    """Ids de todas as páginas seguindo `next_key` até o fim"""
+    ids, after = [], None
+    while True:
+        page = store.seek(after=after, limit=limit, exact_total=True, **arguments)
+        ids.extend(product['id'] for product in page.products)
+        if page.next_key is None:
+            return ids, page.total
+        after = page.next_key
+
+
+def walk_offset(store, limit, **arguments):
+    ids, offset = [], 0
+    while True:
+        products, total = store.query(offset=offset, limit=limit, **arguments)
+        ids.extend(product['id'] for product in products)
+        if offset + limit >= total:
+            return ids, total
+        offset += limit
+
+
+@pytest.mark.parametrize('sort', SORTS)
+@pytest.mark.parametrize('filters', FILTERS, ids=lambda filters: ','.join(filters) or 'all')
+def test_seek_matches_offset_pages(store, sort, filters):
+    store.extend(make_products(53))
+
+    seek_ids, seek_total = walk_seek(store, 7, sort=sort, **filters)
+    offset_ids, offset_total = walk_offset(store, 7, sort=sort, **filters)
+
+    assert seek_ids == offset_ids
+    assert seek_total == offset_total == len(offset_ids)
+    assert len(set(seek_ids)) == len(seek_ids)
+
+
+def test_seek_within_subset(store):
+    store.extend(make_products(40))
+    within = {f'prod_{number:03d}' for number in range(0, 40, 3)}
+
+    seek_ids, _ = walk_seek(store, 4, within=within, sort='price_desc')
+    offset_ids, _ = walk_offset(store, 4, within=within, sort='price_desc')
+
+    assert seek_ids == offset_ids
+    assert set(seek_ids) == within
+
+
+def test_seek_skips_deleted_cursor_product(store):
+    """O cursor é uma posição na ordenação: apagar o último produto visto não perde os seguintes"""
+    store.extend(make_products(20))
+    page = store.seek(sort='price_asc', limit=5)
+    store.delete(page.products[-1]['id'])
+
+    rest, _ = walk_seek(store, 5, sort='price_asc')
+    following = store.seek(sort='price_asc', after=page.next_key, limit=100).products
+
+    assert [product['id'] for product in following] == rest[4:]
+
+
+def test_cursor_round_trip_and_sort_mismatch():
+    from cursors import InvalidCursor
+
+    cursor = encode_cursor('price_asc', (19.9, 'prod_001'))
+    assert decode_cursor(cursor, 'price_asc') == (19.9, 'prod_001')
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, 'rating')
+    with pytest.raises(InvalidCursor):
+        decode_cursor('não-é-cursor', 'price_asc')
+
+
+@pytest.fixture
+def client():
+    """Cliente do app Flask com um catálogo de teste (removido no fim)"""
+    from app import app, products_db
+
+    products = make_products(25)
+    products_db.extend(products)
+    try:
+        yield app.test_client()
+    finally:
+        for product in products:
+            products_db.delete(product['id'])
+
+
+def test_api_offset_is_default_and_cursor_is_opt_in(client):
+    offset = client.get('/api/products?marketplace=shopee&sort=price_asc&limit=5').get_json()
+    assert {'page', 'total_pages'} <= set(offset)
+    assert 'next_cursor' not in offset
+
+    ids, cursor = [], None
+    while True:
+        query = f'&cursor={cursor}' if cursor else '&paginate=cursor'
+        page = client.get(f'/api/products?marketplace=shopee&sort=price_asc&limit=5{query}').get_json()
+        ids.extend(product['id'] for product in page['products'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    offset_ids = []
+    for number in range(1, offset['total_pages'] + 1):
+        page = client.get(f'/api/products?marketplace=shopee&sort=price_asc&limit=5&page={number}').get_json()
+        offset_ids.extend(product['id'] for product in page['products'])
+
+    assert ids == offset_ids
+    assert len(ids) == offset['total']
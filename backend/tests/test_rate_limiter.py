@@ -0,0 +1,53 @@
+# =====================================================
+# Circuit breaker por marketplace
+# Arquivo: tests/test_rate_limiter.py
+# =====================================================
+
+import time
+
+from rate_limiter import CircuitBreaker
+
+
+def open_breaker(reset_timeout: float = 0.01) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=reset_timeout, max_reset_timeout=1.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_threshold_and_releases_a_single_probe():
+    breaker = open_breaker()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.blocking() and not breaker.allow()
+
+    time.sleep(0.02)
+    assert not breaker.blocking()
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_lost_probe_is_released_again_after_reset_timeout():
+    """Um teste cancelado nunca registra resultado; o circuito não pode ficar preso"""
+    breaker = open_breaker()
+    time.sleep(0.02)
+    assert breaker.allow()
+
+    assert breaker.blocking()
+    time.sleep(0.02)
+    assert not breaker.blocking()
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_with_longer_timeout():
+    breaker = open_breaker()
+    time.sleep(0.02)
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.reset_timeout == 0.02
@@ -0,0 +1,141 @@
+# =====================================================
+# Cache de scraping: coalescência e revalidação condicional
+# Arquivo: tests/test_scrape_cache.py
+# =====================================================
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from product_parsers import ProductData
+from product_scraper import ProductScraper
+from scrape_cache import ScrapeCache
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'fixtures',
+                       'amazon-fone-bluetooth.html')
+KEY = ('amazon', 'B0CFIXTURE')
+
+
+def product(title: str = 'Fone') -> ProductData:
+    return ProductData(title=title, price=10.0, marketplace='amazon', marketplace_id='B0CFIXTURE')
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = ScrapeCache()
+    calls = []
+
+    async def fetch(stale):
+        calls.append(stale)
+        await asyncio.sleep(0.01)
+        entry = cache.put(KEY, product())
+        return entry.product
+
+    async def main():
+        return await asyncio.gather(*(cache.get_or_fetch(KEY, fetch) for _ in range(5)))
+
+    results = asyncio.run(main())
+
+    assert calls == [None]
+    assert all(result is results[0] for result in results)
+    assert cache.stats['misses'] == 1
+    assert cache.stats['coalesced'] == 4
+    assert not cache.inflight
+
+
+def test_cancelled_caller_does_not_cancel_shared_fetch():
+    cache = ScrapeCache()
+
+    async def fetch(stale):
+        await asyncio.sleep(0.02)
+        return cache.put(KEY, product()).product
+
+    async def main():
+        first = asyncio.ensure_future(cache.get_or_fetch(KEY, fetch))
+        second = asyncio.ensure_future(cache.get_or_fetch(KEY, fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second, first
+
+    result, first = asyncio.run(main())
+
+    assert first.cancelled()
+    assert result.title == 'Fone'
+    assert cache.get(KEY) is not None
+
+
+def test_fresh_entry_is_served_and_stale_entry_is_passed_to_fetch():
+    cache = ScrapeCache(ttl=60)
+    cache.put(KEY, product('Em cache'), etag='"v1"')
+
+    async def unexpected(stale):
+        raise AssertionError('não deveria buscar')
+
+    assert asyncio.run(cache.get_or_fetch(KEY, unexpected)).title == 'Em cache'
+    assert cache.stats['hits'] == 1
+
+    cache.entries[KEY].expires_at = 0
+    seen = []
+
+    async def revalidate(stale):
+        seen.append(stale.validators())
+        cache.refresh(KEY)
+        return stale.product
+
+    assert asyncio.run(cache.get_or_fetch(KEY, revalidate)).title == 'Em cache'
+    assert seen == [{'If-None-Match': '"v1"'}]
+    assert cache.entries[KEY].fresh
+    assert cache.stats['revalidated'] == 1
+
+
+def test_evicts_least_recently_used_over_memory_limit():
+    cache = ScrapeCache(max_entries=2)
+    cache.put(('amazon', 'A'), product('A'))
+    cache.put(('amazon', 'B'), product('B'))
+    cache.get(('amazon', 'A'))
+    cache.put(('amazon', 'C'), product('C'))
+
+    assert ('amazon', 'B') not in cache.entries
+    assert set(cache.entries) == {('amazon', 'A'), ('amazon', 'C')}
+    assert cache.stats['evictions'] == 1
+
+
+def test_scraper_revalidates_with_etag_and_reuses_product_on_304():
+    with open(FIXTURE, 'rb') as page:
+        content = page.read()
+    requests = []
+
+    async def handler(request):
+        requests.append(request.headers.get('If-None-Match'))
+        if request.headers.get('If-None-Match') == '"fixture-v1"':
+            return web.Response(status=304)
+        return web.Response(body=content, content_type='text/html', charset='utf-8', headers={'ETag': '"fixture-v1"'})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get('/dp/B0CFIXTURE', handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        url = f'http://127.0.0.1:{port}/dp/B0CFIXTURE'
+
+        cache = ScrapeCache(ttl=0)
+        try:
+            with ThreadPoolExecutor(1) as executor:
+                async with ProductScraper(cache=cache, parse_executor=executor) as scraper:
+                    scraper.detect_marketplace = lambda _: 'amazon'
+                    first = await scraper.scrape_product(url)
+                    second = await scraper.scrape_product(url)
+        finally:
+            await runner.cleanup()
+        return first, second, cache
+
+    first, second, cache = asyncio.run(main())
+
+    assert requests == [None, '"fixture-v1"']
+    assert first.title.startswith('Fone de Ouvido Bluetooth')
+    assert second is first
+    assert cache.stats['revalidated'] == 1
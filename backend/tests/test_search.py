@@ -0,0 +1,59 @@
+# =====================================================
+# Busca BM25: índice em memória x FTS5 do SQLite
+# Arquivo: tests/test_search.py
+# =====================================================
+
+import pytest
+
+from product_store import ProductStore
+from search_index import SearchIndex
+from sqlite_store import FTSSearchIndex, SQLiteProductStore
+
+PRODUCTS = [
+    {'id': 'p1', 'title': 'Kit de botões dourados', 'marketplace': 'amazon', 'category': 'costura', 'price': 9.9},
+    {'id': 'p2', 'title': 'Bagagem de mão', 'marketplace': 'shopee', 'category': 'viagem', 'price': 199.0},
+    {'id': 'p3', 'title': 'Papel sulfite A4', 'marketplace': 'amazon', 'category': 'papelaria', 'price': 29.9},
+    {'id': 'p4', 'title': 'Fone bluetooth', 'description': 'Fones com botão de pareamento',
+     'marketplace': 'shopee', 'category': 'audio', 'price': 99.0},
+]
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def search(request, tmp_path):
+    if request.param == 'memory':
+        store, index = ProductStore(), SearchIndex()
+        store.add_listener(index)
+    else:
+        store = SQLiteProductStore(str(tmp_path / 'products.db'))
+        index = FTSSearchIndex(store)
+    store.extend(PRODUCTS)
+    return index
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('botões', {'p1', 'p4'}),
+    ('botão', {'p1', 'p4'}),
+    ('bagagens', {'p2'}),
+    ('papéis', {'p3'}),
+    ('FONES', {'p4'}),
+    ('inexistente', set()),
+])
+def test_accent_and_plural_folding(search, query, expected):
+    assert set(search.match(query)) == expected
+
+
+def test_filters_and_after_cursor(search):
+    top, total = search.search('botão', 10, marketplace='shopee')
+    assert [product['id'] for product, _ in top] == ['p4']
+    assert total == 1
+
+    first, total = search.search('botão', 1)
+    assert total == 2
+    product, score = first[0]
+    rest, _ = search.search('botão', 10, after=(score, product['id']))
+    assert [item['id'] for item, _ in rest] == sorted({'p1', 'p4'} - {product['id']})
+
+
+def test_title_match_outranks_description_match(search):
+    top, _ = search.search('botões', 2)
+    assert top[0][0]['id'] == 'p1'
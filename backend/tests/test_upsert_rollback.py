@@ -0,0 +1,125 @@
+# =====================================================
+# Upsert em lote: tudo ou nada no ProductStore
+# Arquivo: tests/test_upsert_rollback.py
+# =====================================================
+
+import pytest
+
+from product_store import ProductStore
+from search_index import SearchIndex
+from sqlite_store import SQLiteProductStore
+
+from tests.conftest import make_products
+
+
+class FailingListener:
+    """Listener que registra os ids e falha ao receber `fail_on`"""
+
+    def __init__(self, fail_on=None):
+        self.ids = set()
+        self.fail_on = fail_on
+
+    def on_insert(self, product):
+        if product['id'] == self.fail_on:
+            raise RuntimeError('listener falhou')
+        self.ids.add(product['id'])
+
+    def on_delete(self, product):
+        self.ids.discard(product['id'])
+
+    def reset(self):
+        self.ids.clear()
+
+
+def snapshot(store):
+    return {product['id']: dict(product) for product in store}
+
+
+def test_upsert_many_rolls_back_inserts_and_updates_when_a_listener_fails():
+    store = ProductStore()
+    index = SearchIndex()
+    listener = FailingListener()
+    store.add_listener(index)
+    store.add_listener(listener)
+    store.extend(make_products(4))
+    before = snapshot(store)
+
+    listener.fail_on = 'prod_new_2'
+    batch = [
+        {'marketplace': 'amazon', 'marketplace_id': 'MKT000', 'title': 'Título novo', 'price': 99.0},
+        {'id': 'prod_new_1', 'marketplace': 'amazon', 'marketplace_id': 'NEW1', 'title': 'Novo 1', 'price': 1.0},
+        {'id': 'prod_new_2', 'marketplace': 'shopee', 'marketplace_id': 'NEW2', 'title': 'Novo 2', 'price': 2.0},
+    ]
+    with pytest.raises(RuntimeError):
+        store.upsert_many(batch, defaults={'status': 'active'})
+
+    assert snapshot(store) == before
+    assert listener.ids == set(before)
+    assert store.find_by_marketplace_id('amazon', 'NEW1') is None
+    assert store.postings('marketplace', 'amazon') == {pid for pid, p in before.items() if p['marketplace'] == 'amazon'}
+    assert 'prod_new_1' not in index.match('novo')
+    assert 'prod_000' not in index.match('título')
+    products, total = store.query(sort='price_desc', limit=100)
+    assert total == len(before)
+    assert products[0]['price'] == max(product['price'] for product in before.values())
+
+
+def test_upsert_many_rejects_duplicate_id_without_partial_writes():
+    store = ProductStore()
+    store.extend(make_products(2))
+    before = snapshot(store)
+
+    with pytest.raises(KeyError):
+        store.upsert_many([
+            {'marketplace': 'shopee', 'marketplace_id': 'MKT001', 'price': 50.0},
+            {'id': 'prod_000', 'marketplace': 'amazon', 'marketplace_id': 'OTHER', 'price': 1.0},
+        ])
+
+    assert snapshot(store) == before
+
+
+def test_upsert_keeps_stored_status_and_applies_defaults_only_to_new(store):
+    store.insert({
+        'id': 'prod_a', 'marketplace': 'amazon', 'marketplace_id': 'A1', 'title': 'A', 'price': 1.0,
+        'status': 'inactive'
+    })
+
+    results = store.upsert_many([
+        {'marketplace': 'amazon', 'marketplace_id': 'A1', 'title': 'A2', 'price': 2.0},
+        {'id': 'prod_b', 'marketplace': 'amazon', 'marketplace_id': 'B1', 'title': 'B', 'price': 3.0},
+    ], defaults={'status': 'active'})
+
+    assert [created for _, created in results] == [False, True]
+    assert store.get('prod_a')['status'] == 'inactive'
+    assert store.get('prod_a')['title'] == 'A2'
+    assert store.get('prod_b')['status'] == 'active'
+
+
+def test_insert_rejects_unindexable_field_without_writing():
+    store = ProductStore()
+    with pytest.raises(TypeError):
+        store.insert({'id': 'prod_x', 'marketplace': 'amazon', 'category': ['a', 'b'], 'price': 1.0})
+    assert 'prod_x' not in store
+    assert len(store) == 0
+
+
+def test_sqlite_listener_failure_keeps_committed_write(tmp_path):
+    """No SQLite a escrita já foi gravada: o listener é repovoado em vez de falhar a requisição"""
+    store = SQLiteProductStore(str(tmp_path / 'products.db'))
+    listener = FailingListener()
+    store.add_listener(listener)
+    store.insert(make_products(1)[0])
+
+    # Falha uma única vez (ex.: erro transitório); o repovoamento já passa
+    original = listener.on_insert
+
+    def fail_once(product):
+        listener.on_insert = original
+        raise RuntimeError('listener falhou')
+
+    listener.on_insert = fail_once
+    results = store.upsert_many(make_products(3)[1:])
+
+    assert [created for _, created in results] == [True, True]
+    assert {product['id'] for product in store} == {'prod_000', 'prod_001', 'prod_002'}
+    assert listener.ids == {'prod_000', 'prod_001', 'prod_002'}